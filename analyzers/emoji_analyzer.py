@@ -1,16 +1,77 @@
+import numpy as np
 import pandas as pd
 import emoji
 import re
-from collections import Counter
+
+from core.activity_cube import ActivityCube
+
+
+def _trie_regex(node):
+    """Regex for a character trie; optional tails are greedy, so the longest sequence wins"""
+    leaves = sorted(char for char, child in node.items() if char and list(child) == [''])
+    branches = [
+        re.escape(char) + _trie_regex(child)
+        for char, child in sorted(node.items())
+        if char and char not in leaves
+    ]
+    if len(leaves) == 1:
+        branches.append(re.escape(leaves[0]))
+    elif leaves:
+        branches.append('[' + ''.join(re.escape(char) for char in leaves) + ']')
+
+    if not branches:
+        return ''
+    pattern = branches[0] if len(branches) == 1 and len(leaves) <= 1 else '(?:' + '|'.join(branches) + ')'
+    return f'(?:{pattern})?' if '' in node else pattern
+
+
+def _char_class(chars):
+    """Character class with consecutive code points collapsed into ranges"""
+    ranges = []
+    for code in sorted({ord(char) for char in chars}):
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return '[' + ''.join(
+        re.escape(chr(start)) if start == end else f'{re.escape(chr(start))}-{re.escape(chr(end))}'
+        for start, end in ranges
+    ) + ']'
+
+
+def build_emoji_pattern(sequences=None):
+    """Compile one regex matching every known emoji, including multi-codepoint
+    sequences (flags, skin tones, keycaps, ZWJ sequences)"""
+    trie = {}
+    for sequence in (sequences if sequences is not None else emoji.EMOJI_DATA):
+        node = trie
+        for char in sequence:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    # The lookaheads reject positions that cannot start an emoji with class
+    # tests instead of trying every branch of the trie: first a cheap
+    # "non-ASCII or #, * and digits" test, then the exact set of first characters
+    ascii_starts = ''.join(re.escape(char) for char in sorted(trie) if ord(char) < 128)
+    return re.compile(f'(?=[{ascii_starts}\x80-\U0010ffff])(?={_char_class(trie)}){_trie_regex(trie)}')
+
+
+EMOJI_PATTERN = build_emoji_pattern()
+NON_ASCII = r'[^\x00-\x7f]'
+
 
 class EmojiAnalyzer:
     """Analyze emoji usage patterns in chat messages"""
     
     def __init__(self):
-        pass
+        self._names = {}  # Memoized emoji -> display name
     
-    def analyze_emojis(self, df):
-        """Analyze emoji usage in the dataframe"""
+    def analyze_emojis(self, df, activity=None):
+        """Analyze emoji usage in the dataframe
+        
+        Emoji are counted on the user and day axes of ``activity`` (the
+        analysis' ``ActivityCube``, built from ``df`` when not given).
+        """
         if df.empty:
             return {
                 'total_emojis': 0,
@@ -22,67 +83,84 @@ class EmojiAnalyzer:
         
         print("Analyzing emoji usage...")
         
-        # Extract all emojis from messages
-        all_emojis = []
-        emoji_data = []
-        
-        for idx, row in df.iterrows():
-            message = str(row['message'])
-            message_emojis = self._extract_emojis(message)
-            all_emojis.extend(message_emojis)
-            
-            # Store emoji data with metadata
-            for emoji_char in message_emojis:
-                emoji_data.append({
-                    'datetime': row['datetime'],
-                    'user': row['user'],
-                    'emoji': emoji_char,
-                    'emoji_name': self._get_emoji_name(emoji_char)
-                })
-        
-        emoji_df = pd.DataFrame(emoji_data)
+        # Extract all emojis column-wise and explode them into one row per
+        # occurrence, keeping the message's user code and day. Every emoji
+        # has a non-ASCII code point, so plain ASCII messages are skipped.
+        candidates = np.flatnonzero(df['message'].str.contains(NON_ASCII, na=False).to_numpy(dtype=bool))
+        found = df['message'].iloc[candidates].astype(object).str.findall(EMOJI_PATTERN)
+        lengths = found.str.len().fillna(0).to_numpy(dtype=np.int64)
+        rows = np.repeat(candidates, lengths)
+        emoji_codes, emoji_chars = pd.factorize(
+            pd.Series([char for chars in found[lengths > 0] for char in chars], dtype=object)
+        )
+        
+        if activity is None:
+            activity = ActivityCube(df)
+        emoji_table = pd.DataFrame({
+            'user': activity.message_user[rows],
+            'day': activity.message_day[rows],
+            'emoji': emoji_codes,
+            'position': np.arange(len(rows))
+        })
         
         # Calculate statistics
-        total_emojis = len(all_emojis)
-        unique_emojis = len(set(all_emojis))
+        total_emojis = len(emoji_table)
+        unique_emojis = len(emoji_chars)
+        
+        # One groupby; per-user, per-emoji and per-day totals are reduced from it.
+        # 'first' orders ties by first use, like Counter.most_common.
+        counts = emoji_table.groupby(['user', 'day', 'emoji'], sort=False).agg(
+            count=('position', 'size'), first=('position', 'min')
+        ).reset_index()
         
-        # Top emojis
-        emoji_counts = Counter(all_emojis)
+        # Top emojis (emoji codes are numbered in order of first use)
+        emoji_counts = np.bincount(counts['emoji'], weights=counts['count'], minlength=unique_emojis).astype(np.int64)
         top_emojis = [
             {
-                'emoji': emoji_char,
-                'name': self._get_emoji_name(emoji_char),
-                'count': count,
-                'percentage': round((count / total_emojis) * 100, 1) if total_emojis > 0 else 0
+                'emoji': emoji_chars[code],
+                'name': self._get_emoji_name(emoji_chars[code]),
+                'count': int(emoji_counts[code]),
+                'percentage': round((emoji_counts[code] / total_emojis) * 100, 1) if total_emojis > 0 else 0
             }
-            for emoji_char, count in emoji_counts.most_common(20)
+            for code in np.argsort(-emoji_counts, kind='stable')[:20]
         ]
         
         # Per-user emoji statistics
         user_emoji_stats = {}
-        if not emoji_df.empty:
+        if total_emojis:
+            user_counts = counts.groupby(['user', 'emoji'], sort=False).agg(
+                count=('count', 'sum'), first=('first', 'min')
+            ).reset_index().sort_values(['user', 'count', 'first'], ascending=[True, False, True])
+            by_user = {code: group for code, group in user_counts.groupby('user', sort=False)}
+            
             for user in df['user'].unique():
-                user_emojis = emoji_df[emoji_df['user'] == user]['emoji'].tolist()
-                user_emoji_counts = Counter(user_emojis)
+                user_emojis = by_user.get(activity.users.get_loc(user))
+                if user_emojis is None:
+                    user_emoji_stats[user] = {'total_emojis': 0, 'unique_emojis': 0, 'top_emojis': []}
+                    continue
                 
                 user_emoji_stats[user] = {
-                    'total_emojis': len(user_emojis),
-                    'unique_emojis': len(set(user_emojis)),
+                    'total_emojis': int(user_emojis['count'].sum()),
+                    'unique_emojis': len(user_emojis),
                     'top_emojis': [
                         {
-                            'emoji': emoji_char,
-                            'name': self._get_emoji_name(emoji_char),
-                            'count': count
+                            'emoji': emoji_chars[emoji_code],
+                            'name': self._get_emoji_name(emoji_chars[emoji_code]),
+                            'count': int(count)
                         }
-                        for emoji_char, count in user_emoji_counts.most_common(5)
+                        for emoji_code, count in zip(user_emojis['emoji'][:5], user_emojis['count'][:5])
                     ]
                 }
         
         # Emoji timeline (daily usage)
         emoji_timeline = pd.DataFrame()
-        if not emoji_df.empty:
-            emoji_df['date'] = emoji_df['datetime'].dt.date
-            emoji_timeline = emoji_df.groupby('date').size().reset_index(name='emoji_count')
+        if total_emojis:
+            daily = np.bincount(counts['day'], weights=counts['count'], minlength=activity.n_days).astype(np.int64)
+            active = np.flatnonzero(daily)
+            emoji_timeline = pd.DataFrame({
+                'date': activity.dates()[active].astype(object),
+                'emoji_count': daily[active]
+            })
         
         return {
             'total_emojis': total_emojis,
@@ -98,20 +176,18 @@ class EmojiAnalyzer:
         if not text:
             return []
         
-        # Use emoji library to extract emojis
-        emojis = []
-        for char in text:
-            if char in emoji.EMOJI_DATA:
-                emojis.append(char)
-        
-        return emojis
+        return EMOJI_PATTERN.findall(text)
     
     def _get_emoji_name(self, emoji_char):
         """Get the name/description of an emoji"""
-        try:
-            return emoji.demojize(emoji_char).replace(':', '').replace('_', ' ').title()
-        except:
-            return "Unknown Emoji"
+        name = self._names.get(emoji_char)
+        if name is None:
+            try:
+                name = emoji.demojize(emoji_char).replace(':', '').replace('_', ' ').title()
+            except:
+                name = "Unknown Emoji"
+            self._names[emoji_char] = name
+        return name
     
     def get_emoji_insights(self, emoji_data):
         """Generate insights from emoji analysis"""
@@ -0,0 +1,188 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+BACKENDS = ('pytorch', 'quantized', 'onnx')
+
+
+def local_model_path(model_dir, model_name):
+    """Directory a model is saved to under ``model_dir``: ``org/name`` becomes ``org--name``"""
+    return os.path.join(model_dir, model_name.replace('/', '--'))
+
+
+def load_classification_pipeline(task, model_name, backend='pytorch', model_dir=None):
+    """Build a transformers text-classification pipeline on the CPU with the given backend
+
+    ``pytorch`` runs the fp32 model, from ``model_dir`` when it has a copy
+    and from the Hugging Face cache otherwise. ``quantized`` applies
+    dynamic int8 quantization to the model's linear layers and ``onnx``
+    runs an exported graph on ONNX Runtime (needs ``optimum[onnxruntime]``);
+    both only read the local copy in ``model_dir`` and never download.
+    Prepare the copies with ``save_local_model``.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+
+    path = local_model_path(model_dir, model_name) if model_dir else None
+    if backend == 'pytorch':
+        if path and os.path.isdir(path):
+            return pipeline(task, model=path, tokenizer=path, device=-1)
+        return pipeline(task, model=model_name, device=-1)
+
+    if not path or not os.path.isdir(path):
+        raise FileNotFoundError(f"No local copy of {model_name} for the {backend} backend (expected {path})")
+    tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+    if backend == 'quantized':
+        import torch
+        model = AutoModelForSequenceClassification.from_pretrained(path, local_files_only=True)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    else:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        model = ORTModelForSequenceClassification.from_pretrained(os.path.join(path, 'onnx'), local_files_only=True)
+    return pipeline(task, model=model, tokenizer=tokenizer, device=-1)
+
+
+def save_local_model(model_name, model_dir, onnx=False):
+    """Download ``model_name`` once into ``model_dir`` for offline loading, with an ONNX export if asked"""
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    path = local_model_path(model_dir, model_name)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(path)
+    AutoModelForSequenceClassification.from_pretrained(model_name).save_pretrained(path)
+    if onnx:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        ORTModelForSequenceClassification.from_pretrained(path, export=True).save_pretrained(os.path.join(path, 'onnx'))
+    return path
+
+
+class ScoreCache:
+    """Thread-safe LRU of model outputs keyed by a hash of (model, text)
+
+    Shared by all analyses in a worker, so messages that were already
+    scored (forwarded texts, repeated uploads) skip the model entirely.
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_name, text):
+        return hashlib.blake2b(f"{model_name}\0{text}".encode('utf-8'), digest_size=16).digest()
+
+    def get_many(self, keys):
+        """Cached value (or None) for each key"""
+        with self._lock:
+            values = []
+            for key in keys:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                values.append(value)
+            return values
+
+    def put_many(self, items):
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class BatchedClassifier:
+    """Run a transformers text-classification pipeline over many texts at once
+
+    Identical texts are scored once and texts already in ``cache`` are not
+    scored at all. The rest are ordered by token length and packed into
+    batches of up to ``batch_size`` texts whose padded size (texts x
+    longest text) stays within ``max_batch_tokens``, so short chat
+    messages travel in large batches and a long one never pads a whole
+    batch. Texts are truncated to ``max_length`` tokens. A batch that fails
+    is split in half and retried, so one bad input only loses itself.
+    """
+
+    def __init__(self, pipeline, model_name, batch_size=32, max_length=128, cache=None, max_batch_tokens=None):
+        self.pipeline = pipeline
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.cache = cache
+        self.max_batch_tokens = max_batch_tokens or batch_size * max_length
+
+    def predict(self, texts):
+        """``{'label', 'score'}`` for every text, or None where the model failed"""
+        unique = list(dict.fromkeys(texts))
+        results = dict.fromkeys(unique)
+
+        keys = [ScoreCache.key(self.model_name, text) for text in unique]
+        if self.cache is not None:
+            for text, value in zip(unique, self.cache.get_many(keys)):
+                results[text] = value
+        key_of = dict(zip(unique, keys))
+
+        missing = [text for text in unique if results[text] is None]
+        for batch in self.batches(missing):
+            scored = self._run_batch(batch)
+            results.update(scored)
+            if self.cache is not None:
+                self.cache.put_many((key_of[text], value) for text, value in scored)
+
+        return [results[text] for text in texts]
+
+    def batches(self, texts):
+        """Group ``texts`` into length-sorted batches that fit the token budget"""
+        lengths = self.token_lengths(texts)
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+        batches = []
+        batch = []
+        for index in order:
+            # Sorted ascending, so this text is the longest and sets the padded width
+            if batch and (len(batch) >= self.batch_size or (len(batch) + 1) * lengths[index] > self.max_batch_tokens):
+                batches.append(batch)
+                batch = []
+            batch.append(texts[index])
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def token_lengths(self, texts):
+        """Truncated token count of each text, from the pipeline's tokenizer when it has one"""
+        tokenizer = getattr(self.pipeline, 'tokenizer', None)
+        if tokenizer is not None and texts:
+            try:
+                encoded = tokenizer(list(texts), truncation=True, max_length=self.max_length)
+                return [len(ids) for ids in encoded['input_ids']]
+            except Exception as e:
+                print(f"Tokenizer failed, estimating lengths: {e}")
+        # Rough estimate: subword tokenizers split words (and emoji) into a few pieces
+        return [min(max(len(text.split()), len(text) // 4) + 2, self.max_length) for text in texts]
+
+    def _run_batch(self, batch):
+        """``[(text, result)]`` for a batch, splitting it on failure down to single texts"""
+        try:
+            outputs = self.pipeline(
+                batch,
+                batch_size=len(batch),
+                truncation=True,
+                max_length=self.max_length
+            )
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"Error in model inference, skipping message: {e}")
+                return []
+            middle = len(batch) // 2
+            return self._run_batch(batch[:middle]) + self._run_batch(batch[middle:])
+
+        scored = []
+        for text, output in zip(batch, outputs):
+            if isinstance(output, list):  # Pipelines called with top_k return every label
+                output = output[0]
+            scored.append((text, {'label': output.get('label', ''), 'score': float(output.get('score', 0))}))
+        return scored
@@ -1,11 +1,21 @@
+import numpy as np
 import pandas as pd
 import re
+import datetime
 from collections import Counter
 
+from core.tokens import CountMatrix, TokenTable, most_common_order
+from core.trends import TrendIndex, period_index, period_start
+
 class KeywordAnalyzer:
     """Analyze keywords and trending words in chat"""
     
-    def __init__(self):
+    def __init__(self, trend_period='week', trend_window=1, trend_baseline=4):
+        # Rising words compare the last ``trend_window`` periods with the ``trend_baseline`` before them
+        self.trend_period = trend_period
+        self.trend_window = trend_window
+        self.trend_baseline = trend_baseline
+        
         # Common stop words to filter out (English, Hindi, and Chat common words)
         self.stop_words = {
             # English stop words
@@ -32,70 +42,190 @@ class KeywordAnalyzer:
             'when', 'what', 'who', 'how', 'why', 'which', 'whose', 'whom'
         }
     
-    def analyze_keywords(self, df):
-        """Analyze keywords and trending words"""
+    def analyze_keywords(self, df, tokens=None):
+        """Analyze keywords and trending words
+        
+        ``tokens`` is the analysis' shared ``TokenTable``; it is built from
+        ``df`` when not given.
+        """
         if df.empty:
             return {
                 'trending_words': [],
+                'rising_words': [],
+                'trend_window': None,
                 'word_frequency': {},
                 'user_vocabulary': {}
             }
         
         print("Analyzing keywords and trending words...")
         
-        # Filter text messages
-        text_messages = df[df['message_type'] == 'text']['message'].tolist()
+        if tokens is None:
+            tokens = TokenTable(df)
         
-        if not text_messages:
+        # Filter text messages
+        if not tokens.is_text.any():
             return {
                 'trending_words': [],
+                'rising_words': [],
+                'trend_window': None,
                 'word_frequency': {},
                 'user_vocabulary': {}
             }
         
-        # Extract and count words
-        all_words = []
-        for message in text_messages:
-            words = self._extract_words(message)
-            all_words.extend(words)
+        # Count words per user in one pass; trending words are column sums
+        # over the text messages and the vocabulary stats are row reductions
+        user_words, vocabulary = self.user_term_matrix(tokens)
+        text_words, _ = self.user_term_matrix(tokens, text_only=True)
+        word_ids, word_counts = text_words.top_terms()
+        total_text_words = word_counts.sum()
         
-        # Count word frequency
-        word_counts = Counter(all_words)
+        # Recent activity per word comes from the period index, not the messages
+        trends, _ = self.trend_index(df, tokens)
+        window, baseline = self.trend_windows(trends)
+        recent_counts = trends.counts(*window)
+        growth = trends.growth(recent_counts, trends.counts(*baseline), window, baseline) if trends.total(*baseline) else None
         
         # Get trending words (most common excluding stop words)
         trending_words = [
-            {'word': word, 'count': count, 'percentage': round((count / len(all_words)) * 100, 2)}
-            for word, count in word_counts.most_common(50)
+            {
+                'word': word,
+                'count': int(count),
+                'percentage': round((count / total_text_words) * 100, 2),
+                'recent_count': int(recent_counts[word_id]),
+                'growth': round(float(growth[word_id]), 2) if growth is not None else None
+            }
+            for word_id, word, count in zip(word_ids[:50], vocabulary[word_ids[:50]], word_counts[:50])
             if word.lower() not in self.stop_words and len(word) > 2
         ][:20]  # Top 20 trending words
         
         # User vocabulary analysis
         user_vocabulary = {}
+        total_words = user_words.row_sums()
+        unique_words = user_words.row_nnz()
+        distinctive_words = self.distinctive_words(tokens)
         for user in df['user'].unique():
-            user_messages = df[df['user'] == user]['message'].tolist()
-            user_words = []
-            for message in user_messages:
-                if isinstance(message, str):
-                    user_words.extend(self._extract_words(message))
-            
-            user_word_counts = Counter(user_words)
+            code = tokens.users.get_loc(user)
+            user_word_ids, user_word_counts = user_words.row(code)
             user_vocabulary[user] = {
-                'total_words': len(user_words),
-                'unique_words': len(set(user_words)),
-                'vocabulary_richness': round(len(set(user_words)) / len(user_words), 3) if user_words else 0,
+                'total_words': int(total_words[code]),
+                'unique_words': int(unique_words[code]),
+                'vocabulary_richness': round(unique_words[code] / total_words[code], 3) if total_words[code] else 0,
                 'top_words': [
-                    {'word': word, 'count': count}
-                    for word, count in user_word_counts.most_common(10)
+                    {'word': word, 'count': int(count)}
+                    for word, count in zip(vocabulary[user_word_ids[:10]], user_word_counts[:10])
                     if word.lower() not in self.stop_words and len(word) > 2
-                ][:5]
+                ][:5],
+                'distinctive_words': distinctive_words.get(user, [])
             }
         
         return {
             'trending_words': trending_words,
-            'word_frequency': dict(word_counts.most_common(100)),
+            'rising_words': self.rising_words(df, tokens) if growth is not None else [],
+            'trend_window': {
+                'period': self.trend_period,
+                'start': period_start(window[0], self.trend_period).isoformat(),
+                'end': (period_start(window[1] + 1, self.trend_period) - datetime.timedelta(days=1)).isoformat(),
+                'baseline_start': period_start(baseline[0], self.trend_period).isoformat()
+            },
+            'word_frequency': {word: int(count) for word, count in zip(vocabulary[word_ids[:100]], word_counts[:100])},
             'user_vocabulary': user_vocabulary
         }
     
+    def user_term_matrix(self, tokens, text_only=False):
+        """Sparse users x words count matrix of a ``TokenTable``
+        
+        Returns ``(CountMatrix, vocabulary)``: rows are the user codes of
+        ``tokens.users`` and columns index ``vocabulary``. The counts are
+        built once per table; ``text_only`` keeps the words of text messages.
+        """
+        words = tokens.words('keywords', self._split_token)
+        
+        # Rows 2 * user + is_text, so both variants come from the same counts
+        by_type = tokens.cached('keywords:by_type', lambda: CountMatrix(
+            tokens.user[words.row] * 2 + tokens.text_rows()[words.row],
+            words.word,
+            (2 * len(tokens.users), len(words.vocabulary))
+        ))
+        rows = np.arange(by_type.shape[0])
+        if text_only:
+            matrix = tokens.cached('keywords:text', lambda: by_type.select_rows(rows % 2 == 1).group_rows(rows // 2, len(tokens.users)))
+        else:
+            matrix = tokens.cached('keywords:all', lambda: by_type.group_rows(rows // 2, len(tokens.users)))
+        return matrix, words.vocabulary
+    
+    def trend_index(self, df, tokens):
+        """Per-period word counts of the text messages, as ``(TrendIndex, vocabulary)``
+        
+        Built once per table and ``trend_period``; the word IDs match
+        ``user_term_matrix``.
+        """
+        words = tokens.words('keywords', self._split_token)
+        
+        def build():
+            text = tokens.text_rows()[words.row]
+            periods = period_index(df['datetime'], self.trend_period)[tokens.message[words.row[text]]]
+            return TrendIndex(words.word[text], periods, len(words.vocabulary))
+        
+        return tokens.cached(f'keywords:trends:{self.trend_period}', build), words.vocabulary
+    
+    def trend_windows(self, trends):
+        """``(window, baseline)`` period ranges ending at the chat's last period"""
+        end = trends.last_period if trends.last_period is not None else 0
+        window = (end - self.trend_window + 1, end)
+        return window, (window[0] - self.trend_baseline, window[0] - 1)
+    
+    def trending_in_range(self, df, tokens, start, end, top_n=20):
+        """Most used words between the dates ``start`` and ``end`` (inclusive)"""
+        trends, vocabulary = self.trend_index(df, tokens)
+        word_ids, counts = trends.top(
+            int(period_index([start], self.trend_period)[0]),
+            int(period_index([end], self.trend_period)[0]),
+            top_n + len(self.stop_words)
+        )
+        return [
+            {'word': word, 'count': int(count)}
+            for word, count in zip(vocabulary[word_ids], counts)
+            if word not in self.stop_words and len(word) > 2
+        ][:top_n]
+    
+    def rising_words(self, df, tokens, top_n=20, min_count=3):
+        """Words whose share of the latest window grew most over the baseline window"""
+        trends, vocabulary = self.trend_index(df, tokens)
+        window, baseline = self.trend_windows(trends)
+        word_ids, counts, baseline_counts, growth = trends.rising(window, baseline, min_count=min_count)
+        return [
+            {'word': word, 'count': int(count), 'baseline_count': int(baseline_count), 'growth': round(float(ratio), 2)}
+            for word, count, baseline_count, ratio in zip(vocabulary[word_ids], counts, baseline_counts, growth)
+            if word not in self.stop_words and len(word) > 2
+        ][:top_n]
+    
+    def distinctive_words(self, tokens, top_n=5):
+        """Words each user uses unusually often compared to the others, by TF-IDF"""
+        user_words, vocabulary = self.user_term_matrix(tokens)
+        keep = np.fromiter(
+            (word not in self.stop_words and len(word) > 2 for word in vocabulary),
+            dtype=bool, count=len(vocabulary)
+        )[user_words.indices]
+        rows = user_words.entry_rows[keep]
+        scores = user_words.tfidf()[keep]
+        score_rank = np.unique(scores, return_inverse=True)[1].reshape(-1)
+        order = most_common_order(rows, score_rank, user_words.first[keep])
+        rows, word_ids, scores = rows[order], user_words.indices[keep][order], scores[order]
+        
+        # Rank within each user's run of entries and keep the first top_n
+        run_starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else rows
+        rank = np.arange(len(rows)) - np.repeat(run_starts, np.diff(np.r_[run_starts, len(rows)]))
+        distinctive = {}
+        for row, word_id, score in zip(rows[rank < top_n], word_ids[rank < top_n], scores[rank < top_n]):
+            distinctive.setdefault(tokens.users[row], []).append(
+                {'word': vocabulary[word_id], 'score': round(float(score), 4)}
+            )
+        return distinctive
+    
+    def _split_token(self, token):
+        """Keyword words of one lowercased token (the per-token form of ``_extract_words``)"""
+        return [word for word in re.sub(r'[^\w\s]', ' ', token).split() if len(word) > 2 and word.isalpha()]
+    
     def _extract_words(self, text):
         """Extract words from text, cleaning and filtering"""
         if not isinstance(text, str):
@@ -141,15 +271,18 @@ class KeywordAnalyzer:
         return insights
     
     def extract_keywords(self, text, top_n=10):
-        """Extract keywords from text string - alias for compatibility"""
-        if not text:
-            return []
-        
-        words = self._extract_words(text)
-        word_counts = Counter(words)
+        """Extract keywords from a text string or from the text messages of a ``TokenTable``"""
+        if isinstance(text, TokenTable):
+            text_words, vocabulary = self.user_term_matrix(text, text_only=True)
+            word_ids, counts = text_words.top_terms(top_n)
+            most_common_words = zip(vocabulary[word_ids], (int(count) for count in counts))
+        else:
+            if not text:
+                return []
+            most_common_words = Counter(self._extract_words(text)).most_common(top_n)
         
         return [
             {'word': word, 'count': count}
-            for word, count in word_counts.most_common(top_n)
+            for word, count in most_common_words
             if word.lower() not in self.stop_words and len(word) > 2
         ]
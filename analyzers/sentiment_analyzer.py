@@ -1,19 +1,51 @@
 import pandas as pd
-from transformers import pipeline
+from functools import partial
+
+from analyzers.inference import BatchedClassifier, load_classification_pipeline
+from core.model_registry import ModelRegistry
+
+MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+
+def load_sentiment_pipeline(backend='pytorch', model_dir=None):
+    """Build the sentiment classifier (imports transformers, so only call when needed)"""
+    try:
+        return load_classification_pipeline("sentiment-analysis", MODEL_NAME, backend, model_dir)
+    except Exception:
+        if backend != 'pytorch':
+            raise
+        # Fallback to default model
+        from transformers import pipeline
+        return pipeline("sentiment-analysis", device=-1)
 
 class SentimentAnalyzer:
-    """Sentiment analyzer using transformers"""
+    """Sentiment analyzer using transformers
     
-    def __init__(self):
-        try:
-            self.sentiment_pipeline = pipeline(
-                "sentiment-analysis",
-                model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-                device=-1
-            )
-        except Exception:
-            # Fallback to default model
-            self.sentiment_pipeline = pipeline("sentiment-analysis", device=-1)
+    The model is fetched from ``registry`` on first use, so constructing the
+    analyzer is cheap; ``backend`` selects fp32, int8-quantized or ONNX
+    inference (see ``load_classification_pipeline``). Messages are scored through a ``BatchedClassifier``:
+    duplicates once, in length-bucketed batches sized to
+    ``max_batch_tokens``, with scores cached in ``cache`` (a
+    ``ScoreCache``) across analyses.
+    """
+    
+    def __init__(self, batch_size=32, max_length=128, max_batch_tokens=None, cache=None, registry=None,
+                 backend='pytorch', model_dir=None):
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.max_batch_tokens = max_batch_tokens
+        self.cache = cache
+        self.backend = backend
+        self.registry = registry or ModelRegistry()
+        self.registry.register('sentiment', partial(load_sentiment_pipeline, backend, model_dir))
+    
+    def _classifier(self):
+        """Batched classifier over the shared model; raises ``ModelLoadError`` if it cannot be loaded"""
+        sentiment_pipeline = self.registry.get('sentiment')
+        return BatchedClassifier(
+            sentiment_pipeline, f"{sentiment_pipeline.model.config.name_or_path}:{self.backend}",
+            batch_size=self.batch_size, max_length=self.max_length,
+            max_batch_tokens=self.max_batch_tokens, cache=self.cache
+        )
     
     def analyze_sentiment(self, df):
         """Analyze sentiment of messages in the dataframe"""
@@ -28,19 +60,12 @@ class SentimentAnalyzer:
         
         print(f"Analyzing sentiment for {len(text_messages)} text messages...")
         
-        # Analyze sentiment in batches for performance
-        batch_size = 100
-        sentiments = []
-        
-        for i in range(0, len(text_messages), batch_size):
-            batch = text_messages.iloc[i:i+batch_size]['message'].tolist()
-            try:
-                batch_results = self.sentiment_pipeline(batch)
-                sentiments.extend(batch_results)
-            except Exception as e:
-                print(f"Error in sentiment analysis batch {i}: {e}")
-                # Add neutral sentiment for failed batch
-                sentiments.extend([{'label': 'NEUTRAL', 'score': 0.5}] * len(batch))
+        # Analyze sentiment in length-bucketed batches; messages the model
+        # fails on are counted as neutral
+        sentiments = [
+            result if result is not None else {'label': 'NEUTRAL', 'score': 0.5}
+            for result in self._classifier().predict(text_messages['message'].astype(str).tolist())
+        ]
         
         # Add sentiment results to dataframe
         text_messages = text_messages.copy()
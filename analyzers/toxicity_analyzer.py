@@ -1,20 +1,51 @@
+import numpy as np
 import pandas as pd
-from transformers import pipeline
 import re
+from functools import partial
+
+from analyzers.inference import BatchedClassifier, load_classification_pipeline
+from core.model_registry import ModelRegistry, ModelLoadError
+
+MODEL_NAME = "unitary/toxic-bert"
+
+def load_toxicity_pipeline(backend='pytorch', model_dir=None):
+    """Build the toxicity classifier (imports transformers, so only call when needed)"""
+    return load_classification_pipeline("text-classification", MODEL_NAME, backend, model_dir)
 
 class ToxicityAnalyzer:
-    """Analyze toxicity and harmful content in messages"""
+    """Analyze toxicity and harmful content in messages
+    
+    The model is fetched from ``registry`` on first use, so constructing the
+    analyzer is cheap; ``backend`` selects fp32, int8-quantized or ONNX
+    inference (see ``load_classification_pipeline``). Messages are scored by the model in batches (see
+    ``BatchedClassifier``); ``cache`` is a ``ScoreCache`` shared across
+    analyses.
+    """
     
-    def __init__(self):
+    def __init__(self, batch_size=32, max_length=128, max_batch_tokens=None, cache=None, registry=None,
+                 backend='pytorch', model_dir=None):
+        # Rule-based detection is also the fallback when the model is unavailable
+        self._init_rule_based_detector()
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.max_batch_tokens = max_batch_tokens
+        self.cache = cache
+        self.backend = backend
+        self.registry = registry or ModelRegistry()
+        self.registry.register('toxicity', partial(load_toxicity_pipeline, backend, model_dir))
+    
+    def _classifier(self):
+        """Batched classifier over the shared model, or None if it cannot be loaded"""
         try:
-            self.toxicity_pipeline = pipeline(
-                "text-classification",
-                model="unitary/toxic-bert",
-                device=-1
-            )
-        except Exception:
-            self.toxicity_pipeline = None
-            self._init_rule_based_detector()
+            toxicity_pipeline = self.registry.get('toxicity')
+        except ModelLoadError as e:
+            print(f"Toxicity model unavailable, using rules: {e}")
+            return None
+        return BatchedClassifier(
+            toxicity_pipeline, f"{MODEL_NAME}:{self.backend}",
+            batch_size=self.batch_size, max_length=self.max_length,
+            max_batch_tokens=self.max_batch_tokens, cache=self.cache
+        )
     
     def _init_rule_based_detector(self):
         """Initialize rule-based toxicity detection as fallback"""
@@ -49,34 +80,30 @@ class ToxicityAnalyzer:
                 'toxic_examples': []
             }
         
-        toxic_count = 0
-        toxic_examples = []
-        user_toxicity = {}
+        # Score every message in one batched pass
+        messages = text_messages['message'].astype(str)
+        is_toxic = self._toxic_flags(messages.tolist())
+        toxic_count = int(is_toxic.sum())
         
-        # Initialize user toxicity counters
+        # Per-user counts over the categorical codes
+        users = df['user'].astype('category')
+        user_codes = text_messages['user'].astype(users.dtype).cat.codes.to_numpy()
+        total_per_user = np.bincount(user_codes, minlength=len(users.cat.categories))
+        toxic_per_user = np.bincount(user_codes[is_toxic], minlength=len(users.cat.categories))
+        user_toxicity = {}
         for user in df['user'].unique():
-            user_toxicity[user] = {'toxic_count': 0, 'total_messages': 0}
+            code = users.cat.categories.get_loc(user)
+            user_toxicity[user] = {'toxic_count': int(toxic_per_user[code]), 'total_messages': int(total_per_user[code])}
         
-        # Analyze each message
-        for idx, row in text_messages.iterrows():
-            message = str(row['message'])
-            user = row['user']
-            
-            user_toxicity[user]['total_messages'] += 1
-            
-            is_toxic = self._is_toxic(message)
-            
-            if is_toxic:
-                toxic_count += 1
-                user_toxicity[user]['toxic_count'] += 1
-                
-                # Store example (truncated for privacy)
-                if len(toxic_examples) < 5:  # Limit examples
-                    toxic_examples.append({
-                        'user': user,
-                        'message': message[:100] + '...' if len(message) > 100 else message,
-                        'datetime': row['datetime'].strftime('%Y-%m-%d %H:%M')
-                    })
+        # Store examples (truncated for privacy)
+        toxic_examples = []
+        for position in np.flatnonzero(is_toxic)[:5]:  # Limit examples
+            message = messages.iloc[position]
+            toxic_examples.append({
+                'user': text_messages['user'].iloc[position],
+                'message': message[:100] + '...' if len(message) > 100 else message,
+                'datetime': text_messages['datetime'].iloc[position].strftime('%Y-%m-%d %H:%M')
+            })
         
         # Calculate toxicity percentages for users
         for user in user_toxicity:
@@ -97,30 +124,30 @@ class ToxicityAnalyzer:
     
     def _is_toxic(self, message):
         """Determine if a message is toxic"""
-        if not message or len(message.strip()) < 3:
-            return False
-        
-        if self.toxicity_pipeline:
-            try:
-                # Use ML model
-                result = self.toxicity_pipeline(message)
-                # Check if the model returns toxicity labels
-                if isinstance(result, list) and len(result) > 0:
-                    label = result[0].get('label', '').upper()
-                    score = result[0].get('score', 0)
-                    return 'TOXIC' in label and score > 0.7
-            except Exception as e:
-                print(f"Error in ML toxicity detection: {e}")
-                # Fall back to rule-based
-                pass
+        return bool(self._toxic_flags([message])[0])
+    
+    def _toxic_flags(self, messages):
+        """Boolean array marking the toxic messages of a list"""
+        flags = np.zeros(len(messages), dtype=bool)
+        eligible = np.array([bool(message) and len(message.strip()) >= 3 for message in messages], dtype=bool)
+        rule_based = eligible.copy()
+        
+        classifier = self._classifier() if eligible.any() else None
+        if classifier is not None:
+            # Use ML model; messages it failed on fall back to the rules
+            positions = np.flatnonzero(eligible)
+            results = classifier.predict([messages[i] for i in positions])
+            for position, result in zip(positions, results):
+                if result is not None:
+                    flags[position] = 'TOXIC' in result['label'].upper() and result['score'] > 0.7
+                    rule_based[position] = False
         
         # Rule-based detection
-        message_lower = message.lower()
-        for pattern in self.toxic_patterns:
-            if re.search(pattern, message_lower, re.IGNORECASE):
-                return True
+        if rule_based.any():
+            toxic_regex = re.compile('|'.join(f'(?:{pattern})' for pattern in self.toxic_patterns), re.IGNORECASE)
+            flags[rule_based] = [toxic_regex.search(messages[i].lower()) is not None for i in np.flatnonzero(rule_based)]
         
-        return False
+        return flags
     
     def get_toxicity_insights(self, toxicity_data):
         """Generate insights from toxicity analysis"""
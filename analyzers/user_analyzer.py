@@ -1,36 +1,60 @@
+import numpy as np
 import pandas as pd
 
+from core.activity_cube import ActivityCube
+from visualizers.downsample import downsample_table
+
 class UserAnalyzer:
-    """Analyze user participation and activity"""
+    """Analyze user participation and activity
+    
+    ``activity_timeline`` is the full daily message count per user.
+    ``activity_timeline_summary`` is the chart-sized version: the
+    ``top_users`` most active users (the rest summed into "Others"),
+    bucketed by week or month when the chat spans more than ``max_points``
+    days.
+    """
+    
+    def __init__(self, max_points=500, top_users=10):
+        self.max_points = max_points
+        self.top_users = top_users
     
-    def analyze_users(self, df):
-        """Analyze user participation and generate statistics"""
+    def analyze_users(self, df, activity=None):
+        """Analyze user participation and generate statistics
+        
+        ``activity`` is the analysis' ``ActivityCube``; it is built from
+        ``df`` when not given.
+        """
         if df.empty:
-            return {'active_users_list': [], 'top_user': None, 'activity_timeline': pd.DataFrame()}
+            return {'active_users_list': [], 'top_user': None, 'activity_timeline': pd.DataFrame(),
+                    'activity_timeline_summary': {'bucket': 'day', 'users': {}}}
+        
+        if activity is None:
+            activity = ActivityCube(df)
         
-        # Count messages per user
-        user_counts = df['user'].value_counts().reset_index()
-        user_counts.columns = ['user', 'message_count']
+        # Messages per user come from the activity cube
+        user_counts = pd.DataFrame({'user': activity.users, 'message_count': activity.by_user()})
+        user_counts = user_counts[user_counts['message_count'] > 0]
         
         # Calculate percentages
         total_messages = len(df)
         user_counts['percentage'] = (user_counts['message_count'] / total_messages) * 100
         
         # Sort by message count and get top users
-        user_counts = user_counts.sort_values(by='message_count', ascending=False).reset_index(drop=True)
+        user_counts = user_counts.sort_values(by='message_count', ascending=False, kind='stable').reset_index(drop=True)
         top_user = user_counts.iloc[0] if not user_counts.empty else None
         
-        # Generate activity timeline (daily activity)
-        df['date'] = df['datetime'].dt.date
-        activity_timeline = df.groupby(['date', 'user']).size().unstack(fill_value=0)
+        # Generate activity timeline (daily activity), plus a capped and bucketed copy for charts
+        activity_timeline = activity.daily_by_user()
+        summary, bucket = downsample_table(activity_timeline, self.max_points, self.top_users)
         
         return {
             'active_users_list': user_counts.to_dict(orient='records'), 
             'top_user': top_user.to_dict() if top_user is not None else None, 
-            'activity_timeline': activity_timeline.to_dict() if not activity_timeline.empty else {}
+            'activity_timeline': activity_timeline.to_dict() if not activity_timeline.empty else {},
+            'activity_timeline_summary': {'bucket': bucket, 'users': summary.to_dict() if not summary.empty else {}}
         }
     
-    def get_user_stats(self, df):
+    def get_user_stats(self, df, activity=None):
         """Alias for analyze_users method to maintain compatibility"""
-        return self.analyze_users(df)
+        return self.analyze_users(df, activity)
 
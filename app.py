@@ -6,40 +6,113 @@ emoji detection, user activity tracking, and interactive visualizations.
 """
 
 import os
+import sys
+import time
+_started_at = time.perf_counter()  # Startup time is reported on /health
+
+import gzip
 import json
+import base64
+import hashlib
+import tempfile
 import traceback
+import multiprocessing
+import numpy as np
 import pandas as pd
-import plotly.utils
 from flask import Flask, render_template, request, flash, redirect, url_for, jsonify
 from datetime import datetime
 
 from config import config
 from core.chat_parser import WhatsAppChatParser
+from core.chat_archive import ChatArchive, ArchiveTooLarge
+from core.analysis_cache import AnalysisCache
+from core.result_store import create_result_store
+from core.jobs import JobQueue, QueueFullError
+from core.pipeline import Pipeline
+from core.tokens import TokenTable
+from core.activity_cube import ActivityCube, ActivityTotals
+from core.model_registry import ModelRegistry
 from analyzers.user_analyzer import UserAnalyzer
 from analyzers.keyword_analyzer import KeywordAnalyzer
 from analyzers.emoji_analyzer import EmojiAnalyzer
-from visualizers.chart_generator import ChartGenerator
-from visualizers.wordcloud_generator import WordCloudGenerator
+from analyzers.inference import ScoreCache
+from analyzers.sentiment_analyzer import SentimentAnalyzer
+from analyzers.toxicity_analyzer import ToxicityAnalyzer
 
 app = Flask(__name__)
 env_name = os.environ.get('FLASK_ENV', 'development')
 app.config.from_object(config[env_name])
 
-user_analyzer = UserAnalyzer()
-keyword_analyzer = KeywordAnalyzer()
+user_analyzer = UserAnalyzer(
+    max_points=app.config['TIMELINE_MAX_POINTS'],
+    top_users=app.config['TIMELINE_TOP_USERS']
+)
+keyword_analyzer = KeywordAnalyzer(
+    trend_period=app.config['TREND_PERIOD'],
+    trend_window=app.config['TREND_WINDOW'],
+    trend_baseline=app.config['TREND_BASELINE']
+)
 emoji_analyzer = EmojiAnalyzer()
-chart_generator = ChartGenerator()
-wordcloud_generator = WordCloudGenerator()
+analysis_cache = AnalysisCache(
+    app.config['ANALYSIS_CACHE_DIR'],
+    max_bytes=app.config['ANALYSIS_CACHE_MAX_BYTES']
+) if app.config['ANALYSIS_CACHE_ENABLED'] else None
+result_store = create_result_store(app.config)
+job_queue = JobQueue(
+    max_workers=app.config['ANALYSIS_WORKERS'],
+    max_pending=app.config['ANALYSIS_QUEUE_SIZE'],
+    status_store=create_result_store(app.config, directory=app.config['JOB_STATUS_DIR'])
+)
+chart_store = create_result_store(app.config, directory=app.config['CHART_STORE_DIR'])
+
+# Heavy libraries and ML models are loaded on first use and shared per process
+model_registry = ModelRegistry(idle_seconds=app.config['MODEL_IDLE_SECONDS'])
+
+def _load_chart_generator():
+    from visualizers.chart_generator import ChartGenerator
+    return ChartGenerator(max_points=app.config['TIMELINE_MAX_POINTS'], backend=app.config['CHART_BACKEND'])
+
+def _load_wordcloud_generator():
+    from visualizers.wordcloud_generator import WordCloudGenerator
+    return WordCloudGenerator(width=app.config['WORDCLOUD_WIDTH'], height=app.config['WORDCLOUD_HEIGHT'])
+
+model_registry.register('chart_generator', _load_chart_generator, idle_release=False)
+model_registry.register('wordcloud_generator', _load_wordcloud_generator, idle_release=False)
 
-analysis_results = None
-sentiment_analyzer = None
-toxicity_analyzer = None
+# Model scores per message hash, shared by every analysis in this worker
+inference_cache = ScoreCache(max_entries=app.config['INFERENCE_CACHE_SIZE'])
+inference_options = {
+    'batch_size': app.config['INFERENCE_BATCH_SIZE'],
+    'max_length': app.config['INFERENCE_MAX_LENGTH'],
+    'max_batch_tokens': app.config['INFERENCE_MAX_BATCH_TOKENS'],
+    'cache': inference_cache,
+    'registry': model_registry
+}
 
-# Removed unused functions: allowed_file and extract_from_zip
+# ML analyzers are opt-in (SENTIMENT_MODEL_ENABLED, TOXICITY_MODEL_ENABLED);
+# their models are only loaded by the first analysis that uses them
+sentiment_analyzer = SentimentAnalyzer(backend=app.config['SENTIMENT_BACKEND'], model_dir=app.config['MODEL_CACHE_DIR'], **inference_options)
+toxicity_analyzer = ToxicityAnalyzer(backend=app.config['TOXICITY_BACKEND'], model_dir=app.config['MODEL_CACHE_DIR'], **inference_options)
 
-def _analyze_sentiment_simple(text_messages):
-    """Simple rule-based sentiment analysis"""
-    if not text_messages:
+def _spool_upload(file, suffix):
+    """Stream an uploaded file into UPLOAD_FOLDER
+    
+    Returns the spooled path and the SHA-256 of the content, computed while
+    copying.
+    """
+    upload_folder = app.config['UPLOAD_FOLDER']
+    os.makedirs(upload_folder, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=upload_folder)
+    digest = hashlib.sha256()
+    with os.fdopen(fd, 'wb') as spool:
+        for block in iter(lambda: file.stream.read(1024 * 1024), b''):
+            digest.update(block)
+            spool.write(block)
+    return path, digest.hexdigest()
+
+def _analyze_sentiment_simple(tokens):
+    """Simple rule-based sentiment analysis of the text messages in a TokenTable"""
+    if not tokens.is_text.any():
         return {'positive': 33.3, 'negative': 33.3, 'neutral': 33.4}
     
     positive_words = {
@@ -60,22 +133,16 @@ def _analyze_sentiment_simple(text_messages):
         'worse', 'worst', 'disgusting', 'gross', 'yuck', 'boring', 'dull', 'stupid', 'dumb'
     }
     
-    positive_count = 0
-    negative_count = 0
-    total_count = 0
+    # Score each distinct token once, then sum the scores per message
+    positive = np.fromiter((token in positive_words for token in tokens.vocabulary), dtype=bool, count=len(tokens.vocabulary))
+    negative = np.fromiter((token in negative_words for token in tokens.vocabulary), dtype=bool, count=len(tokens.vocabulary))
+    text = tokens.text_rows()
+    pos_score = np.bincount(tokens.message[text], weights=positive[tokens.token[text]], minlength=tokens.message_count)
+    neg_score = np.bincount(tokens.message[text], weights=negative[tokens.token[text]], minlength=tokens.message_count)
     
-    for message in text_messages:
-        if isinstance(message, str):
-            words = message.lower().split()
-            total_count += 1
-            
-            pos_score = sum(1 for word in words if word in positive_words)
-            neg_score = sum(1 for word in words if word in negative_words)
-            
-            if pos_score > neg_score:
-                positive_count += 1
-            elif neg_score > pos_score:
-                negative_count += 1
+    total_count = int(tokens.is_text.sum())
+    positive_count = int((pos_score > neg_score).sum())
+    negative_count = int((neg_score > pos_score).sum())
     
     if total_count == 0:
         return {'positive': 33.3, 'negative': 33.3, 'neutral': 33.4}
@@ -88,13 +155,224 @@ def _analyze_sentiment_simple(text_messages):
         'neutral': round((neutral_count / total_count) * 100, 1)
     }
 
+def _sentiment_distribution(df, tokens):
+    """Sentiment percentages from the model when it is enabled, otherwise rule-based"""
+    if app.config['SENTIMENT_MODEL_ENABLED']:
+        try:
+            overall = sentiment_analyzer.analyze_sentiment(df)['overall_sentiment']
+            if overall:
+                return {label: overall.get(label, 0.0) for label in ('positive', 'negative', 'neutral')}
+        except Exception as e:
+            print(f"Sentiment analysis failed: {e}")
+    return _analyze_sentiment_simple(tokens)
+
+def _basic_stats(df, tokens, media_inventory):
+    """Message, word and media counts shown at the top of the results"""
+    total_messages = len(df)
+    text_message_count = int(tokens.is_text.sum())
+    total_words = int(tokens.text_rows().sum())
+    basic_stats = {
+        'total_messages': total_messages,
+        'unique_users': df['user'].nunique(),
+        'date_range': f"{df['datetime'].min().strftime('%Y-%m-%d')} to {df['datetime'].max().strftime('%Y-%m-%d')}",
+        'avg_messages_per_day': round(total_messages / max((df['datetime'].max() - df['datetime'].min()).days, 1), 2),
+        'total_words': total_words,
+        'media_messages': int((df['message_type'] == 'media').sum()),
+        'link_messages': int((df['message_type'] == 'link').sum()),
+        'avg_words_per_message': round(total_words / max(text_message_count, 1), 1)
+    }
+    if media_inventory is not None:
+        basic_stats['media_files'] = media_inventory
+    return basic_stats
+
+def _toxicity_stats(df):
+    """Toxicity analysis (optional, only if the model is enabled)"""
+    if app.config['TOXICITY_MODEL_ENABLED']:
+        try:
+            print("Analyzing toxicity...")
+            return toxicity_analyzer.analyze_toxicity(df)
+        except Exception as e:
+            print(f"Toxicity analysis failed: {e}")
+    return {'toxic_messages': 0, 'toxicity_score': 0.0}
+
+def _wordcloud_frequencies(tokens):
+    """Word counts and fingerprint of the word cloud; the image is rendered by /wordcloud on request"""
+    try:
+        print("Counting word cloud words...")
+        generator = model_registry.get('wordcloud_generator')
+        frequencies = generator.frequencies(tokens)
+        if not frequencies:
+            return None
+        return {'fingerprint': generator.fingerprint(frequencies), 'frequencies': frequencies}
+    except Exception as e:
+        print(f"Word cloud generation failed: {e}")
+        return None
+
+def _chart(method):
+    """Wrap a ChartGenerator method (by name) as a builder of the figure's JSON, or None on error"""
+    def build(*inputs):
+        try:
+            from visualizers.figure_spec import to_json
+            create = getattr(model_registry.get('chart_generator'), method)
+            return to_json(create(*inputs))
+        except Exception as e:
+            print(f"Visualization error in {method}: {e}")
+            traceback.print_exc()
+            return None
+    return build
+
+# Analysis stages and the values each one reads. The emoji and word cloud
+# passes are CPU-bound Python and run on worker processes.
+analysis_pipeline = Pipeline(
+    max_workers=app.config['PIPELINE_WORKERS'],
+    max_processes=app.config['PIPELINE_PROCESSES']
+)
+analysis_pipeline.add('tokens', TokenTable, inputs=['df'])
+analysis_pipeline.add('activity', ActivityCube, inputs=['df'])
+analysis_pipeline.add('activity_totals', ActivityTotals.from_cube, inputs=['activity'])
+analysis_pipeline.add('basic_stats', _basic_stats, inputs=['df', 'tokens', 'media_inventory'])
+analysis_pipeline.add('sentiment_distribution', _sentiment_distribution, inputs=['df', 'tokens'])
+analysis_pipeline.add('toxicity_stats', _toxicity_stats, inputs=['df'])
+analysis_pipeline.add('emoji_stats', emoji_analyzer.analyze_emojis, inputs=['df', 'activity'], process=True)
+analysis_pipeline.add('user_stats', user_analyzer.get_user_stats, inputs=['df', 'activity'])
+analysis_pipeline.add('keyword_analysis', keyword_analyzer.analyze_keywords, inputs=['df', 'tokens'])
+analysis_pipeline.add('keyword_stats', keyword_analyzer.extract_keywords, inputs=['tokens'])
+analysis_pipeline.add('wordcloud', _wordcloud_frequencies, inputs=['tokens'], process=True)
+
+# Charts are built on request by /api/charts from the stored results: the
+# ChartGenerator method and its inputs, or None when the chart does not apply
+CHARTS = {
+    'sentiment_chart': ('create_sentiment_pie_chart', lambda results: [results['sentiment_distribution']]),
+    'user_activity_chart': ('create_user_activity_chart', lambda results: [ActivityTotals.from_dict(results['activity_totals'])]),
+    'timeline_chart': ('create_timeline_chart', lambda results: [ActivityTotals.from_dict(results['activity_totals'])]),
+    'heatmap_chart': ('create_hourly_heatmap', lambda results: [ActivityTotals.from_dict(results['activity_totals'])]),
+    'message_type_chart': ('create_message_type_chart', lambda results: [ActivityTotals.from_dict(results['activity_totals'])]),
+    'emoji_chart': ('create_emoji_chart', lambda results: [results['emoji_stats']] if results['emoji_stats'].get('total_emojis', 0) > 0 else None),
+    'activity_timeline': ('create_activity_timeline', lambda results: [ActivityTotals.from_dict(results['activity_totals'])]),
+}
+
+# Stages reported on the progress page, in order
+ANALYSIS_STAGES = ['parse'] + list(analysis_pipeline.stages)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+class AnalysisError(Exception):
+    """Analysis failed for a reason that can be shown to the user"""
+
+def make_serializable(obj):
+    """Ensure all data is JSON serializable"""
+    import datetime
+    import numpy as np
+    
+    if isinstance(obj, pd.DataFrame):
+        return make_serializable(obj.to_dict('records'))
+    elif isinstance(obj, pd.Series):
+        return make_serializable(obj.to_dict())
+    elif isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    elif isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    elif isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, dict):
+        return {str(k): make_serializable(v) for k, v in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [make_serializable(item) for item in obj]
+    elif hasattr(obj, 'isoformat'):  # Any date-like object
+        return obj.isoformat()
+    elif hasattr(obj, 'item'):  # NumPy scalars
+        return obj.item()
+    else:
+        return obj
+
+def _run_analysis(job, upload_path, filename, cache_key):
+    """Analyze a spooled upload on the job queue
+    
+    Progress is reported per stage on ``job``; the results are stored in the
+    result store under the job's ID.
+    """
+    # Initialize analyzers
+    parser = WhatsAppChatParser(
+        workers=app.config['PARSER_WORKERS'],
+        parallel_threshold=app.config['PARALLEL_PARSE_THRESHOLD']
+    )
+    
+    # Parse chat data
+    media_inventory = None
+    with job.stage('parse'):
+        try:
+            # Text exports are parsed through a memory map, zip exports
+            # are streamed out of the archive
+            if filename.endswith('.zip'):
+                with ChatArchive(upload_path, max_chat_bytes=app.config['ARCHIVE_MAX_CHAT_BYTES']) as archive:
+                    media_inventory = archive.media_inventory()
+                    with archive.open_chat() as chat_stream:
+                        df = parser.parse_chat(chat_stream)
+                    # Messages naming an attached file count as media/document messages
+                    if df is not None:
+                        df['message_type'] = archive.classify_attachments(df['message'], df['message_type'])
+            else:
+                df = parser.parse_file(upload_path)
+        except ArchiveTooLarge as size_error:
+            print(f"Parsing error: {size_error}")
+            raise AnalysisError('The chat in this archive is too large to analyze.')
+        except Exception as parse_error:
+            print(f"Parsing error: {parse_error}")
+            raise AnalysisError('Error parsing chat file. Please ensure it\'s a valid WhatsApp export.')
+        finally:
+            os.remove(upload_path)
+        
+        if df is None or df.empty:
+            raise AnalysisError('Unable to parse chat file. Please check the format.')
+        
+        # Ensure datetime column is properly formatted
+        df['datetime'] = pd.to_datetime(df['datetime'], errors='coerce')
+        df = df.dropna(subset=['datetime'])  # Remove rows with invalid dates
+        df['user'] = df['user'].cat.remove_unused_categories()
+        
+        if df.empty:
+            raise AnalysisError('No valid messages found after parsing. Please check your chat file format.')
+    
+    # Everything after parsing runs on the stage scheduler
+    outputs, stage_seconds = analysis_pipeline.run(
+        {'df': df, 'media_inventory': media_inventory},
+        on_start=job.start_stage,
+        on_finish=job.finish_stage
+    )
+    print(f"Stage timings: {stage_seconds}")
+    
+    # Store results under the job's analysis ID (ensure JSON serializable)
+    toxicity_stats = outputs['toxicity_stats']
+    analysis_results = {
+        'basic_stats': make_serializable(outputs['basic_stats']),
+        'sentiment_distribution': make_serializable(outputs['sentiment_distribution']),
+        'emoji_stats': make_serializable(outputs['emoji_stats']),
+        'user_stats': make_serializable(outputs['user_stats']),
+        'keyword_stats': make_serializable(outputs['keyword_stats']),
+        'keyword_analysis': make_serializable(outputs['keyword_analysis']),
+        'toxicity_stats': make_serializable(toxicity_stats) if toxicity_stats else None,
+        'wordcloud': outputs['wordcloud'],
+        'activity_totals': outputs['activity_totals'].to_dict(),  # Charts are built from these on request
+        'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    
+    if cache_key is not None:
+        try:
+            analysis_cache.put(cache_key, analysis_results)
+        except Exception as e:
+            print(f"Caching analysis results failed: {e}")
+    
+    result_store.put(analysis_results, analysis_id=job.id)
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
-    """Main analysis endpoint"""
+    """Main analysis endpoint: queue the upload and show its progress"""
     try:
         # Check if file was uploaded
         if 'file' not in request.files:
@@ -108,188 +386,43 @@ def analyze():
             flash('No file selected')
             return redirect(url_for('index'))
 
-        if file and file.filename.endswith('.txt'):
-            # Read and process file
-            file_content = file.read().decode('utf-8', errors='ignore')
-            
-            # Initialize analyzers
-            parser = WhatsAppChatParser()
-            
-            # Skip heavy ML analyzers for faster processing
-            global sentiment_analyzer, toxicity_analyzer
-            print("Skipping ML analyzers for faster processing...")
-            sentiment_analyzer = None
-            toxicity_analyzer = None
-            
-            # Parse chat data
-            try:
-                df = parser.parse_chat(file_content)
-                
-                if df is None or df.empty:
-                    flash('Unable to parse chat file. Please check the format.')
-                    return redirect(url_for('index'))
-                    
-                # Ensure datetime column is properly formatted
-                df['datetime'] = pd.to_datetime(df['datetime'], errors='coerce')
-                df = df.dropna(subset=['datetime'])  # Remove rows with invalid dates
-                
-                if df.empty:
-                    flash('No valid messages found after parsing. Please check your chat file format.')
-                    return redirect(url_for('index'))
-                    
-            except Exception as parse_error:
-                print(f"Parsing error: {parse_error}")
-                flash('Error parsing chat file. Please ensure it\'s a valid WhatsApp export.')
+        filename = file.filename.lower()
+        if file and filename.endswith(('.txt', '.zip')):
+            if not job_queue.has_capacity():
+                flash('The server is busy analyzing other chats. Please try again in a minute.')
                 return redirect(url_for('index'))
             
-            # Basic statistics
-            total_messages = len(df)
-            unique_users = df['user'].nunique()
-            date_range = f"{df['datetime'].min().strftime('%Y-%m-%d')} to {df['datetime'].max().strftime('%Y-%m-%d')}"
+            # Spool the upload to disk; identical uploads are served from the cache
+            upload_path, upload_digest = _spool_upload(file, os.path.splitext(filename)[1])
+            cache_key = None
+            if analysis_cache is not None:
+                cache_key = analysis_cache.key_for(upload_digest, {
+                    'date_format': date_format,
+                    'models': [app.config['SENTIMENT_MODEL_ENABLED'], app.config['TOXICITY_MODEL_ENABLED']],
+                    'trends': [keyword_analyzer.trend_period, keyword_analyzer.trend_window, keyword_analyzer.trend_baseline],
+                    'timeline': [app.config['TIMELINE_MAX_POINTS'], app.config['TIMELINE_TOP_USERS']]
+                })
+                cached_results = analysis_cache.get(cache_key)
+                if cached_results is not None:
+                    os.remove(upload_path)
+                    print("Serving analysis from cache")
+                    analysis_id = result_store.put(cached_results)
+                    return redirect(url_for('results', analysis_id=analysis_id))
             
-            basic_stats = {
-                'total_messages': total_messages,
-                'unique_users': unique_users,
-                'date_range': date_range,
-                'avg_messages_per_day': round(total_messages / max((df['datetime'].max() - df['datetime'].min()).days, 1), 2)
-            }
-            
-            # Text messages only for analysis
-            text_messages = df[df['message_type'] == 'text']['message'].tolist()
-            
-            # Simple rule-based sentiment analysis
-            print("Analyzing sentiment using rule-based approach...")
-            sentiment_distribution = _analyze_sentiment_simple(text_messages)
-            
-            # Emoji analysis
-            emoji_stats = emoji_analyzer.analyze_emojis(df)
-            
-            # User analysis
-            user_stats = user_analyzer.get_user_stats(df)
-            
-            # Comprehensive keyword analysis
-            keyword_analysis = keyword_analyzer.analyze_keywords(df)
-            keyword_stats = keyword_analyzer.extract_keywords(' '.join(text_messages), top_n=10)
-            
-            # Toxicity analysis (optional, only if needed)
-            toxicity_stats = {'toxic_messages': 0, 'toxicity_score': 0.0}
-            if toxicity_analyzer is not None:
-                try:
-                    print("Analyzing toxicity...")
-                    toxicity_stats = toxicity_analyzer.analyze_toxicity(df)
-                except Exception as e:
-                    print(f"Toxicity analysis failed: {e}")
-                    toxicity_stats = {'toxic_messages': 0, 'toxicity_score': 0.0}
-            
-            # Generate word cloud
-            wordcloud_img = None
             try:
-                print("Generating word cloud...")
-                wordcloud_img = wordcloud_generator.generate_wordcloud(df)
-            except Exception as e:
-                print(f"Word cloud generation failed: {e}")
-            
-            # Additional statistics
-            total_words = sum(len(msg.split()) for msg in text_messages if isinstance(msg, str))
-            media_count = len(df[df['message_type'] == 'media'])
-            link_count = len(df[df['message_type'] == 'link'])
-            
-            # Enhanced basic stats
-            basic_stats.update({
-                'total_words': total_words,
-                'media_messages': media_count,
-                'link_messages': link_count,
-                'avg_words_per_message': round(total_words / max(len(text_messages), 1), 1)
-            })
-            
-            # Create comprehensive visualizations
-            charts = {}
-            
-            try:
-                print("Creating visualizations...")
-                
-                # Create sentiment pie chart
-                sentiment_fig = chart_generator.create_sentiment_pie_chart(sentiment_distribution)
-                charts['sentiment_chart'] = json.dumps(sentiment_fig, cls=plotly.utils.PlotlyJSONEncoder)
-                
-                # Create user activity chart
-                user_activity_fig = chart_generator.create_user_activity_chart(df)
-                charts['user_activity_chart'] = json.dumps(user_activity_fig, cls=plotly.utils.PlotlyJSONEncoder)
-                
-                # Create timeline chart
-                timeline_fig = chart_generator.create_timeline_chart(df)
-                charts['timeline_chart'] = json.dumps(timeline_fig, cls=plotly.utils.PlotlyJSONEncoder)
-                
-                # Create hourly activity heatmap
-                heatmap_fig = chart_generator.create_hourly_heatmap(df)
-                charts['heatmap_chart'] = json.dumps(heatmap_fig, cls=plotly.utils.PlotlyJSONEncoder)
-                
-                # Create message type distribution chart
-                message_type_fig = chart_generator.create_message_type_chart(df)
-                charts['message_type_chart'] = json.dumps(message_type_fig, cls=plotly.utils.PlotlyJSONEncoder)
-                
-                # Create emoji usage chart if emojis exist
-                if emoji_stats.get('total_emojis', 0) > 0:
-                    emoji_fig = chart_generator.create_emoji_chart(emoji_stats)
-                    charts['emoji_chart'] = json.dumps(emoji_fig, cls=plotly.utils.PlotlyJSONEncoder)
-                
-                # Create activity timeline
-                activity_timeline_fig = chart_generator.create_activity_timeline(df)
-                charts['activity_timeline'] = json.dumps(activity_timeline_fig, cls=plotly.utils.PlotlyJSONEncoder)
-                
-            except Exception as e:
-                print(f"Visualization error: {e}")
-                traceback.print_exc()
-            
-            # Ensure all data is JSON serializable
-            def make_serializable(obj):
-                import datetime
-                import numpy as np
-                
-                if isinstance(obj, pd.DataFrame):
-                    return obj.to_dict('records')
-                elif isinstance(obj, pd.Series):
-                    return obj.to_dict()
-                elif isinstance(obj, (datetime.date, datetime.datetime)):
-                    return obj.isoformat()
-                elif isinstance(obj, pd.Timestamp):
-                    return obj.isoformat()
-                elif isinstance(obj, np.integer):
-                    return int(obj)
-                elif isinstance(obj, np.floating):
-                    return float(obj)
-                elif isinstance(obj, np.ndarray):
-                    return obj.tolist()
-                elif isinstance(obj, dict):
-                    return {str(k): make_serializable(v) for k, v in obj.items()}
-                elif isinstance(obj, (list, tuple)):
-                    return [make_serializable(item) for item in obj]
-                elif hasattr(obj, 'isoformat'):  # Any date-like object
-                    return obj.isoformat()
-                elif hasattr(obj, 'item'):  # NumPy scalars
-                    return obj.item()
-                else:
-                    return obj
-            
-            # Store results globally (ensure JSON serializable)
-            global analysis_results
-            analysis_results = {
-                'basic_stats': make_serializable(basic_stats),
-                'sentiment_distribution': make_serializable(sentiment_distribution),
-                'emoji_stats': make_serializable(emoji_stats),
-                'user_stats': make_serializable(user_stats),
-                'keyword_stats': make_serializable(keyword_stats),
-                'keyword_analysis': make_serializable(keyword_analysis),
-                'toxicity_stats': make_serializable(toxicity_stats) if toxicity_stats else None,
-                'wordcloud_img': wordcloud_img,
-                'charts': charts,  # Already JSON strings
-                'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
+                job = job_queue.submit(
+                    _run_analysis, upload_path, filename, cache_key,
+                    stages=ANALYSIS_STAGES
+                )
+            except QueueFullError:
+                os.remove(upload_path)
+                flash('The server is busy analyzing other chats. Please try again in a minute.')
+                return redirect(url_for('index'))
             
-            return render_template('results.html', results=analysis_results)
+            return redirect(url_for('job_progress', job_id=job.id))
             
         else:
-            flash('Please upload a valid .txt file')
+            flash('Please upload a valid .txt or .zip file')
             return redirect(url_for('index'))
             
     except Exception as e:
@@ -298,26 +431,144 @@ def analyze():
         flash(f'Error processing file: {str(e)}')
         return redirect(url_for('index'))
 
-@app.route('/api/stats')
-def api_stats():
+@app.route('/jobs/<job_id>')
+def job_progress(job_id):
+    """Progress page that polls the job status and opens the results when done"""
+    if job_queue.get(job_id) is None:
+        flash('Unknown or expired analysis job.')
+        return redirect(url_for('index'))
+    return render_template('progress.html', job_id=job_id, stages=ANALYSIS_STAGES)
+
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """API endpoint for per-stage job progress"""
+    status = job_queue.get(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if status['status'] == 'done':
+        status['results_url'] = url_for('results', analysis_id=job_id)
+    return jsonify(status)
+
+def _get_results(analysis_id):
+    """Look up stored results, or None if the ID is unknown or expired"""
+    return result_store.get(analysis_id)
+
+@app.route('/results/<analysis_id>')
+def results(analysis_id):
+    """Render stored analysis results"""
+    analysis_results = _get_results(analysis_id)
+    if not analysis_results:
+        flash('These analysis results have expired. Please upload the chat again.')
+        return redirect(url_for('index'))
+    return render_template('results.html', results=analysis_results, analysis_id=analysis_id)
+
+@app.route('/api/stats/<analysis_id>')
+def api_stats(analysis_id):
     """API endpoint for getting basic stats"""
-    global analysis_results
+    analysis_results = _get_results(analysis_id)
     if analysis_results:
         return jsonify(analysis_results.get('basic_stats', {}))
-    return jsonify({'error': 'No analysis data available'})
+    return jsonify({'error': 'No analysis data available'}), 404
 
-@app.route('/api/sentiment')
-def api_sentiment():
+@app.route('/api/sentiment/<analysis_id>')
+def api_sentiment(analysis_id):
     """API endpoint for sentiment data"""
-    global analysis_results
+    analysis_results = _get_results(analysis_id)
     if analysis_results:
         return jsonify(analysis_results.get('sentiment_distribution', {}))
-    return jsonify({'error': 'No sentiment data available'})
+    return jsonify({'error': 'No sentiment data available'}), 404
+
+@app.route('/api/timeline/<analysis_id>')
+def api_timeline(analysis_id):
+    """API endpoint for the full-resolution daily timeline behind the downsampled charts"""
+    analysis_results = _get_results(analysis_id)
+    timeline = analysis_results.get('user_stats', {}).get('activity_timeline') if analysis_results else None
+    if timeline:
+        # {user: {date: count}}; ISO date keys sort chronologically
+        table = pd.DataFrame(timeline).fillna(0).astype(int).sort_index()
+        return jsonify({
+            'dates': list(table.index),
+            'total': table.sum(axis=1).tolist(),
+            'users': {user: table[user].tolist() for user in table.columns}
+        })
+    return jsonify({'error': 'No timeline data available'}), 404
+
+def _chart_key(analysis_id, chart):
+    """Chart store ID of one chart of an analysis"""
+    return hashlib.blake2b(f"{analysis_id}:{chart}".encode('utf-8'), digest_size=16).hexdigest()
+
+def _build_chart(chart, analysis_results):
+    """Figure JSON for ``chart`` from stored results, or None if it does not apply or failed"""
+    method, inputs = CHARTS[chart]
+    try:
+        chart_inputs = inputs(analysis_results)
+    except (KeyError, TypeError, AttributeError) as e:
+        print(f"Missing data for {chart}: {e}")
+        return None
+    return _chart(method)(*chart_inputs) if chart_inputs is not None else None
+
+def _compressed_json(body):
+    """JSON response with a weak ETag, answered with 304 when unchanged and gzipped when accepted"""
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.blake2b(body.encode('utf-8'), digest_size=16).hexdigest(), weak=True)
+    response.cache_control.private = True
+    response.cache_control.max_age = app.config['CHART_MAX_AGE']
+    response.vary.add('Accept-Encoding')
+    response = response.make_conditional(request)
+    if response.status_code == 200 and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(response.get_data(), compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
 
-@app.route('/export/csv')
-def export_csv():
+@app.route('/api/charts/<analysis_id>/<chart>')
+def api_chart(analysis_id, chart):
+    """API endpoint for one chart's Plotly figure, built on first request and cached"""
+    if chart not in CHARTS:
+        return jsonify({'error': 'Unknown chart'}), 404
+    key = _chart_key(analysis_id, chart)
+    cached = chart_store.get(key)
+    if cached is None:
+        analysis_results = _get_results(analysis_id)
+        if not analysis_results:
+            return jsonify({'error': 'No analysis data available'}), 404
+        cached = {'figure': _build_chart(chart, analysis_results)}
+        chart_store.put(cached, analysis_id=key)
+    if cached['figure'] is None:
+        return jsonify({'error': 'Chart not available for this analysis'}), 404
+    return _compressed_json(cached['figure'])
+
+@app.route('/wordcloud/<analysis_id>.png')
+def wordcloud_image(analysis_id):
+    """Word cloud PNG, rendered on first request and cached by its frequency fingerprint"""
+    analysis_results = _get_results(analysis_id)
+    wordcloud = analysis_results.get('wordcloud') if analysis_results else None
+    if not wordcloud:
+        return jsonify({'error': 'No word cloud available'}), 404
+    fingerprint = wordcloud['fingerprint']
+    if fingerprint in request.if_none_match:
+        return app.response_class(status=304, headers={'ETag': f'"{fingerprint}"'})
+    
+    # Identical word counts (the same chat uploaded again) share one rendering
+    cached = chart_store.get(fingerprint)
+    if cached is None:
+        try:
+            png = model_registry.get('wordcloud_generator').render(wordcloud['frequencies'])
+        except Exception as e:
+            print(f"Word cloud rendering failed: {e}")
+            return jsonify({'error': 'Word cloud rendering failed'}), 500
+        cached = {'png': base64.b64encode(png).decode('ascii')}
+        chart_store.put(cached, analysis_id=fingerprint)
+    
+    response = app.response_class(base64.b64decode(cached['png']), mimetype='image/png')
+    response.set_etag(fingerprint)
+    response.cache_control.private = True
+    response.cache_control.max_age = app.config['CHART_MAX_AGE']
+    return response
+
+@app.route('/export/csv/<analysis_id>')
+def export_csv(analysis_id):
     """Export analysis data as CSV"""
-    global analysis_results
+    analysis_results = _get_results(analysis_id)
     if not analysis_results:
         return jsonify({'error': 'No analysis data available'}), 404
     
@@ -343,10 +594,10 @@ def export_csv():
     )
     return response
 
-@app.route('/export/json')
-def export_json():
+@app.route('/export/json/<analysis_id>')
+def export_json(analysis_id):
     """Export analysis data as JSON"""
-    global analysis_results
+    analysis_results = _get_results(analysis_id)
     if not analysis_results:
         return jsonify({'error': 'No analysis data available'}), 404
     
@@ -360,10 +611,31 @@ def export_json():
     )
     return response
 
+def _resident_memory_bytes():
+    """Current resident memory of this worker (peak resident memory where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
 @app.route('/health')
 def health_check():
-    """Health check endpoint for Azure"""
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    """Health check endpoint for Azure, with this worker's startup time, memory and models"""
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'pid': os.getpid(),
+        'startup_seconds': startup_seconds,
+        'rss_bytes': _resident_memory_bytes(),
+        'models': model_registry.status()
+    })
 
 @app.errorhandler(404)
 def not_found_error(error):
@@ -373,6 +645,12 @@ def not_found_error(error):
 def internal_error(error):
     return render_template('500.html'), 500
 
+# Warm the registry before workers fork (gunicorn --preload) so they share the pages;
+# pipeline worker processes import this module too and skip it
+if multiprocessing.parent_process() is None:
+    model_registry.preload([name.strip() for name in app.config['MODEL_PRELOAD'].split(',') if name.strip()])
+startup_seconds = round(time.perf_counter() - _started_at, 3)
+
 # Production WSGI configuration for deployment
 
 if __name__ == '__main__':
@@ -0,0 +1,118 @@
+"""
+Benchmark the chart builders: validated plotly figures against FigureSpec dicts
+
+Builds and serializes every chart the results page loads with both
+ChartGenerator backends, reporting milliseconds and bytes per chart and
+whether the two figures plot the same data (trace arrays and titles;
+styling defaults that Plotly Express adds are not compared).
+
+Usage:
+    python benchmarks/bench_charts.py [--messages 1000000] [--days 1500] [--max-points 100000] [--repeat 5]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_parser import best_of
+from core.activity_cube import ActivityCube, ActivityTotals
+from visualizers.chart_generator import ChartGenerator
+from visualizers import figure_spec
+
+
+def generate_activity(num_messages, num_days, seed=42):
+    """Activity totals of a synthetic chat with a few dozen users over ``num_days`` days"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'datetime': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, num_days * 86400, num_messages), unit='s'),
+        'user': pd.Categorical([f'User {code}' for code in rng.zipf(1.6, num_messages) % 40]),
+        'message_type': pd.Categorical(rng.choice(['text', 'media', 'link', 'document'], num_messages, p=[0.85, 0.1, 0.04, 0.01]))
+    })
+    return ActivityTotals.from_cube(ActivityCube(df))
+
+
+def chart_inputs(activity):
+    emoji_stats = {'top_emojis': [
+        {'emoji': char, 'name': f'Emoji {i}', 'count': 1000 - i * 40, 'percentage': round(5 - i * 0.2, 1)}
+        for i, char in enumerate('😂👍❤🎉😊🔥🙏😭🤣😍🥺✨💀😅🙌👀🤔😢💯🥰')
+    ]}
+    return {
+        'create_timeline_chart': [activity],
+        'create_activity_timeline': [activity],
+        'create_hourly_heatmap': [activity],
+        'create_message_type_chart': [activity],
+        'create_user_activity_chart': [activity],
+        'create_sentiment_pie_chart': [{'positive': 41.9, 'negative': 15.2, 'neutral': 42.9}],
+        'create_emoji_chart': [emoji_stats],
+    }
+
+
+def decoded(value):
+    """Figure JSON with typed arrays expanded to lists, for comparing the backends"""
+    if isinstance(value, dict):
+        if set(value) == {'dtype', 'bdata'}:
+            return np.frombuffer(base64.b64decode(value['bdata']), dtype='<' + value['dtype']).tolist()
+        return {key: decoded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decoded(item) for item in value]
+    return value
+
+
+# Trace properties both backends must agree on
+PLOTTED_KEYS = ('type', 'x', 'y', 'labels', 'values', 'customdata')
+
+
+def plotted(figure_json):
+    """The data a figure plots: each trace's arrays and the layout title"""
+    figure = decoded(json.loads(figure_json))
+    traces = [{key: trace[key] for key in PLOTTED_KEYS if key in trace} for trace in figure['data']]
+    title = figure['layout'].get('title', {})
+    return traces, title.get('text') if isinstance(title, dict) else title
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--messages', type=int, default=1000000)
+    arg_parser.add_argument('--days', type=int, default=1500)
+    arg_parser.add_argument('--max-points', type=int, default=100000, help='timeline points before downsampling')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    activity = generate_activity(args.messages, args.days)
+    print(f"Synthetic chat: {args.messages} messages over {len(activity.dates)} active days, "
+          f"{len(activity.user_counts())} users, orjson {'on' if figure_spec.orjson else 'off'}")
+
+    generators = {backend: ChartGenerator(max_points=args.max_points, backend=backend) for backend in ('plotly', 'spec')}
+    identical = True
+    totals = {backend: [0.0, 0] for backend in generators}
+    print(f"{'chart':28s} {'plotly ms':>10s} {'spec ms':>9s} {'plotly KB':>10s} {'spec KB':>8s}  same")
+    for method, inputs in chart_inputs(activity).items():
+        row = {}
+        for backend, generator in generators.items():
+            seconds, body = best_of(args.repeat, lambda: figure_spec.to_json(getattr(generator, method)(*inputs)))
+            row[backend] = (seconds, body)
+            totals[backend][0] += seconds
+            totals[backend][1] += len(body)
+        same = plotted(row['plotly'][1]) == plotted(row['spec'][1])
+        identical = identical and same
+        print(
+            f"{method:28s} {row['plotly'][0] * 1000:10.2f} {row['spec'][0] * 1000:9.2f} "
+            f"{len(row['plotly'][1]) / 1024:10.1f} {len(row['spec'][1]) / 1024:8.1f}  {same}"
+        )
+    print(
+        f"{'total':28s} {totals['plotly'][0] * 1000:10.2f} {totals['spec'][0] * 1000:9.2f} "
+        f"{totals['plotly'][1] / 1024:10.1f} {totals['spec'][1] / 1024:8.1f}  "
+        f"({totals['plotly'][0] / totals['spec'][0]:.1f}x faster)"
+    )
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
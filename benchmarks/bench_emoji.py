@@ -0,0 +1,108 @@
+"""
+Benchmark the vectorized emoji analyzer against the original iterrows loop
+
+Usage:
+    python benchmarks/bench_emoji.py [--messages 200000] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from collections import Counter
+
+import emoji
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzers.emoji_analyzer import EmojiAnalyzer
+from benchmarks.bench_parser import best_of
+from core.chat_parser import WhatsAppChatParser
+
+# Single-codepoint emoji only, so both engines must agree exactly
+EMOJIS = ['😂', '👍', '❤', '🎉', '😊', '🔥', '🙏', '😭']
+
+
+def generate_chat(num_messages, seed=42):
+    """Synthetic android export where about half the messages carry emoji"""
+    rng = random.Random(seed)
+    users = ['Alice', 'Bob', 'Charlie', 'Dev Patel', '+91 98765 43210']
+    words = ['ok', 'see you', 'good morning', 'haha', 'नमस्ते', 'tomorrow?']
+    lines = []
+    for i in range(num_messages):
+        day = 1 + (i // 500) % 28
+        month = 1 + (i // 14000) % 12
+        hour = i % 24
+        header = f"{day}/{month}/2023, {(hour % 12) or 12}:{i % 60:02d} {'AM' if hour < 12 else 'PM'} - "
+        text = ' '.join(rng.choice(words + EMOJIS) for _ in range(rng.randint(1, 6)))
+        lines.append(f"{header}{rng.choice(users)}: {text}")
+    return '\n'.join(lines)
+
+
+def legacy_analyze_emojis(df):
+    """The original engine: iterrows, one EMOJI_DATA lookup per character"""
+    def name(emoji_char):
+        return emoji.demojize(emoji_char).replace(':', '').replace('_', ' ').title()
+
+    all_emojis = []
+    emoji_data = []
+    for _, row in df.iterrows():
+        message_emojis = [char for char in str(row['message']) if char in emoji.EMOJI_DATA]
+        all_emojis.extend(message_emojis)
+        for emoji_char in message_emojis:
+            emoji_data.append({'datetime': row['datetime'], 'user': row['user'], 'emoji': emoji_char, 'emoji_name': name(emoji_char)})
+    emoji_df = pd.DataFrame(emoji_data)
+
+    total_emojis = len(all_emojis)
+    top_emojis = [
+        {'emoji': char, 'name': name(char), 'count': count, 'percentage': round((count / total_emojis) * 100, 1)}
+        for char, count in Counter(all_emojis).most_common(20)
+    ]
+    user_emoji_stats = {}
+    for user in df['user'].unique():
+        user_emojis = emoji_df[emoji_df['user'] == user]['emoji'].tolist()
+        user_emoji_stats[user] = {
+            'total_emojis': len(user_emojis),
+            'unique_emojis': len(set(user_emojis)),
+            'top_emojis': [{'emoji': char, 'name': name(char), 'count': count} for char, count in Counter(user_emojis).most_common(5)]
+        }
+    emoji_df['date'] = emoji_df['datetime'].dt.date
+    return {
+        'total_emojis': total_emojis,
+        'unique_emojis': len(set(all_emojis)),
+        'top_emojis': top_emojis,
+        'user_emoji_stats': user_emoji_stats,
+        'emoji_timeline': emoji_df.groupby('date').size().reset_index(name='emoji_count')
+    }
+
+
+def comparable(results):
+    results = dict(results)
+    results.pop('emoji_diversity', None)
+    results['emoji_timeline'] = results['emoji_timeline'].astype({'date': str}).to_dict('records')
+    return json.dumps(results, sort_keys=True, default=int)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--messages', type=int, default=200000)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    _, df = best_of(1, WhatsAppChatParser().parse_chat, generate_chat(args.messages))
+    print(f"Synthetic export: {len(df)} messages")
+
+    legacy_time, legacy = best_of(args.repeat, legacy_analyze_emojis, df)
+    current_time, current = best_of(args.repeat, EmojiAnalyzer().analyze_emojis, df)
+    identical = comparable(legacy) == comparable(current)
+
+    print(f"iterrows loop  : {legacy_time:8.3f}s")
+    print(f"analyze_emojis : {current_time:8.3f}s  ({legacy_time / current_time:.2f}x)")
+    print(f"identical output: {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Benchmark the CPU inference backends of the sentiment and toxicity models
+
+Reports throughput and how often each backend's label agrees with the fp32
+pipeline. The quantized and onnx backends read local model copies; pass
+--prepare once (needs network access) to download and export them.
+
+Usage:
+    python benchmarks/bench_inference.py [--task sentiment] [--messages 2000]
+        [--backends pytorch,quantized,onnx] [--model-dir ./models] [--prepare]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzers.inference import BatchedClassifier, save_local_model
+from analyzers import sentiment_analyzer, toxicity_analyzer
+
+TASKS = {
+    'sentiment': (sentiment_analyzer.MODEL_NAME, sentiment_analyzer.load_sentiment_pipeline),
+    'toxicity': (toxicity_analyzer.MODEL_NAME, toxicity_analyzer.load_toxicity_pipeline),
+}
+
+
+def generate_messages(num_messages, seed=42):
+    """Chat-like messages of mixed length, about a third of them repeats"""
+    rng = random.Random(seed)
+    phrases = [
+        'ok', 'haha 😂', 'good morning everyone', 'that was a terrible idea honestly',
+        'love this so much', 'can we move the meeting to tomorrow?', 'shut up you idiot',
+        'I am so proud of you, congratulations on the new job!', 'why would you even say that',
+        'the train is late again, I will be there in 20 minutes', 'not sure how I feel about it',
+    ]
+    messages = []
+    for i in range(num_messages):
+        if messages and rng.random() < 0.3:
+            messages.append(rng.choice(messages))
+        else:
+            messages.append(' '.join(rng.choice(phrases) for _ in range(rng.randint(1, 4))) + f' #{i}')
+    return messages
+
+
+def run_backend(loader, backend, model_dir, messages, batch_size, max_batch_tokens):
+    """Load one backend and score ``messages``; returns (load seconds, score seconds, labels)"""
+    start = time.perf_counter()
+    classifier_pipeline = loader(backend, model_dir)
+    load_seconds = time.perf_counter() - start
+
+    classifier = BatchedClassifier(
+        classifier_pipeline, backend, batch_size=batch_size, max_batch_tokens=max_batch_tokens
+    )
+    start = time.perf_counter()
+    results = classifier.predict(messages)
+    score_seconds = time.perf_counter() - start
+    return load_seconds, score_seconds, [result['label'] if result else None for result in results]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--task', choices=sorted(TASKS), default='sentiment')
+    arg_parser.add_argument('--messages', type=int, default=2000)
+    arg_parser.add_argument('--backends', default='pytorch,quantized,onnx')
+    arg_parser.add_argument('--model-dir', default=os.environ.get('MODEL_CACHE_DIR', './models'))
+    arg_parser.add_argument('--batch-size', type=int, default=32)
+    arg_parser.add_argument('--max-batch-tokens', type=int, default=2048)
+    arg_parser.add_argument('--prepare', action='store_true', help='download the model and export it to ONNX first')
+    args = arg_parser.parse_args()
+
+    model_name, loader = TASKS[args.task]
+    backends = [backend.strip() for backend in args.backends.split(',') if backend.strip()]
+    if args.prepare:
+        print(f"Saving {model_name} to {save_local_model(model_name, args.model_dir, onnx='onnx' in backends)}")
+
+    messages = generate_messages(args.messages)
+    print(f"{args.task}: {len(messages)} messages ({len(set(messages))} distinct), model {model_name}")
+
+    reference = None
+    for backend in ['pytorch'] + [backend for backend in backends if backend != 'pytorch']:
+        try:
+            load_seconds, score_seconds, labels = run_backend(
+                loader, backend, args.model_dir, messages, args.batch_size, args.max_batch_tokens
+            )
+        except Exception as e:
+            print(f"{backend:10s}: unavailable ({e})")
+            continue
+        if reference is None and backend == 'pytorch':
+            reference = labels
+        agreement = (
+            sum(label == expected for label, expected in zip(labels, reference)) / len(labels)
+            if reference is not None else float('nan')
+        )
+        print(
+            f"{backend:10s}: load {load_seconds:6.2f}s  "
+            f"{len(messages) / score_seconds:8.1f} msg/s  "
+            f"agreement with fp32 {agreement:.2%}"
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Benchmark the chat parser header matching against the original loop
+
+Usage:
+    python benchmarks/bench_parser.py [--messages 200000] [--dialect ios] [--workers 4] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.chat_parser import WhatsAppChatParser
+
+
+def generate_chat(num_messages, dialect='android', seed=42):
+    """Build a synthetic export with some multi-line messages
+    
+    ``android`` produces ``d/m/yyyy, h:mm AM - user: text`` headers and
+    ``ios`` produces ``[dd/mm/yyyy, hh:mm:ss] user: text`` headers.
+    """
+    rng = random.Random(seed)
+    users = ['Alice', 'Bob', 'Charlie', 'Dev Patel', '+91 98765 43210']
+    texts = [
+        'good morning everyone',
+        'ok',
+        '<Media omitted>',
+        'check this out https://example.com/article',
+        'haha that was great 😂',
+        'location: https://maps.google.com/?q=1,2',
+        'can we move the meeting to tomorrow?',
+    ]
+    lines = []
+    for i in range(num_messages):
+        day = 1 + (i // 500) % 28
+        month = 1 + (i // 14000) % 12
+        hour = i % 24
+        minute = i % 60
+        if dialect == 'ios':
+            header = f"[{day:02d}/{month:02d}/2023, {hour:02d}:{minute:02d}:00] "
+        else:
+            header = f"{day}/{month}/2023, {(hour % 12) or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'} - "
+        lines.append(f"{header}{rng.choice(users)}: {rng.choice(texts)}")
+        if i % 10 == 0:
+            lines.append('and a second line for this message')
+    return '\n'.join(lines)
+
+
+def legacy_parse(parser, text_content):
+    """The original per-line loop: every uncompiled pattern on every line"""
+    lines = text_content.strip().split('\n')
+    messages = []
+    current_message = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        matched = False
+        for pattern in parser.patterns:
+            match = re.match(pattern, line)
+            if match:
+                if current_message:
+                    messages.append(current_message)
+                date_str, time_str, user, message = match.groups()
+                dt = parser._parse_datetime(date_str, time_str)
+                if dt:
+                    current_message = {
+                        'datetime': dt,
+                        'user': user.strip(),
+                        'message': message.strip(),
+                        'message_type': parser._classify_message_type(message.strip())
+                    }
+                    matched = True
+                    break
+        if not matched and current_message:
+            current_message['message'] += ' ' + line
+    if current_message:
+        messages.append(current_message)
+    return messages
+
+
+def best_of(repeat, func, *args):
+    """Return (best wall time, last result) over ``repeat`` runs"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--messages', type=int, default=200000)
+    arg_parser.add_argument('--dialect', choices=['android', 'ios'], default='android')
+    arg_parser.add_argument('--workers', type=int, default=1,
+                            help='also time the parallel parse mode with this many processes')
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    text = generate_chat(args.messages, args.dialect)
+    parser = WhatsAppChatParser()
+    print(f"Synthetic {args.dialect} export: {args.messages} messages, {len(text) / 1e6:.1f} MB")
+
+    legacy_time, legacy_messages = best_of(args.repeat, legacy_parse, parser, text)
+    current_time, df = best_of(args.repeat, parser.parse_chat, text)
+
+    # Compare values only: the parser emits categorical/Arrow columns
+    legacy_df = pd.DataFrame(legacy_messages).astype({'datetime': 'datetime64[ns]'})
+    try:
+        pd.testing.assert_frame_equal(legacy_df.astype(object), df.astype(object), check_dtype=False)
+        identical = True
+    except AssertionError:
+        identical = False
+
+    print(f"legacy loop : {legacy_time:8.3f}s")
+    print(f"parse_chat  : {current_time:8.3f}s  ({legacy_time / current_time:.2f}x)")
+    print(f"identical output: {identical}")
+
+    if args.workers > 1:
+        parallel = WhatsAppChatParser(workers=args.workers, parallel_threshold=0)
+        parallel_time, parallel_df = best_of(args.repeat, parallel.parse_chat, text)
+        identical = identical and parallel_df.equals(df)
+        print(f"parallel x{args.workers} : {parallel_time:8.3f}s  ({legacy_time / parallel_time:.2f}x)")
+        print(f"identical parallel output: {parallel_df.equals(df)}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
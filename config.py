@@ -8,6 +8,57 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = 'uploads'
+    # Chat parsing: worker processes, and the export size above which they are used
+    PARSER_WORKERS = int(os.environ.get('PARSER_WORKERS', 1))
+    PARALLEL_PARSE_THRESHOLD = int(os.environ.get('PARALLEL_PARSE_THRESHOLD', 8 * 1024 * 1024))
+    # Largest chat transcript a .zip export may decompress to
+    ARCHIVE_MAX_CHAT_BYTES = int(os.environ.get('ARCHIVE_MAX_CHAT_BYTES', 256 * 1024 * 1024))
+    # Results cache keyed by upload content; invalidated when analysis code changes
+    ANALYSIS_CACHE_ENABLED = os.environ.get('ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'
+    ANALYSIS_CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR', 'cache/analysis')
+    ANALYSIS_CACHE_MAX_BYTES = int(os.environ.get('ANALYSIS_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    # Per-analysis result store ('memory' is per worker, 'disk' is shared by all workers)
+    RESULT_STORE_BACKEND = os.environ.get('RESULT_STORE_BACKEND', 'memory')
+    RESULT_STORE_DIR = os.environ.get('RESULT_STORE_DIR', 'cache/results')
+    RESULT_TTL_SECONDS = int(os.environ.get('RESULT_TTL_SECONDS', 24 * 3600))
+    RESULT_STORE_MAX_BYTES = int(os.environ.get('RESULT_STORE_MAX_BYTES', 256 * 1024 * 1024))
+    # Background analysis jobs: concurrent workers, accepted jobs and shared status
+    ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', 2))
+    ANALYSIS_QUEUE_SIZE = int(os.environ.get('ANALYSIS_QUEUE_SIZE', 8))
+    JOB_STATUS_DIR = os.environ.get('JOB_STATUS_DIR', 'cache/jobs')
+    # Charts built on request: shared store of built figures and how long browsers may reuse them
+    CHART_STORE_DIR = os.environ.get('CHART_STORE_DIR', 'cache/charts')
+    CHART_MAX_AGE = int(os.environ.get('CHART_MAX_AGE', 3600))
+    # Figure builder: 'spec' (plain dicts, typed arrays, orjson) or 'plotly' (validated graph objects)
+    CHART_BACKEND = os.environ.get('CHART_BACKEND', 'spec')
+    # Word cloud image size in pixels
+    WORDCLOUD_WIDTH = int(os.environ.get('WORDCLOUD_WIDTH', 800))
+    WORDCLOUD_HEIGHT = int(os.environ.get('WORDCLOUD_HEIGHT', 400))
+    # Stage scheduler: threads per analysis, and shared processes for CPU-bound stages (0 = threads only)
+    PIPELINE_WORKERS = int(os.environ.get('PIPELINE_WORKERS', 4))
+    PIPELINE_PROCESSES = int(os.environ.get('PIPELINE_PROCESSES', 2))
+    # Keyword trends: period ('day' or 'week'), recent window and baseline, in periods
+    TREND_PERIOD = os.environ.get('TREND_PERIOD', 'week')
+    TREND_WINDOW = int(os.environ.get('TREND_WINDOW', 1))
+    TREND_BASELINE = int(os.environ.get('TREND_BASELINE', 4))
+    # Timeline charts: points per line before bucketing by week/month and LTTB, and users shown before "Others"
+    TIMELINE_MAX_POINTS = int(os.environ.get('TIMELINE_MAX_POINTS', 500))
+    TIMELINE_TOP_USERS = int(os.environ.get('TIMELINE_TOP_USERS', 10))
+    # Model inference: models on/off, batch size, token truncation, padded tokens per batch and cached scores per worker
+    SENTIMENT_MODEL_ENABLED = os.environ.get('SENTIMENT_MODEL_ENABLED', 'false').lower() == 'true'
+    TOXICITY_MODEL_ENABLED = os.environ.get('TOXICITY_MODEL_ENABLED', 'false').lower() == 'true'
+    INFERENCE_BATCH_SIZE = int(os.environ.get('INFERENCE_BATCH_SIZE', 32))
+    INFERENCE_MAX_LENGTH = int(os.environ.get('INFERENCE_MAX_LENGTH', 128))
+    INFERENCE_MAX_BATCH_TOKENS = int(os.environ.get('INFERENCE_MAX_BATCH_TOKENS', 2048))
+    INFERENCE_CACHE_SIZE = int(os.environ.get('INFERENCE_CACHE_SIZE', 100000))
+    # CPU backend per model ('pytorch' fp32, 'quantized' dynamic int8, 'onnx' ONNX Runtime) and local model copies
+    SENTIMENT_BACKEND = os.environ.get('SENTIMENT_BACKEND', 'pytorch')
+    TOXICITY_BACKEND = os.environ.get('TOXICITY_BACKEND', 'pytorch')
+    MODEL_CACHE_DIR = os.environ.get('MODEL_CACHE_DIR', './models')
+    # Model registry: release models idle this long (0 = never) and names to load at startup
+    # (sentiment, toxicity, chart_generator, wordcloud_generator), e.g. in the gunicorn --preload master
+    MODEL_IDLE_SECONDS = int(os.environ.get('MODEL_IDLE_SECONDS', 1800))
+    MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', '')
     
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -19,11 +70,14 @@ class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
     SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
+    # Gunicorn runs several workers, so results must be visible to all of them
+    RESULT_STORE_BACKEND = os.environ.get('RESULT_STORE_BACKEND', 'disk')
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     DEBUG = True
+    ANALYSIS_CACHE_ENABLED = False
 
 config = {
     'development': DevelopmentConfig,
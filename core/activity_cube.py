@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+# Dense counting is used while the cube has at most this many cells per message
+_DENSE_CELLS_PER_MESSAGE = 4
+
+
+class ActivityCube:
+    """Message counts by (day, hour, user, message type), aggregated once per analysis
+
+    Only occupied cells are stored: ``day`` (offset from ``first_day``),
+    ``hour``, ``user`` (code into ``users``), ``message_type`` (code into
+    ``message_types``) and ``count``, sorted by that key. Daily, hourly,
+    weekday, per-user and per-type totals are bincounts over the cells, so
+    charts never touch the chat DataFrame. ``message_day`` and
+    ``message_user`` keep each message's codes for stages that aggregate
+    their own values on the same axes.
+    """
+
+    def __init__(self, df):
+        users = df['user'].astype('category')
+        types = df['message_type'].astype('category')
+        self.users = users.cat.categories
+        self.message_types = types.cat.categories
+        self.message_count = len(df)
+
+        timestamps = df['datetime'].to_numpy(dtype='datetime64[ns]')
+        days = timestamps.astype('datetime64[D]')
+        self.first_day = days.min() if len(days) else np.datetime64('1970-01-01', 'D')
+        self.message_day = (days - self.first_day).astype(np.int64)
+        self.message_user = users.cat.codes.to_numpy().astype(np.int64)
+        self.n_days = int(self.message_day.max()) + 1 if len(days) else 0
+
+        hours = (timestamps - days).astype('timedelta64[h]').astype(np.int64)
+        shape = (self.n_days, 24, len(self.users), len(self.message_types))
+        keys = np.ravel_multi_index(
+            (self.message_day, hours, self.message_user, types.cat.codes.to_numpy().astype(np.int64)), shape
+        ) if len(df) else np.zeros(0, dtype=np.int64)
+
+        # bincount while the dense cube is small, a sort otherwise
+        size = int(np.prod(shape))
+        if size <= max(_DENSE_CELLS_PER_MESSAGE * len(keys), 1 << 16):
+            counts = np.bincount(keys, minlength=size)
+            keys = np.flatnonzero(counts)
+            counts = counts[keys]
+        else:
+            keys, counts = np.unique(keys, return_counts=True)
+        self.day, self.hour, self.user, self.message_type = (
+            axis.astype(np.int64) for axis in np.unravel_index(keys, shape)
+        ) if len(keys) else (np.zeros(0, dtype=np.int64),) * 4
+        self.count = counts.astype(np.int64)
+
+    def __len__(self):
+        """Occupied cells"""
+        return len(self.count)
+
+    def dates(self):
+        """Calendar date of every day offset, as datetime64[D]"""
+        return self.first_day + np.arange(self.n_days)
+
+    def daily(self):
+        return self._total(self.day, self.n_days)
+
+    def active_days(self):
+        """``(dates, counts)`` of the days with messages, dates as ``datetime.date``"""
+        counts = self.daily()
+        active = np.flatnonzero(counts)
+        return self.dates()[active].astype(object), counts[active]
+
+    def hourly(self):
+        return self._total(self.hour, 24)
+
+    def weekday(self):
+        """Messages per weekday, Monday first"""
+        epoch_days = self.first_day.astype(np.int64) + self.day
+        return self._total((epoch_days + 3) % 7, 7)  # 1970-01-01 was a Thursday
+
+    def by_user(self):
+        """Messages per user code"""
+        return self._total(self.user, len(self.users))
+
+    def by_type(self):
+        """Messages per message type code"""
+        return self._total(self.message_type, len(self.message_types))
+
+    def user_counts(self):
+        """Series like ``df['user'].value_counts()``"""
+        return pd.Series(self.by_user(), index=self.users, name='count').sort_values(ascending=False, kind='stable')
+
+    def type_counts(self):
+        """Series like ``df['message_type'].value_counts()``"""
+        return pd.Series(self.by_type(), index=self.message_types, name='count').sort_values(ascending=False, kind='stable')
+
+    def daily_by_user(self):
+        """Date x user table of message counts over the active days and users"""
+        key = self.day * len(self.users) + self.user
+        counts = np.bincount(key, weights=self.count, minlength=self.n_days * len(self.users)).astype(np.int64)
+        table = counts.reshape(self.n_days, len(self.users))
+        days = np.flatnonzero(table.any(axis=1))
+        users = np.flatnonzero(table.any(axis=0))
+        return pd.DataFrame(
+            table[np.ix_(days, users)],
+            index=pd.Index(self.dates()[days].astype(object), name='date'),
+            columns=pd.Index(self.users[users], name='user')
+        )
+
+    def _total(self, axis, size):
+        return np.bincount(axis, weights=self.count, minlength=size).astype(np.int64)
+
+
+class ActivityTotals:
+    """The marginal counts of an ``ActivityCube`` that the activity charts read
+
+    Small enough to store with the results, so charts can be built later
+    (on request) without the cube or the chat DataFrame.
+    """
+
+    def __init__(self, dates, daily, hourly, user_counts, type_counts):
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.daily = np.asarray(daily, dtype=np.int64)
+        self._hourly = np.asarray(hourly, dtype=np.int64)
+        self._user_counts = user_counts
+        self._type_counts = type_counts
+
+    @classmethod
+    def from_cube(cls, cube):
+        counts = cube.daily()
+        active = np.flatnonzero(counts)
+        return cls(cube.dates()[active], counts[active], cube.hourly(), cube.user_counts(), cube.type_counts())
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['dates'], data['daily'], data['hourly'],
+            pd.Series(data['user_counts'], index=pd.Index(data['users']), name='count', dtype=np.int64),
+            pd.Series(data['type_counts'], index=pd.Index(data['message_types']), name='count', dtype=np.int64)
+        )
+
+    def to_dict(self):
+        """JSON-serializable form, read back with ``from_dict``"""
+        return {
+            'dates': [str(date) for date in self.dates],
+            'daily': self.daily.tolist(),
+            'hourly': self._hourly.tolist(),
+            'users': [str(user) for user in self._user_counts.index],
+            'user_counts': self._user_counts.tolist(),
+            'message_types': [str(message_type) for message_type in self._type_counts.index],
+            'type_counts': self._type_counts.tolist()
+        }
+
+    def active_days(self):
+        return self.dates.astype(object), self.daily
+
+    def hourly(self):
+        return self._hourly
+
+    def user_counts(self):
+        return self._user_counts
+
+    def type_counts(self):
+        return self._type_counts
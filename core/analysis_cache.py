@@ -0,0 +1,107 @@
+import os
+import json
+import hashlib
+import tempfile
+
+# Source trees whose code determines the analysis output
+_VERSIONED_PATHS = ['analyzers', 'core', 'visualizers', 'app.py']
+
+
+def code_version(root=None):
+    """Hash the analysis source code so cached results die with code changes"""
+    root = root or os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    for relative in _VERSIONED_PATHS:
+        path = os.path.join(root, relative)
+        if os.path.isfile(path):
+            files = [path]
+        else:
+            files = sorted(
+                os.path.join(directory, name)
+                for directory, _, names in os.walk(path)
+                for name in names if name.endswith('.py')
+            )
+        for file_path in files:
+            digest.update(os.path.relpath(file_path, root).encode('utf-8'))
+            with open(file_path, 'rb') as source:
+                digest.update(source.read())
+    return digest.hexdigest()[:16]
+
+
+class AnalysisCache:
+    """Content-addressed on-disk cache of serialized analysis results
+
+    Entries are JSON files named by a hash of the uploaded chat, the analysis
+    options and the code version. Reading an entry refreshes its mtime, and
+    the least recently used entries are evicted once the directory grows
+    past ``max_bytes``.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, version=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version or code_version()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key_for(self, content_digest, options=None):
+        """Cache key for an upload's content hash and the analysis options"""
+        payload = json.dumps({
+            'content': content_digest,
+            'options': options or {},
+            'version': self.version
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached results for ``key``, or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as entry:
+                results = json.load(entry)
+        except (OSError, ValueError):
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return results
+
+    def put(self, key, results):
+        """Store JSON-serializable ``results`` under ``key`` and enforce the size bound"""
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as entry:
+                json.dump(results, entry)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in ``max_bytes``"""
+        entries = []
+        total_bytes = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_bytes += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total_bytes -= size
+            except OSError:
+                continue
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
@@ -0,0 +1,161 @@
+import io
+import os
+import re
+import zipfile
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# Attachment types by file extension, as found in "Export chat" archives
+MEDIA_EXTENSIONS = {
+    'image': {'.jpg', '.jpeg', '.png', '.gif', '.heic'},
+    'video': {'.mp4', '.mov', '.3gp', '.avi', '.mkv'},
+    'audio': {'.opus', '.ogg', '.m4a', '.mp3', '.aac', '.amr', '.wav'},
+    'sticker': {'.webp'},
+    'document': {'.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.vcf', '.zip'},
+}
+
+# First file name in a message, e.g. "IMG-20230101-WA0001.jpg (file attached)"
+# or "<attached: 00000012-PHOTO-2023-01-01-10-00-00.jpg>"
+FILE_NAME_PATTERN = r'([^\s<>:/\\]+\.[A-Za-z0-9]{2,5})'
+
+
+class ArchiveTooLarge(ValueError):
+    """The chat transcript decompresses to more than the allowed size"""
+
+
+class _LimitedStream(io.RawIOBase):
+    """Raw stream over a zip member that fails once more than ``max_bytes`` come out of it
+
+    The declared size in the archive is checked up front, but it is written
+    by whoever built the archive, so the limit is also enforced on the
+    bytes actually decompressed.
+    """
+
+    def __init__(self, stream, max_bytes):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self.stream.readinto(buffer)
+        self.bytes_read += count
+        if self.bytes_read > self.max_bytes:
+            raise ArchiveTooLarge(f"Chat transcript decompresses to more than {self.max_bytes} bytes")
+        return count
+
+    def close(self):
+        self.stream.close()
+        super().close()
+
+
+class ChatArchive:
+    """Read a WhatsApp "Export chat" .zip without extracting it to disk
+
+    With ``max_chat_bytes``, archives whose transcript declares or
+    decompresses to more than that many bytes raise ``ArchiveTooLarge``.
+    """
+
+    def __init__(self, path, max_chat_bytes=None):
+        self.max_chat_bytes = max_chat_bytes
+        self.zip_file = zipfile.ZipFile(path)
+        try:
+            self.chat_member = self._find_chat_member()
+            if max_chat_bytes is not None and self.chat_member.file_size > max_chat_bytes:
+                raise ArchiveTooLarge(
+                    f"Chat transcript declares {self.chat_member.file_size} bytes, more than {max_chat_bytes}"
+                )
+        except Exception:
+            self.zip_file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.zip_file.close()
+
+    def _find_chat_member(self):
+        """Pick the chat transcript: ``_chat.txt`` if present, else the largest .txt"""
+        text_members = [
+            info for info in self.zip_file.infolist()
+            if not info.is_dir() and info.filename.lower().endswith('.txt')
+        ]
+        if not text_members:
+            raise ValueError("No chat .txt file found in the archive")
+
+        for info in text_members:
+            if os.path.basename(info.filename) == '_chat.txt':
+                return info
+        return max(text_members, key=lambda info: info.file_size)
+
+    def open_chat(self):
+        """Open the transcript as a binary stream, decompressed as it is read"""
+        stream = self.zip_file.open(self.chat_member)
+        if self.max_chat_bytes is None:
+            return stream
+        return io.BufferedReader(_LimitedStream(stream, self.max_chat_bytes))
+
+    def _media_members(self):
+        """``(info, kind)`` of every attachment in the archive"""
+        for info in self.zip_file.infolist():
+            if info.is_dir() or info.filename == self.chat_member.filename:
+                continue
+            extension = os.path.splitext(info.filename)[1].lower()
+            kind = next(
+                (kind for kind, extensions in MEDIA_EXTENSIONS.items() if extension in extensions),
+                'other'
+            )
+            yield info, kind
+
+    def media_inventory(self):
+        """Count attachments by type from the central directory alone
+
+        Only names and sizes in the archive index are read; media members
+        are never decompressed.
+        """
+        counts = Counter()
+        total_bytes = 0
+        for info, kind in self._media_members():
+            counts[kind] += 1
+            total_bytes += info.file_size
+
+        return {
+            'total_files': sum(counts.values()),
+            'total_bytes': total_bytes,
+            'by_type': dict(counts)
+        }
+
+    def classify_attachments(self, messages, message_types):
+        """Relabel text messages that name an attachment stored in the archive
+
+        Exports made with media write the attachment's file name into the
+        message instead of "<Media omitted>", so the keyword classifier sees
+        plain text. A text message whose first file name is one of the
+        archive's attachments becomes a ``document`` message for documents
+        and a ``media`` message for everything else. Returns a new
+        Categorical with the categories of ``message_types``.
+        """
+        attachment_types = {
+            os.path.basename(info.filename): 'document' if kind == 'document' else 'media'
+            for info, kind in self._media_members()
+        }
+        message_types = pd.Categorical(message_types)
+        categories = list(message_types.categories)
+        codes = np.asarray(message_types.codes).copy()
+        if not attachment_types:
+            return pd.Categorical.from_codes(codes, categories=categories)
+
+        text_rows = np.flatnonzero(codes == categories.index('text'))
+        file_names = pd.Series(messages).iloc[text_rows].str.extract(FILE_NAME_PATTERN, expand=False)
+        relabelled = file_names.map(attachment_types).astype(object).to_numpy()
+        found = pd.notna(relabelled)
+        codes[text_rows[found]] = [categories.index(label) for label in relabelled[found]]
+        return pd.Categorical.from_codes(codes, categories=categories)
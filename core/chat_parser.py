@@ -1,11 +1,47 @@
+import os
 import re
+import mmap
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from core.pipeline import process_context
+
+try:
+    import pyarrow  # noqa: F401
+    # Message text lives in one contiguous Arrow buffer instead of Python objects
+    MESSAGE_DTYPE = 'string[pyarrow]'
+except ImportError:
+    MESSAGE_DTYPE = object
+
+# Fixed message type categories; the column stores them as int8 codes
+MESSAGE_TYPES = ['text', 'media', 'document', 'link', 'location']
+
+# Keywords per non-text type, in classification priority order
+MESSAGE_TYPE_KEYWORDS = [
+    ('media', ['<media omitted>', 'image omitted', 'video omitted', 'audio omitted']),
+    ('document', ['document omitted', 'contact card omitted']),
+    ('link', ['http']),
+    ('location', ['location:', 'live location']),
+]
+
 class WhatsAppChatParser:
-    """Parser for WhatsApp chat exports with multiple date format support"""
+    """Parser for WhatsApp chat exports with multiple date format support
+    
+    Parsed frames are columnar: ``user`` and ``message_type`` are
+    categoricals (integer codes plus a lookup table), ``datetime`` is
+    datetime64[ns] and ``message`` uses an Arrow string buffer when pyarrow
+    is installed.
+    """
     
-    def __init__(self):
+    def __init__(self, workers=1, parallel_threshold=8 * 1024 * 1024):
+        # Parallel parsing is used for in-memory exports of at least
+        # ``parallel_threshold`` characters/bytes when ``workers`` > 1
+        self.workers = workers
+        self.parallel_threshold = parallel_threshold
+        
         # Common WhatsApp export patterns
         self.patterns = [
             r'^(\d{1,2}/\d{1,2}/\d{4}),\s(\d{1,2}:\d{2}\s(?:AM|PM))\s-\s([^:]+):\s(.+)$',
@@ -20,6 +56,7 @@ class WhatsAppChatParser:
             '%d/%m/%Y',
             '%d/%m/%y', 
             '%m/%d/%Y',
+            '%m/%d/%y',
             '%d.%m.%y'
         ]
         
@@ -28,66 +65,339 @@ class WhatsAppChatParser:
             '%H:%M',     # 24-hour format
             '%H:%M:%S'   # 24-hour format with seconds
         ]
+        
+        # Compile header patterns once; the export's dialect is detected per file
+        self.compiled_patterns = [re.compile(pattern) for pattern in self.patterns]
+        self.dialect_sample_size = 200
+        
+        self._reset_state()
+    
+    def _reset_state(self):
+        """Forget everything learned from the previous export"""
+        # Memoized format candidates per distinct date/time string
+        self._date_candidates = {}
+        self._time_candidates = {}
+        self._locked_formats = None
+        
+        # User lookup table; codes stay stable across streamed chunks
+        self.user_categories = []
+        self._user_codes = {}
+    
+    def parse_chat(self, source):
+        """Parse chat content and return DataFrame
+        
+        ``source`` may be the decoded export text, raw bytes, a file-like
+        object (text or binary) or any iterable of lines. Large in-memory
+        exports are parsed in parallel when the parser has more than one
+        worker.
+        """
+        if self.workers > 1:
+            if hasattr(source, 'read'):
+                source = source.read()
+            if isinstance(source, (str, bytes)) and len(source) >= self.parallel_threshold:
+                return self._parse_parallel(source)
+        
+        chunks = list(self.iter_chunks(source, chunk_size=None))
+        return chunks[0] if chunks else None
+    
+    def parse_file(self, path):
+        """Parse an export on disk through a read-only memory map
+        
+        Line boundaries are found on the mapped bytes and each line is
+        decoded on its own, so the export never exists as one decoded string
+        or as a list of lines. With more than one worker, large files are
+        split into byte ranges that the worker processes map themselves.
+        """
+        with open(path, 'rb') as handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                print("Parsing complete: 0 messages parsed, 0 lines unmatched")
+                return None
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if self.workers > 1 and len(mapped) >= self.parallel_threshold:
+                    return self._parse_parallel(mapped, path=path)
+                chunks = list(self.iter_chunks(mapped, chunk_size=None))
+                return chunks[0] if chunks else None
+    
+    def iter_chunks(self, source, chunk_size=100000):
+        """Parse ``source`` incrementally, yielding a DataFrame every ``chunk_size`` messages
+        
+        A message is only emitted once the next header (or the end of input)
+        is seen, so multi-line messages are never split across chunks. The
+        date/time formats are locked when the first chunk is emitted, and
+        later timestamps that do not fit them are parsed individually; with
+        ``chunk_size=None`` everything is emitted as one chunk and the formats
+        are resolved over the whole export. Join the chunks with
+        ``concat_chunks`` to keep ``user`` categorical.
+        """
+        lines = self._iter_lines(source)
+        head = list(itertools.islice(lines, self.dialect_sample_size))
+        matchers = self._matchers_for(self.detect_dialect(head))
+        self._reset_state()
+        
+        stats = {'parsed': 0, 'unmatched': 0}
+        emitted = 0
+        for columns in self._scan_lines(itertools.chain(head, lines), matchers, chunk_size, stats):
+            yield self._build_frame(columns, emitted)
+            emitted += len(columns[3])
+        
+        print(f"Parsing complete: {stats['parsed']} messages parsed, {stats['unmatched']} lines unmatched")
     
-    def parse_chat(self, text_content):
-        """Parse chat content and return DataFrame"""
-        lines = text_content.strip().split('\n')
-        messages = []
-        current_message = None
+    def concat_chunks(self, chunks):
+        """Concatenate the frames of ``iter_chunks`` into one chat table
         
-        parsed_count = 0
-        unmatched_count = 0
+        Each chunk's ``user`` categories are the lookup table as it stood
+        when the chunk was emitted, a prefix of the final table. The chunks
+        are widened to the final table (their codes do not change) before
+        concatenating, so ``user`` stays categorical instead of falling
+        back to object dtype.
+        """
+        chunks = list(chunks)
+        if not chunks:
+            return None
+        categories = pd.Index(list(self.user_categories), dtype=object)
+        return pd.concat([
+            chunk.assign(user=chunk['user'].cat.set_categories(categories)) for chunk in chunks
+        ])
+    
+    def _scan_lines(self, lines, matchers, chunk_size, stats):
+        """Match headers line by line, yielding raw column buffers
+        
+        Buffers hold (dates, times, user codes, messages, header texts).
+        Header texts are only kept for multi-line messages, keyed by row, so
+        those can still be classified by their first line. With a
+        ``chunk_size`` a full buffer is yielded as soon as the next message
+        starts; whatever is left is yielded at the end of input.
+        """
+        # Column buffers; the datetime column is resolved when a chunk is emitted
+        columns = self._empty_columns()
+        dates, times, users, messages, headers = columns
+        started = False
         
         for line_num, line in enumerate(lines, 1):
             line = line.strip()
             if not line:
                 continue
             
-            # Try to match against all patterns
+            # Headers always start with a digit or '[', so continuation lines
+            # are rejected without running any regex
             matched = False
-            for pattern in self.patterns:
-                match = re.match(pattern, line)
-                if match:
-                    # If we have a previous message, save it
-                    if current_message:
-                        messages.append(current_message)
-                    
-                    # Parse new message
-                    date_str, time_str, user, message = match.groups()
-                    
-                    # Try to parse datetime
-                    dt = self._parse_datetime(date_str, time_str)
-                    if dt:
-                        current_message = {
-                            'datetime': dt,
-                            'user': user.strip(),
-                            'message': message.strip(),
-                            'message_type': self._classify_message_type(message.strip())
-                        }
-                        parsed_count += 1
-                        matched = True
-                        break
+            if line[0].isdigit() or line[0] == '[':
+                for pattern in matchers:
+                    match = pattern.match(line)
+                    if match:
+                        date_str, time_str, user, message = match.groups()
+                        
+                        # Only lines with a parseable timestamp start a message
+                        if self._is_valid_timestamp(date_str, time_str):
+                            # Every buffered message is complete now
+                            if chunk_size and len(messages) >= chunk_size:
+                                yield columns
+                                columns = self._empty_columns()
+                                dates, times, users, messages, headers = columns
+                            
+                            dates.append(date_str)
+                            times.append(time_str)
+                            users.append(self._user_code(user.strip()))
+                            messages.append(message.strip())
+                            stats['parsed'] += 1
+                            started = True
+                            matched = True
+                            break
             
             if not matched:
                 # This might be a continuation of the previous message
-                if current_message:
-                    current_message['message'] += ' ' + line
+                if started:
+                    headers.setdefault(len(messages) - 1, messages[-1])
+                    messages[-1] += ' ' + line
                 else:
-                    unmatched_count += 1
-                    if unmatched_count < 10:  # Only print first few unmatched lines
+                    stats['unmatched'] += 1
+                    if stats['unmatched'] < 10:  # Only print first few unmatched lines
                         print(f"Unmatched line {line_num}: {line[:100]}...")
         
-        # Don't forget the last message
-        if current_message:
-            messages.append(current_message)
+        if messages:
+            yield columns
+    
+    def _parse_parallel(self, text, path=None):
+        """Parse an export on a process pool
+        
+        The text is cut only at lines that start a message, so every piece
+        holds whole messages and no stitching is needed where pieces meet.
+        Pieces are scanned in worker processes; their columns, user tables
+        and format candidates are merged here in order, and the formats are
+        resolved over the whole export as in the serial path. When ``text``
+        is a memory map of ``path``, workers receive byte ranges instead of
+        copies of the text.
+        """
+        newline = '\n' if isinstance(text, str) else b'\n'
+        head = itertools.islice(self._iter_lines(text[:64 * 1024]), self.dialect_sample_size)
+        dialect = self.detect_dialect(head)
+        self._reset_state()
+        
+        bounds = self._split_points(text, self.workers, self._matchers_for(dialect), newline)
+        if path is not None:
+            pieces = [(path, start, end) for start, end in zip(bounds, bounds[1:])]
+        else:
+            pieces = [text[start:end] for start, end in zip(bounds, bounds[1:])]
+        if len(pieces) < 2:
+            chunks = list(self.iter_chunks(text, chunk_size=None))
+            return chunks[0] if chunks else None
+        
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(pieces)), mp_context=process_context()) as executor:
+            results = list(executor.map(_parse_piece, pieces, itertools.repeat(dialect)))
         
-        print(f"Parsing complete: {parsed_count} messages parsed, {unmatched_count} lines unmatched")
+        dates, times, users, messages, headers = self._empty_columns()
+        parsed_count = unmatched_count = 0
+        for piece in results:
+            # Re-intern each piece's users into the shared lookup table
+            remap = np.asarray([self._user_code(user) for user in piece['user_categories']], dtype=np.int32)
+            headers.update((len(messages) + row, text) for row, text in piece['headers'].items())
+            dates.extend(piece['dates'])
+            times.extend(piece['times'])
+            users.extend(remap[np.asarray(piece['users'], dtype=np.int32)].tolist())
+            messages.extend(piece['messages'])
+            self._date_candidates.update(piece['date_candidates'])
+            self._time_candidates.update(piece['time_candidates'])
+            parsed_count += piece['parsed']
+            unmatched_count += piece['unmatched']
+        
+        print(f"Parsing complete: {parsed_count} messages parsed, {unmatched_count} lines unmatched "
+              f"({len(pieces)} pieces)")
         
         if not messages:
             return None
+        return self._build_frame((dates, times, users, messages, headers), 0)
+    
+    def _split_points(self, text, pieces, matchers, newline):
+        """Offsets that cut ``text`` into about ``pieces`` parts at message headers"""
+        bounds = [0]
+        for k in range(1, pieces):
+            pos = max(len(text) * k // pieces, bounds[-1])
+            while True:
+                newline_pos = text.find(newline, pos)
+                if newline_pos == -1:
+                    pos = len(text)
+                    break
+                start = newline_pos + 1
+                end = text.find(newline, start)
+                if end == -1:
+                    end = len(text)
+                line = text[start:end]
+                if isinstance(line, bytes):
+                    line = line.decode('utf-8', errors='ignore')
+                if self._starts_message(line.strip(), matchers):
+                    pos = start
+                    break
+                pos = end
+            if bounds[-1] < pos < len(text):
+                bounds.append(pos)
+        bounds.append(len(text))
+        return bounds
+    
+    def _starts_message(self, line, matchers):
+        """Whether ``line`` (already stripped) would start a new message"""
+        if not line or not (line[0].isdigit() or line[0] == '['):
+            return False
+        for pattern in matchers:
+            match = pattern.match(line)
+            if match:
+                date_str, time_str = match.group(1), match.group(2)
+                if self._is_valid_timestamp(date_str, time_str):
+                    return True
+        return False
+    
+    def _iter_lines(self, source):
+        """Iterate over the text lines of ``source`` without decoding it all at once"""
+        if isinstance(source, mmap.mmap):
+            return (line.decode('utf-8', errors='ignore') for line in self._iter_mmap_lines(source))
+        if isinstance(source, bytes):
+            source = source.decode('utf-8', errors='ignore')
+        if isinstance(source, str):
+            return iter(source.split('\n'))
+        return (
+            line.decode('utf-8', errors='ignore') if isinstance(line, bytes) else line
+            for line in source
+        )
+    
+    def _iter_mmap_lines(self, mapped, start=0, end=None):
+        """Yield the raw bytes of each line of ``mapped`` between ``start`` and ``end``"""
+        end = len(mapped) if end is None else end
+        pos = start
+        while pos < end:
+            newline_pos = mapped.find(b'\n', pos, end)
+            if newline_pos == -1:
+                newline_pos = end
+            yield mapped[pos:newline_pos]
+            pos = newline_pos + 1
+    
+    def _user_code(self, user):
+        """Intern ``user`` and return its integer code"""
+        code = self._user_codes.get(user)
+        if code is None:
+            code = len(self.user_categories)
+            self._user_codes[user] = code
+            self.user_categories.append(user)
+        return code
+    
+    def _empty_columns(self):
+        """Fresh buffers for date, time, user, message and multi-line message headers"""
+        return [], [], [], [], {}
+    
+    def _build_frame(self, columns, offset):
+        """Turn buffered columns into a DataFrame indexed from ``offset``"""
+        dates, times, users, messages, headers = columns
+        if self._locked_formats is None:
+            self._locked_formats = self.resolve_formats()
+        
+        # Codes index into the lookup table as it stands now; later chunks
+        # only ever append to it
+        user_codes = np.asarray(users, dtype=np.int32)
+        user_column = pd.Categorical.from_codes(
+            user_codes, categories=pd.Index(list(self.user_categories), dtype=object)
+        )
         
-        df = pd.DataFrame(messages)
-        return df
+        message_column = pd.Series(pd.array(messages, dtype=MESSAGE_DTYPE))
+        
+        return pd.DataFrame({
+            'datetime': self._build_datetime_column(dates, times, self._locked_formats),
+            'user': user_column,
+            'message': message_column.array,
+            'message_type': self._classify_columns(message_column, headers)
+        }, index=pd.RangeIndex(offset, offset + len(messages)))
+    
+    def detect_dialect(self, lines):
+        """Return the index of the header pattern used by this export, or None
+        
+        Only the first ``dialect_sample_size`` non-empty lines are inspected.
+        """
+        hits = [0] * len(self.compiled_patterns)
+        sampled = 0
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            sampled += 1
+            if sampled > self.dialect_sample_size:
+                break
+            for idx, pattern in enumerate(self.compiled_patterns):
+                if pattern.match(line):
+                    hits[idx] += 1
+                    break
+        
+        best = max(range(len(hits)), key=hits.__getitem__)
+        return best if hits[best] else None
+    
+    def _matchers_for(self, dialect):
+        """Order compiled patterns so the detected dialect is tried first
+        
+        The header patterns are mutually exclusive, so trying the dialect
+        first and keeping the rest as a fallback gives the same result as
+        trying them in declaration order.
+        """
+        if dialect is None:
+            return list(self.compiled_patterns)
+        return [self.compiled_patterns[dialect]] + [
+            pattern for idx, pattern in enumerate(self.compiled_patterns) if idx != dialect
+        ]
     
     def _parse_datetime(self, date_str, time_str):
         """Parse date and time strings into datetime object"""
@@ -101,6 +411,135 @@ class WhatsAppChatParser:
                     continue
         return None
     
+    def _is_valid_timestamp(self, date_str, time_str):
+        """Check that some date format and some time format accept the strings
+        
+        Format candidates are memoized per distinct string, so strptime only
+        runs once per day and per minute of the export.
+        """
+        date_candidates = self._date_candidates.get(date_str)
+        if date_candidates is None:
+            date_candidates = self._format_candidates(date_str, self.date_formats)
+            self._date_candidates[date_str] = date_candidates
+        if not date_candidates:
+            return False
+        
+        time_candidates = self._time_candidates.get(time_str)
+        if time_candidates is None:
+            time_candidates = self._format_candidates(self._normalize_time(time_str), self.time_formats)
+            self._time_candidates[time_str] = time_candidates
+        return bool(time_candidates)
+    
+    def _format_candidates(self, value, formats):
+        """Return the formats from ``formats`` that can parse ``value``"""
+        candidates = []
+        for fmt in formats:
+            try:
+                datetime.strptime(value, fmt)
+                candidates.append(fmt)
+            except ValueError:
+                continue
+        return tuple(candidates)
+    
+    def _normalize_time(self, time_str):
+        """Replace the narrow no-break space newer exports put before AM/PM"""
+        return time_str.replace('\u202f', ' ').replace('\xa0', ' ')
+    
+    def resolve_formats(self):
+        """Lock the (date format, time format) pair for the parsed export
+        
+        The format that accepts the most distinct date strings wins, with ties
+        going to the earlier entry in ``date_formats``. A single day above 12
+        anywhere in the export is therefore enough to tell dd/mm from mm/dd.
+        """
+        return (
+            self._most_common_format(self._date_candidates, self.date_formats),
+            self._most_common_format(self._time_candidates, self.time_formats)
+        )
+    
+    def _most_common_format(self, candidates_by_value, formats):
+        """Pick the format that parses the most distinct values"""
+        counts = dict.fromkeys(formats, 0)
+        for candidates in candidates_by_value.values():
+            for fmt in candidates:
+                counts[fmt] += 1
+        best = max(formats, key=counts.__getitem__)
+        return best if counts[best] else None
+    
+    def _build_datetime_column(self, dates, times, formats):
+        """Convert raw date/time strings into a datetime64 column
+        
+        Each distinct date and time string is converted once with the locked
+        ``(date_fmt, time_fmt)`` pair, then broadcast back to the rows through
+        factorized codes. Rows that do not fit the locked formats (a stray
+        line in another format, or a later chunk than the one the formats
+        were locked on) are counted, logged and parsed one by one with
+        ``_parse_datetime``, trying every format as the per-line parser did.
+        """
+        date_fmt, time_fmt = formats
+        
+        date_codes, unique_dates = pd.factorize(pd.Series(dates, dtype=object))
+        time_codes, unique_times = pd.factorize(pd.Series(times, dtype=object))
+        
+        day_values = pd.to_datetime(
+            pd.Series(unique_dates, dtype=object), format=date_fmt, errors='coerce'
+        ).to_numpy(dtype='datetime64[ns]')
+        time_values = (
+            pd.to_datetime(
+                pd.Series(unique_times, dtype=object).map(self._normalize_time),
+                format=time_fmt, errors='coerce'
+            ) - pd.Timestamp('1900-01-01')
+        ).to_numpy(dtype='timedelta64[ns]')
+        
+        values = day_values[date_codes] + time_values[time_codes]
+        
+        unfit_rows = np.flatnonzero(np.isnat(values))
+        if len(unfit_rows):
+            print(f"{len(unfit_rows)} timestamps do not match '{date_fmt} {time_fmt}'; parsing them individually")
+            fallback = {}
+            for row in unfit_rows:
+                key = (dates[row], times[row])
+                if key not in fallback:
+                    parsed = self._parse_datetime(key[0], self._normalize_time(key[1]))
+                    fallback[key] = np.datetime64(parsed, 'ns') if parsed else np.datetime64('NaT', 'ns')
+                values[row] = fallback[key]
+        
+        return values
+    
+    def _classify_columns(self, message_column, headers):
+        """Classify each message by its header line, as the per-line parser did
+        
+        Single-line messages are their header line; the multi-line ones are
+        re-classified from the header texts kept by ``_scan_lines``.
+        """
+        message_types = self.classify_message_types(message_column)
+        if headers:
+            rows = np.fromiter(headers.keys(), dtype=np.int64, count=len(headers))
+            codes = message_types.codes.copy()
+            codes[rows] = self.classify_message_types(list(headers.values())).codes
+            message_types = pd.Categorical.from_codes(codes, categories=MESSAGE_TYPES)
+        return message_types
+    
+    def classify_message_types(self, messages):
+        """Classify a whole message column at once
+        
+        Vectorized equivalent of ``_classify_message_type``: each non-text
+        type is one case-insensitive alternation over the lowercased column,
+        and earlier types take priority. Returns a Categorical over
+        ``MESSAGE_TYPES``.
+        """
+        messages_lower = pd.Series(messages).str.lower()
+        codes = np.zeros(len(messages_lower), dtype=np.int8)
+        undecided = np.ones(len(messages_lower), dtype=bool)
+        
+        for message_type, keywords in MESSAGE_TYPE_KEYWORDS:
+            pattern = '|'.join(re.escape(keyword) for keyword in keywords)
+            hits = messages_lower.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool) & undecided
+            codes[hits] = MESSAGE_TYPES.index(message_type)
+            undecided &= ~hits
+        
+        return pd.Categorical.from_codes(codes, categories=MESSAGE_TYPES)
+    
     def _classify_message_type(self, message):
         """Classify message type based on content"""
         message_lower = message.lower()
@@ -115,3 +554,39 @@ class WhatsAppChatParser:
             return 'location'
         else:
             return 'text'
+
+
+def _parse_piece(piece, dialect):
+    """Scan one piece of an export in a worker process (see ``_parse_parallel``)
+    
+    ``piece`` is either the text of the piece or a ``(path, start, end)``
+    byte range of a file to memory-map.
+    """
+    parser = WhatsAppChatParser()
+    stats = {'parsed': 0, 'unmatched': 0}
+    dates, times, users, messages, headers = parser._empty_columns()
+    matchers = parser._matchers_for(dialect)
+    
+    if isinstance(piece, tuple):
+        path, start, end = piece
+        with open(path, 'rb') as handle, \
+                mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            lines = (line.decode('utf-8', errors='ignore')
+                     for line in parser._iter_mmap_lines(mapped, start, end))
+            for columns in parser._scan_lines(lines, matchers, None, stats):
+                dates, times, users, messages, headers = columns
+    else:
+        for columns in parser._scan_lines(parser._iter_lines(piece), matchers, None, stats):
+            dates, times, users, messages, headers = columns
+    return {
+        'dates': dates,
+        'times': times,
+        'users': users,
+        'messages': messages,
+        'headers': headers,
+        'user_categories': parser.user_categories,
+        'date_candidates': parser._date_candidates,
+        'time_candidates': parser._time_candidates,
+        'parsed': stats['parsed'],
+        'unmatched': stats['unmatched'],
+    }
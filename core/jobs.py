@@ -0,0 +1,156 @@
+import time
+import threading
+import traceback
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from core.result_store import new_analysis_id
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another job"""
+
+
+class Job:
+    """One background analysis with per-stage progress"""
+
+    def __init__(self, job_id, stages, on_change=None):
+        self.id = job_id
+        self.status = 'queued'
+        self.stages = {name: 'pending' for name in stages}  # pending/running/done/failed
+        self.stage_seconds = {}
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._on_change = on_change
+        self._publish_lock = threading.Lock()  # Stages may finish on several threads
+
+    @contextmanager
+    def stage(self, name):
+        """Mark ``name`` as running for the duration of the block"""
+        self.start_stage(name)
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.finish_stage(name, round(time.perf_counter() - start, 3), failed)
+
+    def start_stage(self, name):
+        self.stages[name] = 'running'
+        self._changed()
+
+    def finish_stage(self, name, seconds, failed=False):
+        self.stages[name] = 'failed' if failed else 'done'
+        if seconds is not None:
+            self.stage_seconds[name] = seconds
+        self._changed()
+
+    def progress(self):
+        """Fraction of stages completed"""
+        if not self.stages:
+            return 1.0 if self.status == 'done' else 0.0
+        done = sum(1 for state in self.stages.values() if state == 'done')
+        return round(done / len(self.stages), 2)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'stages': dict(self.stages),
+            'stage_seconds': dict(self.stage_seconds),
+            'progress': self.progress(),
+            'error': self.error,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+
+    def _changed(self):
+        if self._on_change is not None:
+            try:
+                with self._publish_lock:
+                    self._on_change(self)
+            except Exception as e:
+                print(f"Failed to publish job status: {e}")
+
+
+class JobQueue:
+    """Bounded in-process job queue backed by a local thread pool
+
+    At most ``max_workers`` jobs run at once and at most ``max_pending``
+    jobs (running or waiting) are accepted; further submissions raise
+    ``QueueFullError`` so a burst of uploads cannot pile up in memory.
+    When a ``status_store`` is given, every state change is mirrored to it
+    so other worker processes can report progress too.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, status_store=None, ttl_seconds=3600):
+        self.max_pending = max_pending
+        self.status_store = status_store
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def has_capacity(self):
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.status in ('queued', 'running'))
+        return active < self.max_pending
+
+    def submit(self, func, *args, stages=(), job_id=None):
+        """Queue ``func(job, *args)`` and return the new ``Job``"""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Too many analyses in progress")
+
+        job = Job(job_id or new_analysis_id(), stages, on_change=self._publish)
+        with self._lock:
+            self._forget_finished()
+            self._jobs[job.id] = job
+        self._publish(job)
+
+        try:
+            self._executor.submit(self._run, job, func, args)
+        except Exception:
+            self._slots.release()
+            raise
+        return job
+
+    def get(self, job_id):
+        """Return the job's status dict, from this process or the status store"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.status_store is not None:
+            return self.status_store.get(job_id)
+        return None
+
+    def _run(self, job, func, args):
+        job.status = 'running'
+        job._changed()
+        try:
+            func(job, *args)
+            job.status = 'done'
+        except Exception as e:
+            traceback.print_exc()
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            self._slots.release()
+            job._changed()
+
+    def _publish(self, job):
+        if self.status_store is not None:
+            self.status_store.put(job.to_dict(), analysis_id=job.id)
+
+    def _forget_finished(self):
+        """Drop finished jobs older than ``ttl_seconds`` (caller holds the lock)"""
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]:
+            del self._jobs[job_id]
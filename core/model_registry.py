@@ -0,0 +1,157 @@
+import gc
+import os
+import time
+import threading
+
+
+class ModelLoadError(Exception):
+    """Raised when a registered model failed to load"""
+
+
+class _Entry:
+    def __init__(self, loader, idle_release):
+        self.loader = loader
+        self.idle_release = idle_release
+        self.value = None
+        self.error = None
+        self.loaded_at = None
+        self.last_used = None
+        self.load_seconds = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Process-wide holder of heavy objects (ML pipelines, chart libraries), loaded on first use
+
+    Each name maps to a loader that is called the first time the object is
+    requested; every caller in the process then shares that one instance.
+    Objects loaded before the process forks (``preload`` under gunicorn
+    ``--preload``) are inherited by the workers and shared copy-on-write.
+    Objects registered with ``idle_release=True`` are dropped once they
+    have not been used for ``idle_seconds`` (0 keeps them forever) and are
+    loaded again on the next request.
+    """
+
+    def __init__(self, idle_seconds=0):
+        self.idle_seconds = idle_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._reaper_pid = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def register(self, name, loader, idle_release=True):
+        """Register ``loader() -> object`` under ``name``; re-registering keeps a loaded object"""
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(loader, idle_release)
+        return self
+
+    def is_registered(self, name):
+        return name in self._entries
+
+    def get(self, name):
+        """The object for ``name``, loading it on first use
+
+        Raises ``ModelLoadError`` if the loader failed; the failure is
+        remembered until ``release(name)`` so it is not retried per request.
+        """
+        entry = self._entries[name]
+        with entry.lock:
+            if entry.error is not None:
+                raise ModelLoadError(f"{name}: {entry.error}")
+            if entry.value is None:
+                start = time.perf_counter()
+                try:
+                    entry.value = entry.loader()
+                except Exception as e:
+                    entry.error = str(e)
+                    raise ModelLoadError(f"{name}: {e}") from e
+                entry.load_seconds = round(time.perf_counter() - start, 3)
+                entry.loaded_at = time.time()
+                print(f"Loaded {name} in {entry.load_seconds}s")
+            entry.last_used = time.time()
+            value = entry.value
+        if entry.idle_release:
+            self._start_reaper()
+        return value
+
+    def preload(self, names):
+        """Load ``names`` now, e.g. in the gunicorn master before workers fork"""
+        for name in names:
+            try:
+                self.get(name)
+            except ModelLoadError as e:
+                print(f"Preload failed: {e}")
+
+    def release(self, name):
+        """Drop the loaded object (and any remembered load error) for ``name``"""
+        entry = self._entries.get(name)
+        if entry is None:
+            return
+        with entry.lock:
+            released = entry.value is not None
+            entry.value = None
+            entry.error = None
+            entry.loaded_at = None
+        if released:
+            gc.collect()
+            print(f"Released {name}")
+
+    def release_idle(self, now=None):
+        """Release every idle-releasable object unused for ``idle_seconds``; returns their names"""
+        if self.idle_seconds <= 0:
+            return []
+        now = now if now is not None else time.time()
+        released = []
+        for name, entry in list(self._entries.items()):
+            if not entry.idle_release:
+                continue
+            with entry.lock:
+                # Checked under the lock so an object in use is never dropped
+                if entry.value is None or entry.last_used + self.idle_seconds >= now:
+                    continue
+                entry.value = None
+                entry.loaded_at = None
+            released.append(name)
+        if released:
+            gc.collect()
+            print(f"Released idle: {', '.join(released)}")
+        return released
+
+    def status(self):
+        """Load state of every registered object, for health checks"""
+        return {
+            name: {
+                'loaded': entry.value is not None,
+                'load_seconds': entry.load_seconds,
+                'idle_seconds': round(time.time() - entry.last_used, 1) if entry.last_used else None,
+                'error': entry.error
+            }
+            for name, entry in list(self._entries.items())
+        }
+
+    def _start_reaper(self):
+        """Start this process's idle-release thread once (threads do not survive a fork)"""
+        if self.idle_seconds <= 0:
+            return
+        with self._lock:
+            if self._reaper_pid == os.getpid():
+                return
+            self._reaper_pid = os.getpid()
+        threading.Thread(target=self._reap, name='model-reaper', daemon=True).start()
+
+    def _reap(self):
+        while True:
+            time.sleep(max(min(self.idle_seconds / 2, 60), 1))
+            try:
+                self.release_idle()
+            except Exception as e:
+                print(f"Releasing idle models failed: {e}")
+
+    def _after_fork(self):
+        # A lock held by another parent thread at fork time would never be released here
+        self._lock = threading.Lock()
+        for entry in self._entries.values():
+            entry.lock = threading.Lock()
+        self._reaper_pid = None
@@ -0,0 +1,178 @@
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+
+# Imported once by the fork server, so its workers start with them loaded
+FORKSERVER_PRELOAD = ['numpy', 'pandas']
+
+
+def process_context():
+    """Start method for worker pools: forkserver where the platform has it, else spawn
+
+    Plain fork would copy a process that is already running threads (stage
+    threads, job workers, the model reaper) together with any lock one of
+    them holds, which can deadlock the child. The fork server itself is
+    single-threaded and preloads ``FORKSERVER_PRELOAD``.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(FORKSERVER_PRELOAD)
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+class Stage:
+    """One named step of a pipeline and the values it reads"""
+
+    def __init__(self, name, func, inputs=(), process=False):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.process = process  # CPU-bound: run on the process pool when there is one
+
+
+def _timed_call(func, args):
+    """Run ``func(*args)`` and return ``(result, seconds)``; also used in worker processes"""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, round(time.perf_counter() - start, 3)
+
+
+class Pipeline:
+    """Stage scheduler that runs analyzers as a dependency graph
+
+    Every stage names its inputs: initial values passed to ``run`` or the
+    outputs of other stages. A stage starts as soon as all of its inputs
+    exist, so independent stages run concurrently on a thread pool. Stages
+    added with ``process=True`` go to a process pool instead, letting
+    CPU-bound Python work overlap rather than queue on the GIL; their
+    function, inputs and output must be picklable, and its module is
+    imported again in the workers, which are started with
+    ``process_context``. The process pool is started on first use and
+    shared by all runs.
+    """
+
+    def __init__(self, max_workers=4, max_processes=0):
+        self.max_workers = max_workers
+        self.max_processes = max_processes
+        self.stages = {}
+        self._processes = None
+        self._lock = threading.Lock()
+
+    def add(self, name, func, inputs=(), process=False):
+        """Register ``func(*inputs)`` as the stage producing ``name``"""
+        if name in self.stages:
+            raise ValueError(f"Duplicate pipeline stage: {name}")
+        self.stages[name] = Stage(name, func, inputs, process)
+        return self
+
+    def run(self, values, on_start=None, on_finish=None):
+        """Run every stage and return ``(outputs, stage_seconds)``
+
+        ``values`` holds the initial inputs. ``on_start(name)`` and
+        ``on_finish(name, seconds, failed)`` are called as stages start and
+        finish. The first stage error is re-raised once running stages end;
+        stages that had not started yet are skipped.
+        """
+        self._check(values)
+        outputs = dict(values)
+        stage_seconds = {}
+        pending = dict(self.stages)
+        running = {}
+        error = None
+
+        processes = self._process_pool() if any(stage.process for stage in pending.values()) else None
+        threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stage')
+        try:
+            while pending or running:
+                if error is None:
+                    for stage in [stage for stage in pending.values() if all(name in outputs for name in stage.inputs)]:
+                        del pending[stage.name]
+                        args = [outputs[name] for name in stage.inputs]
+                        future = None
+                        if stage.process and processes is not None:
+                            try:
+                                future = processes.submit(_timed_call, stage.func, args)
+                            except (BrokenProcessPool, RuntimeError):
+                                self._discard_process_pool(processes)
+                                processes = None
+                            else:
+                                if on_start is not None:
+                                    on_start(stage.name)
+                        if future is None:
+                            future = threads.submit(self._run_stage, stage, args, on_start)
+                        running[future] = stage
+                else:
+                    pending.clear()
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        outputs[stage.name], seconds = future.result()
+                        failed = False
+                    except Exception as e:
+                        if isinstance(e, BrokenProcessPool):
+                            self._discard_process_pool(processes)
+                        seconds = None
+                        failed = True
+                        if error is None:
+                            error = e
+                    stage_seconds[stage.name] = seconds
+                    if on_finish is not None:
+                        on_finish(stage.name, seconds, failed)
+        finally:
+            threads.shutdown(wait=True)
+
+        if error is not None:
+            raise error
+        return outputs, stage_seconds
+
+    def close(self):
+        """Stop the shared process pool"""
+        with self._lock:
+            processes, self._processes = self._processes, None
+        if processes is not None:
+            processes.shutdown(wait=True)
+
+    def _process_pool(self):
+        if self.max_processes <= 0:
+            return None
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.max_processes, mp_context=process_context())
+            return self._processes
+
+    def _discard_process_pool(self, processes):
+        """Forget a pool whose worker died so the next run starts a fresh one"""
+        with self._lock:
+            if self._processes is processes:
+                self._processes = None
+        processes.shutdown(wait=False)
+
+    def _run_stage(self, stage, args, on_start):
+        if on_start is not None:
+            on_start(stage.name)
+        return _timed_call(stage.func, args)
+
+    def _check(self, values):
+        """Reject unknown inputs and dependency cycles before anything runs"""
+        available = set(values)
+        remaining = dict(self.stages)
+        while remaining:
+            ready = [name for name, stage in remaining.items() if available.issuperset(stage.inputs)]
+            if not ready:
+                known = available | set(self.stages)
+                missing = sorted({name for stage in remaining.values() for name in stage.inputs} - known)
+                if missing:
+                    raise ValueError(f"Unknown pipeline inputs: {', '.join(missing)}")
+                raise ValueError(f"Pipeline stages form a cycle: {', '.join(sorted(remaining))}")
+            for name in ready:
+                available.add(name)
+                del remaining[name]
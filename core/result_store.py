@@ -0,0 +1,165 @@
+import os
+import re
+import json
+import time
+import uuid
+import tempfile
+import threading
+from collections import OrderedDict
+
+_ANALYSIS_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def new_analysis_id():
+    """Random, URL-safe identifier for one analysis"""
+    return uuid.uuid4().hex
+
+
+def is_valid_analysis_id(analysis_id):
+    return bool(analysis_id) and bool(_ANALYSIS_ID.match(analysis_id))
+
+
+class MemoryResultStore:
+    """Per-process result store with TTL and a memory cap
+
+    Only visible to the worker that produced the results; use
+    ``DiskResultStore`` when several workers serve the same users.
+    """
+
+    def __init__(self, ttl_seconds=24 * 3600, max_bytes=128 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # analysis_id -> (expires_at, size, results)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, results, analysis_id=None):
+        """Store JSON-serializable ``results`` and return their analysis ID"""
+        analysis_id = analysis_id or new_analysis_id()
+        size = len(json.dumps(results))
+        with self._lock:
+            self._discard(analysis_id)
+            self._entries[analysis_id] = (time.time() + self.ttl_seconds, size, results)
+            self._total_bytes += size
+            self._evict()
+        return analysis_id
+
+    def get(self, analysis_id):
+        """Return the results for ``analysis_id``, or None if unknown or expired"""
+        with self._lock:
+            entry = self._entries.get(analysis_id)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                self._discard(analysis_id)
+                return None
+            self._entries.move_to_end(analysis_id)
+            return entry[2]
+
+    def _discard(self, analysis_id):
+        entry = self._entries.pop(analysis_id, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones above the cap"""
+        now = time.time()
+        for analysis_id in [key for key, entry in self._entries.items() if entry[0] < now]:
+            self._discard(analysis_id)
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            self._discard(next(iter(self._entries)))
+
+
+class DiskResultStore:
+    """Result store shared by all workers through a directory of JSON files
+
+    An entry expires ``ttl_seconds`` after it was written; the oldest entries
+    are also removed once the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory, ttl_seconds=24 * 3600, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def put(self, results, analysis_id=None):
+        """Store JSON-serializable ``results`` and return their analysis ID"""
+        analysis_id = analysis_id or new_analysis_id()
+        fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as entry:
+                json.dump(results, entry)
+            os.replace(tmp_path, self._path(analysis_id))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+        return analysis_id
+
+    def get(self, analysis_id):
+        """Return the results for ``analysis_id``, or None if unknown or expired"""
+        if not is_valid_analysis_id(analysis_id):
+            return None
+        path = self._path(analysis_id)
+        try:
+            if os.path.getmtime(path) + self.ttl_seconds < time.time():
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as entry:
+                return json.load(entry)
+        except (OSError, ValueError):
+            return None
+
+    def _evict(self):
+        """Remove expired entries, then the oldest ones above ``max_bytes``"""
+        now = time.time()
+        entries = []
+        total_bytes = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+                if stat.st_mtime + self.ttl_seconds < now:
+                    os.remove(entry.path)
+                    continue
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_bytes += stat.st_size
+
+        for _, size, path in sorted(entries)[:-1]:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total_bytes -= size
+            except OSError:
+                continue
+
+    def _path(self, analysis_id):
+        if not is_valid_analysis_id(analysis_id):
+            raise ValueError(f"Invalid analysis ID: {analysis_id!r}")
+        return os.path.join(self.directory, f"{analysis_id}.json")
+
+
+def create_result_store(app_config, directory=None):
+    """Build the result store selected by ``RESULT_STORE_BACKEND``
+    
+    ``directory`` overrides ``RESULT_STORE_DIR`` for the disk backend.
+    """
+    backend = app_config['RESULT_STORE_BACKEND']
+    if backend == 'disk':
+        return DiskResultStore(
+            directory or app_config['RESULT_STORE_DIR'],
+            ttl_seconds=app_config['RESULT_TTL_SECONDS'],
+            max_bytes=app_config['RESULT_STORE_MAX_BYTES']
+        )
+    if backend == 'memory':
+        return MemoryResultStore(
+            ttl_seconds=app_config['RESULT_TTL_SECONDS'],
+            max_bytes=app_config['RESULT_STORE_MAX_BYTES']
+        )
+    raise ValueError(f"Unknown RESULT_STORE_BACKEND: {backend}")
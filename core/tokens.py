@@ -0,0 +1,233 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # Tokenize with str.lower().split() instead
+    pa = None
+
+
+class WordView:
+    """One consumer's word forms of a token table, one row per word occurrence
+
+    ``word`` holds IDs into ``vocabulary`` and ``row`` the token-table row
+    each occurrence came from, both in message order.
+    """
+
+    def __init__(self, vocabulary, word, row):
+        self.vocabulary = vocabulary
+        self.word = word
+        self.row = row
+
+
+class TokenTable:
+    """Lowercased whitespace tokens of every message, tokenized once per analysis
+
+    The table has one row per token occurrence, in message order:
+    ``message`` (row position in the chat DataFrame), ``user`` (user code
+    into ``users``) and ``token`` (ID into ``vocabulary``). Token IDs are
+    interned in order of first occurrence.
+
+    Consumers that need other word forms (punctuation stripped, URLs
+    removed, ...) derive them per vocabulary entry with ``words`` rather
+    than re-tokenizing message text.
+    """
+
+    def __init__(self, df):
+        users = df['user'].astype('category')
+        self.users = users.cat.categories
+        self.message_count = len(df)
+        self.is_text = (df['message_type'] == 'text').to_numpy(dtype=bool)
+
+        if pa is not None:
+            self.message, self.token, self.vocabulary = self._tokenize_arrow(df['message'])
+        else:
+            self.message, self.token, self.vocabulary = self._tokenize_python(df['message'])
+        self.user = users.cat.codes.to_numpy()[self.message]
+        self._views = {}
+
+    def __len__(self):
+        return len(self.token)
+
+    def __getstate__(self):
+        # Cached values may be added by other stages while the table is pickled for a worker process
+        state = self.__dict__.copy()
+        state['_views'] = {}
+        return state
+
+    @staticmethod
+    def _tokenize_arrow(messages):
+        """Lowercase, split and intern the whole column inside Arrow"""
+        values = pa.array(messages, from_pandas=True)
+        if isinstance(values, pa.ChunkedArray):
+            values = values.combine_chunks()
+        lists = pc.utf8_split_whitespace(pc.utf8_lower(values))
+        tokens = pc.list_flatten(lists)
+        message = pc.list_parent_indices(lists)
+
+        # Unlike str.split(), Arrow keeps empty tokens for leading/trailing
+        # whitespace and empty messages
+        non_empty = pc.not_equal(pc.utf8_length(tokens), 0)
+        encoded = pc.dictionary_encode(tokens.filter(non_empty))
+        return (
+            message.filter(non_empty).to_numpy().astype(np.int64),
+            encoded.indices.to_numpy(zero_copy_only=False).astype(np.int64),
+            np.array(encoded.dictionary.to_pylist(), dtype=object)
+        )
+
+    @staticmethod
+    def _tokenize_python(messages):
+        split = [message.lower().split() if isinstance(message, str) else [] for message in messages]
+        lengths = np.fromiter(map(len, split), dtype=np.int64, count=len(split))
+        token, vocabulary = pd.factorize(np.array(list(itertools.chain.from_iterable(split)), dtype=object))
+        return np.repeat(np.arange(len(split)), lengths), token.astype(np.int64), vocabulary
+
+    def text_rows(self):
+        """Boolean mask of the tokens that belong to text messages"""
+        return self.is_text[self.message]
+
+    def words(self, name, split_token):
+        """Word view produced by ``split_token(token) -> list of words``, memoized by ``name``
+
+        ``split_token`` runs once per distinct token; the occurrences are
+        expanded with numpy.
+        """
+        return self.cached(f'words:{name}', lambda: self._derive_words(split_token))
+
+    def cached(self, name, build):
+        """Memoize ``build()`` on this table under ``name``, for values derived from it"""
+        value = self._views.get(name)
+        if value is None:
+            value = build()
+            self._views[name] = value
+        return value
+
+    def _derive_words(self, split_token):
+        pieces = [split_token(token) for token in self.vocabulary]
+        lengths = np.fromiter(map(len, pieces), dtype=np.int64, count=len(pieces))
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        word_ids, vocabulary = pd.factorize(np.array(list(itertools.chain.from_iterable(pieces)), dtype=object))
+
+        occurrence_lengths = lengths[self.token]
+        row = np.repeat(np.arange(len(self.token)), occurrence_lengths)
+        first = np.repeat(np.cumsum(occurrence_lengths) - occurrence_lengths, occurrence_lengths)
+        within = np.arange(len(row)) - first
+        word = word_ids[starts[self.token[row]] + within] if len(row) else np.zeros(0, dtype=np.int64)
+
+        return WordView(np.asarray(vocabulary, dtype=object), word, row)
+
+
+def most_common_order(groups, counts, first):
+    """Sort order by group, then count descending, then first occurrence
+
+    Equivalent to ``np.lexsort((first, -counts, groups))``, but sorts a
+    single combined int64 key when it fits, which is several times faster.
+    """
+    if not len(groups):
+        return np.zeros(0, dtype=np.int64)
+    count_span = int(counts.max()) + 1
+    first_span = int(first.max()) + 1
+    if (int(groups.max()) + 1) * count_span * first_span >= 2 ** 62:
+        return np.lexsort((first, -counts, groups))
+    keys = (groups.astype(np.int64) * count_span + (count_span - 1 - counts.astype(np.int64))) * first_span + first
+    return np.argsort(keys)
+
+
+class CountMatrix:
+    """Sparse rows x terms count matrix in CSR layout, built with numpy alone
+
+    ``indptr``, ``indices`` (term IDs) and ``data`` (counts) follow the
+    scipy.sparse CSR convention. Within a row, entries are ordered like
+    ``Counter.most_common`` (by count, ties by first occurrence), so a row's
+    top terms are a slice; ``first`` holds the position of each entry's
+    first occurrence in the input.
+    """
+
+    def __init__(self, rows, terms, shape, first=None, weights=None):
+        """Count ``(rows[i], terms[i])`` occurrences (``weights[i]`` each when given)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        terms = np.asarray(terms, dtype=np.int64)
+        self.shape = (int(shape[0]), int(shape[1]))
+        if first is None:
+            first = np.arange(len(rows))
+        if weights is None:
+            weights = np.ones(len(rows), dtype=np.int64)
+
+        # Sum duplicate (row, term) pairs, keeping each pair's first occurrence
+        width = max(self.shape[1], 1)
+        keys = rows * width + terms
+        order = np.argsort(keys)
+        keys, first, weights = keys[order], np.asarray(first)[order], np.asarray(weights)[order]
+        if len(keys):
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            data = np.add.reduceat(weights, starts)
+            entry_first = np.minimum.reduceat(first, starts)
+        else:
+            starts = data = entry_first = np.zeros(0, dtype=np.int64)
+        unique = keys[starts]
+        entry_rows = unique // width
+
+        # Lay rows out consecutively, most common terms first
+        order = most_common_order(entry_rows, data, entry_first)
+        self.indices = (unique % width)[order]
+        self.data = data[order]
+        self.first = entry_first[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(entry_rows, minlength=self.shape[0]))]).astype(np.int64)
+
+    @property
+    def entry_rows(self):
+        """Row index of every stored entry"""
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+
+    def row(self, index):
+        """``(term IDs, counts)`` of one row, most common first"""
+        start, end = self.indptr[index], self.indptr[index + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def row_sums(self):
+        return np.bincount(self.entry_rows, weights=self.data, minlength=self.shape[0]).astype(self.data.dtype)
+
+    def row_nnz(self):
+        """Distinct terms per row"""
+        return np.diff(self.indptr)
+
+    def column_sums(self):
+        return np.bincount(self.indices, weights=self.data, minlength=self.shape[1]).astype(self.data.dtype)
+
+    def document_frequency(self):
+        """Number of rows each term occurs in"""
+        return np.bincount(self.indices, minlength=self.shape[1])
+
+    def top_terms(self, n=None):
+        """``(term IDs, counts)`` over all rows, ordered like ``Counter.most_common(n)``"""
+        counts = self.column_sums()
+        first = np.full(self.shape[1], np.iinfo(np.int64).max)
+        np.minimum.at(first, self.indices, self.first)
+        present = np.flatnonzero(counts > 0)
+        order = present[most_common_order(np.zeros(len(present), dtype=np.int64), counts[present], first[present])][:n]
+        return order, counts[order]
+
+    def select_rows(self, mask):
+        """Matrix of the rows where ``mask`` is true (other rows become empty)"""
+        keep = np.asarray(mask, dtype=bool)[self.entry_rows]
+        return CountMatrix(self.entry_rows[keep], self.indices[keep], self.shape, self.first[keep], self.data[keep])
+
+    def group_rows(self, groups, n_groups):
+        """Merge rows: row ``i`` is added into row ``groups[i]`` of an ``n_groups``-row matrix"""
+        groups = np.asarray(groups, dtype=np.int64)
+        return CountMatrix(groups[self.entry_rows], self.indices, (n_groups, self.shape[1]), self.first, self.data)
+
+    def tfidf(self):
+        """TF-IDF weight of every stored entry, aligned with ``indices``
+
+        Term frequency is the count over the row total; IDF is smoothed as
+        ``log((1 + rows) / (1 + df)) + 1``.
+        """
+        row_sums = self.row_sums()
+        term_frequency = self.data / np.maximum(row_sums[self.entry_rows], 1)
+        active_rows = int((row_sums > 0).sum())
+        idf = np.log((1 + active_rows) / (1 + self.document_frequency())) + 1
+        return term_frequency * idf[self.indices]
@@ -0,0 +1,151 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from core.tokens import most_common_order
+
+PERIODS = ('day', 'week')
+_EPOCH = datetime.date(1970, 1, 1)
+
+
+def period_index(datetimes, period='week'):
+    """Period number of every timestamp: days since 1970-01-01, or Monday-based weeks"""
+    if period not in PERIODS:
+        raise ValueError(f"Unknown trend period: {period}")
+    days = pd.to_datetime(pd.Series(datetimes)).to_numpy(dtype='datetime64[D]').astype(np.int64)
+    if period == 'day':
+        return days
+    return (days + 3) // 7  # 1970-01-01 was a Thursday
+
+
+def period_start(index, period='week'):
+    """First day of period number ``index``"""
+    if period == 'day':
+        return _EPOCH + datetime.timedelta(days=int(index))
+    return _EPOCH + datetime.timedelta(days=int(index) * 7 - 3)
+
+
+class TrendIndex:
+    """Term counts per time period, queried by range from prefix sums
+
+    One entry per (term, period) pair that occurs, sorted by term then
+    period, with a running total of the counts over all entries. The count
+    of any term in periods ``[a, b]`` is the difference of two running
+    totals found by binary search, so range queries never revisit the
+    messages. Occurrences of new periods can be added with ``extend`` and
+    old ones dropped with ``drop_before``.
+    """
+
+    def __init__(self, terms, periods, n_terms, first=None):
+        """Index term ``terms[i]`` occurring in period ``periods[i]``; ``first`` orders ties"""
+        self.n_terms = int(n_terms)
+        self.first = np.full(self.n_terms, np.iinfo(np.int64).max)
+        self._seen = 0
+        self._build(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        self.extend(terms, periods, first)
+
+    def __len__(self):
+        """Stored (term, period) entries"""
+        return len(self.term)
+
+    @property
+    def first_period(self):
+        return int(self.periods[0]) if len(self.periods) else None
+
+    @property
+    def last_period(self):
+        return int(self.periods[-1]) if len(self.periods) else None
+
+    def extend(self, terms, periods, first=None):
+        """Add occurrences, merging them into the existing (term, period) counts"""
+        terms = np.asarray(terms, dtype=np.int64)
+        periods = np.asarray(periods, dtype=np.int64)
+        if first is None:
+            first = self._seen + np.arange(len(terms))
+        if len(terms):
+            np.minimum.at(self.first, terms, np.asarray(first, dtype=np.int64))
+        self._seen += len(terms)
+        self._build(
+            np.concatenate([self.term, terms]),
+            np.concatenate([self.period, periods]),
+            np.concatenate([np.diff(self.cumulative), np.ones(len(terms), dtype=np.int64)])
+        )
+        return self
+
+    def drop_before(self, period):
+        """Forget every period before ``period`` (a rolling window)"""
+        keep = self.period >= period
+        self._build(self.term[keep], self.period[keep], np.diff(self.cumulative)[keep])
+        return self
+
+    def counts(self, start, end):
+        """Occurrences of every term in periods ``start``..``end`` (inclusive)"""
+        if not len(self.term) or start > end:
+            return np.zeros(self.n_terms, dtype=np.int64)
+        # Clamp to the stored periods so a search never crosses into a neighbouring term
+        start = min(max(start, self._base), self._base + self._span)
+        end = min(max(end, self._base - 1), self._base + self._span - 1)
+        term_keys = np.arange(self.n_terms, dtype=np.int64) * self._span - self._base
+        lo = np.searchsorted(self._keys, term_keys + start)
+        hi = np.searchsorted(self._keys, term_keys + end, side='right')
+        return self.cumulative[np.maximum(hi, lo)] - self.cumulative[lo]
+
+    def total(self, start, end):
+        """Occurrences of all terms in periods ``start``..``end`` (inclusive)"""
+        lo = np.searchsorted(self.periods, start)
+        hi = np.searchsorted(self.periods, end, side='right')
+        return int(self.period_cumulative[max(hi, lo)] - self.period_cumulative[lo])
+
+    def top(self, start, end, n=None):
+        """``(term IDs, counts)`` in the range, most common first (ties by first occurrence overall)"""
+        counts = self.counts(start, end)
+        present = np.flatnonzero(counts > 0)
+        order = present[most_common_order(np.zeros(len(present), dtype=np.int64), counts[present], self.first[present])][:n]
+        return order, counts[order]
+
+    def rising(self, window, baseline, n=None, min_count=3):
+        """Terms used more in ``window`` than in ``baseline``, both ``(start, end)`` periods
+
+        Returns ``(term IDs, window counts, baseline counts, growth)``
+        ordered by growth: the ratio of the term's share of all words in
+        the window to its share in the baseline, add-one smoothed so terms
+        new in the window get a finite score.
+        """
+        window_counts = self.counts(*window)
+        baseline_counts = self.counts(*baseline)
+        growth = self.growth(window_counts, baseline_counts, window, baseline)
+        candidates = np.flatnonzero((window_counts >= min_count) & (growth > 1))
+        order = candidates[np.lexsort((
+            self.first[candidates], -window_counts[candidates], -growth[candidates]
+        ))][:n]
+        return order, window_counts[order], baseline_counts[order], growth[order]
+
+    def growth(self, window_counts, baseline_counts, window, baseline):
+        """Smoothed ratio of each term's share of the words in ``window`` and in ``baseline``"""
+        window_total = self.total(*window)
+        baseline_total = self.total(*baseline)
+        return ((window_counts + 1) / (window_total + 1)) / ((baseline_counts + 1) / (baseline_total + 1))
+
+    def _build(self, terms, periods, counts):
+        """Sum duplicate (term, period) pairs and lay the entries out with their prefix sums"""
+        self._base = int(periods.min()) if len(periods) else 0
+        self._span = int(periods.max()) - self._base + 1 if len(periods) else 1
+
+        keys = terms * self._span + (periods - self._base)
+        order = np.argsort(keys, kind='stable')
+        keys, counts = keys[order], counts[order]
+        if len(keys):
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            counts = np.add.reduceat(counts, starts)
+            keys = keys[starts]
+
+        self._keys = keys
+        self.term = keys // self._span
+        self.period = keys % self._span + self._base
+        self.cumulative = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        # Totals over all terms per period, for normalizing and range totals
+        self.periods = np.unique(self.period)
+        period_totals = np.bincount(np.searchsorted(self.periods, self.period), weights=counts, minlength=len(self.periods))
+        self.period_cumulative = np.concatenate([[0], np.cumsum(period_totals)]).astype(np.int64)
@@ -0,0 +1,52 @@
+const POLL_INTERVAL_MS = 1000;
+
+function renderJob(job) {
+    const statusText = {
+        queued: 'Waiting for a free worker...',
+        running: 'Analyzing (' + Math.round(job.progress * 100) + '%)...',
+        done: 'Analysis complete, opening results...',
+        failed: 'Analysis failed.'
+    };
+    document.getElementById('job-status').textContent = statusText[job.status] || job.status;
+
+    document.querySelectorAll('#job-stages li').forEach(item => {
+        const stage = item.dataset.stage;
+        let state = job.stages[stage] || 'pending';
+        if (job.stage_seconds[stage] !== undefined) {
+            state += ' (' + job.stage_seconds[stage] + 's)';
+        }
+        item.querySelector('.stage-state').textContent = state;
+    });
+}
+
+function pollJob() {
+    fetch('/api/jobs/' + JOB_ID)
+        .then(response => {
+            // The status may not have reached the shared store yet
+            if (response.status === 404) {
+                return null;
+            }
+            return response.json();
+        })
+        .then(job => {
+            if (job === null) {
+                setTimeout(pollJob, POLL_INTERVAL_MS);
+                return;
+            }
+            renderJob(job);
+            if (job.status === 'done') {
+                window.location.href = job.results_url;
+            } else if (job.status === 'failed') {
+                document.getElementById('job-error-message').textContent = job.error;
+                document.getElementById('job-error').style.display = 'block';
+            } else {
+                setTimeout(pollJob, POLL_INTERVAL_MS);
+            }
+        })
+        .catch(error => {
+            console.log('Error polling job status:', error);
+            setTimeout(pollJob, POLL_INTERVAL_MS);
+        });
+}
+
+document.addEventListener("DOMContentLoaded", pollJob);
@@ -1,10 +1,53 @@
 document.addEventListener("DOMContentLoaded", () => {
     console.log("Results page fully loaded and parsed.");
+    document.querySelectorAll('.lazy-chart').forEach(element => {
+        loadChart(element).then(figure => {
+            if (element.id === 'timeline-chart') {
+                offerFullTimeline(figure);
+            }
+        });
+    });
 });
 
+function loadChart(element) {
+    // Charts are built on request; hide the chart if this analysis has none
+    return fetch('/api/charts/' + ANALYSIS_ID + '/' + element.dataset.chart)
+        .then(response => response.ok ? response.json() : null)
+        .catch(() => null)
+        .then(figure => {
+            element.innerHTML = '';
+            if (figure === null) {
+                element.closest('.visualization').style.display = 'none';
+                return null;
+            }
+            Plotly.newPlot(element, figure.data, figure.layout);
+            return figure;
+        });
+}
+
+function offerFullTimeline(figure) {
+    // Long chats are downsampled; the daily series is fetched only when asked for
+    if (!figure || !figure.layout.meta || !figure.layout.meta.downsampled) {
+        return;
+    }
+    const button = document.getElementById('timeline-full');
+    button.style.display = 'inline-block';
+    button.addEventListener('click', () => {
+        button.disabled = true;
+        fetch('/api/timeline/' + ANALYSIS_ID)
+            .then(response => response.json())
+            .then(series => {
+                Plotly.react('timeline-chart', [{x: series.dates, y: series.total, mode: 'lines'}],
+                    Object.assign({}, figure.layout, {title: {text: 'Message Timeline'}, yaxis: {title: {text: 'Message Count'}}}));
+                button.style.display = 'none';
+            })
+            .catch(() => { button.disabled = false; });
+    });
+}
+
 function downloadReport() {
     // Download as JSON report using the backend endpoint
-    window.location.href = '/export/json';
+    window.location.href = '/export/json/' + ANALYSIS_ID;
 }
 
 function shareResults() {
@@ -28,5 +71,5 @@ function shareResults() {
 
 function exportData() {
     // Export data as CSV using the backend endpoint
-    window.location.href = '/export/csv';
+    window.location.href = '/export/csv/' + ANALYSIS_ID;
 }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the app's packages from the repository root, as the benchmarks do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+import zipfile
+
+import pytest
+
+from benchmarks.bench_parser import generate_chat
+from core.chat_archive import ChatArchive, ArchiveTooLarge
+from core.chat_parser import WhatsAppChatParser
+
+
+def write_archive(path, chat, attachments=()):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('_chat.txt', chat)
+        for name in attachments:
+            archive.writestr(name, b'\0' * 16)
+
+
+def test_archive_rejects_transcripts_over_the_size_limit(tmp_path):
+    path = tmp_path / 'export.zip'
+    write_archive(path, generate_chat(100))
+
+    with pytest.raises(ArchiveTooLarge):
+        ChatArchive(path, max_chat_bytes=100)
+
+    # A declared size within the limit does not skip the check on the bytes read
+    archive = ChatArchive(path, max_chat_bytes=10 ** 6)
+    archive.max_chat_bytes = 100
+    with pytest.raises(ArchiveTooLarge), archive, archive.open_chat() as stream:
+        WhatsAppChatParser().parse_chat(stream)
+
+
+def test_archive_attachments_count_as_media_messages(tmp_path):
+    path = tmp_path / 'export.zip'
+    write_archive(path, (
+        "1/2/2023, 10:00 - Alice: IMG-20230101-WA0001.jpg (file attached)\n"
+        "1/2/2023, 10:01 - Bob: <attached: 00000012-PHOTO-2023-01-01.jpg>\n"
+        "1/2/2023, 10:02 - Bob: report.pdf (file attached)\n"
+        "1/2/2023, 10:03 - Alice: missing.jpg (file attached)\n"
+    ), attachments=['IMG-20230101-WA0001.jpg', '00000012-PHOTO-2023-01-01.jpg', 'report.pdf'])
+
+    with ChatArchive(path, max_chat_bytes=10 ** 6) as archive:
+        with archive.open_chat() as stream:
+            df = WhatsAppChatParser().parse_chat(stream)
+        message_types = archive.classify_attachments(df['message'], df['message_type'])
+    assert list(message_types) == ['media', 'media', 'document', 'text']
@@ -0,0 +1,79 @@
+import pytest
+
+from benchmarks.bench_parser import generate_chat, legacy_parse
+from core.chat_parser import WhatsAppChatParser
+
+
+def as_records(df):
+    """Parsed frame as the original parser's list of message dicts"""
+    return [
+        {
+            'datetime': row.datetime.to_pydatetime(),
+            'user': row.user,
+            'message': row.message,
+            'message_type': row.message_type
+        }
+        for row in df.itertuples()
+    ]
+
+
+@pytest.mark.parametrize('dialect', ['android', 'ios'])
+def test_parse_chat_matches_original_loop(dialect):
+    text = generate_chat(3000, dialect=dialect)
+    expected = legacy_parse(WhatsAppChatParser(), text)
+    assert as_records(WhatsAppChatParser().parse_chat(text)) == expected
+
+
+@pytest.mark.parametrize('dialect', ['android', 'ios'])
+def test_parallel_and_chunked_parses_match_serial(dialect):
+    text = generate_chat(3000, dialect=dialect)
+    serial = WhatsAppChatParser().parse_chat(text)
+
+    parallel = WhatsAppChatParser(workers=2, parallel_threshold=0).parse_chat(text)
+    assert parallel.equals(serial)
+
+    parser = WhatsAppChatParser()
+    chunked = parser.concat_chunks(parser.iter_chunks(text.split('\n'), chunk_size=700))
+    assert chunked.equals(serial)
+
+
+def test_multi_line_messages_are_classified_by_their_header_line():
+    text = (
+        "1/2/2023, 10:00 - Alice: see below\n"
+        "https://example.com\n"
+        "1/2/2023, 10:01 - Bob: https://example.com <Media omitted>\n"
+        "and more\n"
+        "13/2/2023, 10:02 - Alice: live location shared\n"
+    )
+    parser = WhatsAppChatParser()
+    expected = legacy_parse(parser, text)
+    df = parser.parse_chat(text)
+    assert list(df['message_type']) == ['text', 'media', 'location']
+    assert as_records(df) == expected
+
+
+def test_two_digit_us_dates_are_parsed():
+    text = "1/13/23, 9:15 - Alice: hi\n2/1/23, 21:40 - Bob: hello\n"
+    df = WhatsAppChatParser().parse_chat(text)
+    assert [str(value) for value in df['datetime']] == ['2023-01-13 09:15:00', '2023-02-01 21:40:00']
+
+
+def test_timestamps_outside_the_locked_format_are_parsed_individually():
+    text = (
+        "13/2/2023, 10:00 - Alice: hi\n"
+        "14/2/2023, 10:01 - Bob: hello\n"
+        "2/15/2023, 10:02 - Alice: stray line in month-first order\n"
+    )
+    df = WhatsAppChatParser().parse_chat(text)
+    assert df['datetime'].notna().all()
+    assert str(df['datetime'].iloc[2]) == '2023-02-15 10:02:00'
+
+
+def test_chunks_keep_a_categorical_user_column():
+    text = "1/2/2023, 10:00 - Alice: hi\n1/2/2023, 10:01 - Bob: yo\n13/2/2023, 10:02 - Charlie: hey\n"
+    parser = WhatsAppChatParser()
+    chunks = list(parser.iter_chunks(text.split('\n'), chunk_size=1))
+    df = parser.concat_chunks(chunks)
+    assert df['user'].dtype == 'category'
+    assert list(df['user']) == ['Alice', 'Bob', 'Charlie']
+    assert list(df.index) == [0, 1, 2]
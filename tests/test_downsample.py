@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from visualizers.downsample import bucket_starts, choose_bucket, downsample_series, downsample_table, top_columns
+
+
+def daily_table(days, columns, start='2023-01-02'):
+    """Date x user count table with one row per day"""
+    dates = pd.date_range(start, periods=days, freq='D').date
+    return pd.DataFrame(columns, index=pd.Index(dates, name='date'))
+
+
+def test_top_columns_sums_the_rest_into_others():
+    table = pd.DataFrame({'Ann': [5, 5], 'Bob': [1, 1], 'Cat': [2, 0], 'Dev': [0, 3]})
+    capped = top_columns(table, 2)
+    assert list(capped.columns) == ['Ann', 'Dev', 'Others']
+    assert capped['Others'].tolist() == [3, 1]
+    assert capped.to_numpy().sum() == table.to_numpy().sum()
+
+
+def test_top_columns_keeps_a_user_named_others():
+    table = pd.DataFrame({'Others': [5, 5], 'Bob': [1, 1], 'Cat': [2, 0]})
+    capped = top_columns(table, 2)
+    assert capped['Others'].tolist() == [5, 5]
+    assert list(capped.columns) == ['Others', 'Bob', 'Others (other)']
+    assert capped['Others (other)'].tolist() == [2, 0]
+    assert capped.to_numpy().sum() == table.to_numpy().sum()
+
+
+def test_top_columns_leaves_small_tables_alone():
+    table = pd.DataFrame({'Ann': [1], 'Bob': [2]})
+    assert top_columns(table, 2) is table
+    assert top_columns(table, None) is table
+
+
+def test_choose_bucket_and_week_starts():
+    assert choose_bucket(500, 500) == 'day'
+    assert choose_bucket(501, 500) == 'week'
+    assert choose_bucket(7 * 500 + 1, 500) == 'month'
+    # 2023-01-01 is a Sunday, 2023-01-02 a Monday
+    starts = bucket_starts(np.array(['2023-01-01', '2023-01-02', '2023-01-08'], dtype='datetime64[D]'), 'week')
+    assert starts.astype(str).tolist() == ['2022-12-26', '2023-01-02', '2023-01-02']
+
+
+def test_downsample_table_buckets_by_week_and_keeps_totals():
+    table = daily_table(28, {'Ann': np.arange(28), 'Bob': np.ones(28, dtype=int)})
+    summary, bucket = downsample_table(table, max_points=10, top_k=5)
+    assert bucket == 'week'
+    assert [str(date) for date in summary.index] == ['2023-01-02', '2023-01-09', '2023-01-16', '2023-01-23']
+    assert summary['Ann'].tolist() == [sum(range(week * 7, week * 7 + 7)) for week in range(4)]
+    assert summary['Bob'].tolist() == [7, 7, 7, 7]
+
+
+def test_downsample_table_keeps_short_tables_daily():
+    table = daily_table(5, {'Ann': [1, 2, 3, 4, 5]})
+    summary, bucket = downsample_table(table, max_points=10, top_k=5)
+    assert bucket == 'day'
+    assert summary.equals(table)
+
+
+def test_downsample_series_fits_max_points():
+    dates = np.arange('2020-01-01', '2023-01-01', dtype='datetime64[D]')
+    counts = np.arange(len(dates))
+    sampled_dates, sampled_counts, bucket = downsample_series(dates, counts, 20)
+    assert bucket == 'month'
+    assert len(sampled_dates) == 20
+    assert sampled_dates[0] == np.datetime64('2020-01-01')
+    assert sampled_dates[-1] == np.datetime64('2022-12-01')
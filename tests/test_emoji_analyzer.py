@@ -0,0 +1,43 @@
+import pytest
+
+from analyzers.emoji_analyzer import EmojiAnalyzer
+from core.chat_parser import WhatsAppChatParser
+
+
+def analyze(lines):
+    text = '\n'.join(f"1/2/2023, 10:{minute:02d} - {user}: {message}" for minute, (user, message) in enumerate(lines))
+    return EmojiAnalyzer().analyze_emojis(WhatsAppChatParser().parse_chat(text))
+
+
+@pytest.mark.parametrize('sequence', [
+    '\U0001F1EE\U0001F1F3',                          # Flag: India (two regional indicators)
+    '\U0001F44D\U0001F3FD',                          # Thumbs up, medium skin tone
+    '1\ufe0f\u20e3',                                 # Keycap digit one
+    '\U0001F468\u200d\U0001F469\u200d\U0001F467',    # Family (ZWJ sequence)
+    '\U0001F3F3\ufe0f\u200d\U0001F308',              # Rainbow flag (ZWJ with variation selector)
+])
+def test_multi_codepoint_sequences_count_as_one_emoji(sequence):
+    stats = analyze([('Alice', f"look {sequence} here")])
+    assert stats['total_emojis'] == 1
+    assert [entry['emoji'] for entry in stats['top_emojis']] == [sequence]
+
+
+def test_counts_per_emoji_and_user():
+    stats = analyze([
+        ('Alice', 'haha \U0001F602\U0001F602 \U0001F1EE\U0001F1F3'),
+        ('Bob', '\U0001F44D\U0001F3FD ok \U0001F602'),
+        ('Bob', 'plain text only'),
+    ])
+    assert stats['total_emojis'] == 5
+    assert stats['unique_emojis'] == 3
+    assert [(entry['emoji'], entry['count']) for entry in stats['top_emojis']] == [
+        ('\U0001F602', 3), ('\U0001F1EE\U0001F1F3', 1), ('\U0001F44D\U0001F3FD', 1)
+    ]
+    assert stats['user_emoji_stats']['Alice']['total_emojis'] == 3
+    assert stats['user_emoji_stats']['Bob']['unique_emojis'] == 2
+
+
+def test_ascii_digits_and_symbols_are_not_emoji():
+    stats = analyze([('Alice', 'call me at 12:30 #1 *important*')])
+    assert stats['total_emojis'] == 0
+    assert stats['top_emojis'] == []
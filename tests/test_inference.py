@@ -0,0 +1,62 @@
+from analyzers.inference import BatchedClassifier, ScoreCache
+
+
+class FakePipeline:
+    """Text-classification pipeline stand-in that fails any batch holding a 'bad' text"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, batch_size=None, truncation=None, max_length=None):
+        self.batches.append(list(texts))
+        if any('bad' in text for text in texts):
+            raise RuntimeError('model failed')
+        return [{'label': 'POSITIVE' if 'good' in text else 'NEGATIVE', 'score': 0.9} for text in texts]
+
+
+def test_failing_batch_is_split_until_only_the_bad_text_is_lost():
+    pipeline = FakePipeline()
+    classifier = BatchedClassifier(pipeline, 'fake-model', batch_size=8)
+    texts = ['good one', 'plain', 'bad input', 'good two', 'more text', 'last']
+    results = classifier.predict(texts)
+
+    assert results[2] is None
+    assert [result['label'] for i, result in enumerate(results) if i != 2] == [
+        'POSITIVE', 'NEGATIVE', 'POSITIVE', 'NEGATIVE', 'NEGATIVE'
+    ]
+    # One full batch, then halves down to the single failing text
+    assert len(pipeline.batches[0]) == 6
+    assert ['bad input'] in pipeline.batches
+    assert sum(len(batch) for batch in pipeline.batches if 'bad input' not in batch) == 5
+
+
+def test_failed_texts_are_not_cached():
+    cache = ScoreCache()
+    classifier = BatchedClassifier(FakePipeline(), 'fake-model', cache=cache)
+    classifier.predict(['good', 'bad'])
+    assert len(cache) == 1
+
+
+def test_duplicates_and_cached_texts_skip_the_model():
+    cache = ScoreCache()
+    pipeline = FakePipeline()
+    classifier = BatchedClassifier(pipeline, 'fake-model', cache=cache)
+    first = classifier.predict(['good', 'good', 'plain'])
+    assert sum(len(batch) for batch in pipeline.batches) == 2
+    assert first[0] == first[1]
+
+    pipeline.batches.clear()
+    assert classifier.predict(['plain', 'good']) == [first[2], first[0]]
+    assert pipeline.batches == []
+
+
+def test_batches_stay_within_the_token_budget():
+    classifier = BatchedClassifier(FakePipeline(), 'fake-model', batch_size=4, max_length=64, max_batch_tokens=40)
+    texts = ['word ' * count for count in (1, 2, 3, 4, 5, 6, 7, 8, 20, 30)]
+    lengths = dict(zip(texts, classifier.token_lengths(texts)))
+    batches = classifier.batches(texts)
+
+    assert sorted(text for batch in batches for text in batch) == sorted(texts)
+    for batch in batches:
+        assert len(batch) <= 4
+        assert len(batch) == 1 or len(batch) * max(lengths[text] for text in batch) <= 40
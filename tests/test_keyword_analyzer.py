@@ -0,0 +1,81 @@
+from collections import Counter
+
+from analyzers.keyword_analyzer import KeywordAnalyzer
+from core.chat_parser import WhatsAppChatParser
+from core.tokens import TokenTable
+
+MESSAGES = [
+    ('Alice', 'Pizza tonight? The pizza place on Main St.'),
+    ('Bob', 'pizza again!! fine, pizza it is'),
+    ('Cleo', 'ok'),
+    ('Alice', '<Media omitted>'),
+    ('Bob', "Movie after? I'd rather watch a movie at home"),
+    ('Cleo', 'k :)'),
+    ('Alice', 'movie, pizza, coffee... decisions decisions'),
+    ('Bob', 'https://example.com/menu coffee coffee'),
+    ('Dev', '<Media omitted>'),
+    ('Alice', 'Coffee first; then the movie'),
+]
+
+
+def parse(messages):
+    text = '\n'.join(f"1/2/2023, 10:{minute:02d} - {user}: {message}" for minute, (user, message) in enumerate(messages))
+    return WhatsAppChatParser().parse_chat(text)
+
+
+def naive_counts(analyzer, df, text_only=False):
+    """Per-user ``Counter`` of ``_extract_words`` over the messages, in message order"""
+    counts = {user: Counter() for user in df['user'].unique()}
+    for user, message, message_type in zip(df['user'], df['message'], df['message_type']):
+        if message_type == 'text' or not text_only:
+            counts[user].update(analyzer._extract_words(message))
+    return counts
+
+
+def test_user_term_rows_match_naive_counters():
+    df = parse(MESSAGES)
+    analyzer = KeywordAnalyzer()
+    tokens = TokenTable(df)
+    for text_only in (False, True):
+        matrix, vocabulary = analyzer.user_term_matrix(tokens, text_only=text_only)
+        for user, expected in naive_counts(analyzer, df, text_only).items():
+            word_ids, counts = matrix.row(tokens.users.get_loc(user))
+            assert list(zip(vocabulary[word_ids], counts.tolist())) == expected.most_common()
+    # Cleo only sends words too short to count; Dev only sends media
+    assert naive_counts(analyzer, df)['Cleo'] == Counter()
+    assert naive_counts(analyzer, df, text_only=True)['Dev'] == Counter()
+
+
+def test_top_keywords_match_naive_counter():
+    df = parse(MESSAGES)
+    analyzer = KeywordAnalyzer()
+    tokens = TokenTable(df)
+    expected = Counter(word for message in df.loc[df['message_type'] == 'text', 'message'] for word in analyzer._extract_words(message))
+
+    keywords = analyzer.analyze_keywords(df, tokens)
+    assert list(keywords['word_frequency'].items()) == expected.most_common()
+    assert [(entry['word'], entry['count']) for entry in keywords['trending_words']] == [
+        (word, count) for word, count in expected.most_common(50) if word not in analyzer.stop_words
+    ][:20]
+    assert analyzer.extract_keywords(tokens, top_n=5) == analyzer.extract_keywords(
+        ' '.join(df.loc[df['message_type'] == 'text', 'message']), top_n=5
+    )
+
+
+def test_user_vocabulary_matches_naive_counters():
+    df = parse(MESSAGES)
+    analyzer = KeywordAnalyzer()
+    vocabulary = analyzer.analyze_keywords(df)['user_vocabulary']
+    assert set(vocabulary) == {'Alice', 'Bob', 'Cleo', 'Dev'}
+    for user, expected in naive_counts(analyzer, df).items():
+        stats = vocabulary[user]
+        total = sum(expected.values())
+        assert stats['total_words'] == total
+        assert stats['unique_words'] == len(expected)
+        assert stats['vocabulary_richness'] == (round(len(expected) / total, 3) if total else 0)
+        assert [(entry['word'], entry['count']) for entry in stats['top_words']] == [
+            (word, count) for word, count in expected.most_common(10) if word not in analyzer.stop_words
+        ][:5]
+    assert vocabulary['Cleo'] == {
+        'total_words': 0, 'unique_words': 0, 'vocabulary_richness': 0, 'top_words': [], 'distinctive_words': []
+    }
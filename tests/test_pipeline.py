@@ -0,0 +1,81 @@
+import operator
+import threading
+
+import pytest
+
+from core.pipeline import Pipeline
+
+
+def test_stages_receive_their_inputs():
+    pipeline = Pipeline(max_workers=2)
+    pipeline.add('double', lambda x: x * 2, inputs=['x'])
+    pipeline.add('total', operator.add, inputs=['x', 'double'])
+    outputs, stage_seconds = pipeline.run({'x': 3})
+    assert outputs['double'] == 6
+    assert outputs['total'] == 9
+    assert set(stage_seconds) == {'double', 'total'}
+
+
+def test_independent_stages_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = Pipeline(max_workers=2)
+    pipeline.add('a', lambda x: barrier.wait() is not None, inputs=['x'])
+    pipeline.add('b', lambda x: barrier.wait() is not None, inputs=['x'])
+    outputs, _ = pipeline.run({'x': None})
+    assert outputs['a'] and outputs['b']
+
+
+def test_cycles_are_rejected_before_running():
+    calls = []
+    pipeline = Pipeline()
+    pipeline.add('start', lambda x: calls.append('start'), inputs=['x'])
+    pipeline.add('a', lambda b: calls.append('a'), inputs=['b'])
+    pipeline.add('b', lambda a: calls.append('b'), inputs=['a'])
+    with pytest.raises(ValueError, match='cycle'):
+        pipeline.run({'x': 1})
+    assert calls == []
+
+
+def test_self_dependency_is_a_cycle():
+    pipeline = Pipeline()
+    pipeline.add('a', lambda a: a, inputs=['a'])
+    with pytest.raises(ValueError, match='cycle'):
+        pipeline.run({})
+
+
+def test_unknown_inputs_are_rejected():
+    pipeline = Pipeline()
+    pipeline.add('a', lambda missing: missing, inputs=['missing'])
+    with pytest.raises(ValueError, match='Unknown pipeline inputs'):
+        pipeline.run({})
+
+
+def test_duplicate_stages_are_rejected():
+    pipeline = Pipeline()
+    pipeline.add('a', len, inputs=['x'])
+    with pytest.raises(ValueError, match='Duplicate'):
+        pipeline.add('a', len, inputs=['x'])
+
+
+def test_stage_errors_are_raised_and_dependents_skipped():
+    finished = []
+
+    def fail(x):
+        raise RuntimeError('stage failed')
+
+    pipeline = Pipeline()
+    pipeline.add('broken', fail, inputs=['x'])
+    pipeline.add('after', lambda broken: broken, inputs=['broken'])
+    with pytest.raises(RuntimeError, match='stage failed'):
+        pipeline.run({'x': 1}, on_finish=lambda name, seconds, failed: finished.append((name, failed)))
+    assert finished == [('broken', True)]
+
+
+def test_process_stages_run_on_the_process_pool():
+    pipeline = Pipeline(max_processes=1)
+    pipeline.add('total', operator.add, inputs=['x', 'y'], process=True)
+    try:
+        outputs, _ = pipeline.run({'x': 2, 'y': 3})
+    finally:
+        pipeline.close()
+    assert outputs['total'] == 5
@@ -0,0 +1,98 @@
+import os
+import time
+
+import pytest
+
+from core import result_store
+from core.result_store import MemoryResultStore, DiskResultStore, is_valid_analysis_id
+
+
+class Clock:
+    """Stand-in for ``time.time`` that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_store.time, 'time', clock)
+    return clock
+
+
+def test_memory_store_round_trip():
+    store = MemoryResultStore()
+    analysis_id = store.put({'total_messages': 3})
+    assert is_valid_analysis_id(analysis_id)
+    assert store.get(analysis_id) == {'total_messages': 3}
+    assert store.get('0' * 32) is None
+
+
+def test_memory_store_expires_entries(clock):
+    store = MemoryResultStore(ttl_seconds=60)
+    analysis_id = store.put({'value': 1})
+    clock.now += 59
+    assert store.get(analysis_id) == {'value': 1}
+    clock.now += 2
+    assert store.get(analysis_id) is None
+    assert store._total_bytes == 0
+
+
+def test_memory_store_evicts_least_recently_used_above_cap():
+    entry = {'text': 'x' * 100}
+    store = MemoryResultStore(max_bytes=250)
+    first = store.put(entry)
+    second = store.put(entry)
+    store.get(first)  # Touching the first entry makes the second the oldest
+    third = store.put(entry)
+    assert store.get(second) is None
+    assert store.get(first) == entry
+    assert store.get(third) == entry
+
+
+def test_memory_store_keeps_a_single_entry_over_the_cap():
+    store = MemoryResultStore(max_bytes=10)
+    analysis_id = store.put({'text': 'x' * 100})
+    assert store.get(analysis_id) is not None
+
+
+def test_disk_store_round_trip(tmp_path):
+    store = DiskResultStore(str(tmp_path))
+    analysis_id = store.put({'total_messages': 3})
+    assert store.get(analysis_id) == {'total_messages': 3}
+    assert store.get('0' * 32) is None
+
+
+def test_disk_store_rejects_invalid_ids(tmp_path):
+    store = DiskResultStore(str(tmp_path))
+    assert store.get('../../etc/passwd') is None
+    with pytest.raises(ValueError):
+        store.put({}, analysis_id='../escape')
+
+
+def test_disk_store_expires_entries(tmp_path):
+    store = DiskResultStore(str(tmp_path), ttl_seconds=60)
+    analysis_id = store.put({'value': 1})
+    path = os.path.join(str(tmp_path), f"{analysis_id}.json")
+    written = time.time() - 61
+    os.utime(path, (written, written))
+    assert store.get(analysis_id) is None
+    assert not os.path.exists(path)
+
+
+def test_disk_store_removes_oldest_entries_above_cap(tmp_path):
+    entry = {'text': 'x' * 100}
+    store = DiskResultStore(str(tmp_path), max_bytes=250)
+    ids = []
+    for age in (30, 20):
+        ids.append(store.put(entry))
+        written = time.time() - age
+        os.utime(os.path.join(str(tmp_path), f"{ids[-1]}.json"), (written, written))
+    ids.append(store.put(entry))
+    assert store.get(ids[0]) is None
+    assert store.get(ids[1]) == entry
+    assert store.get(ids[2]) == entry
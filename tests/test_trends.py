@@ -0,0 +1,150 @@
+import datetime
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from analyzers.keyword_analyzer import KeywordAnalyzer
+from core.chat_parser import WhatsAppChatParser
+from core.tokens import TokenTable
+from core.trends import TrendIndex, period_index, period_start
+
+WORDS = ['pizza', 'movie', 'train', 'exam', 'party', 'beach', 'coffee', 'rain']
+
+
+def random_occurrences(seed=7, n=400, n_terms=12, periods=(3, 15)):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, n_terms, n), rng.integers(periods[0], periods[1] + 1, n), n_terms
+
+
+def brute_counts(terms, periods, n_terms, start, end):
+    inside = (periods >= start) & (periods <= end)
+    return np.bincount(terms[inside], minlength=n_terms)
+
+
+def brute_top(terms, periods, n_terms, start, end):
+    """Terms in the range by count, ties by first occurrence over all periods"""
+    counts = brute_counts(terms, periods, n_terms, start, end)
+    first = {term: position for position, term in reversed(list(enumerate(terms.tolist())))}
+    return sorted((term for term in range(n_terms) if counts[term]), key=lambda term: (-counts[term], first[term]))
+
+
+# Inside, on and beyond the stored periods (3..15), single periods and empty ranges
+RANGES = [(3, 15), (0, 100), (3, 3), (15, 15), (7, 9), (0, 2), (16, 20), (10, 5), (-5, 4), (14, 40)]
+
+
+@pytest.mark.parametrize('start, end', RANGES)
+def test_range_counts_match_brute_force(start, end):
+    terms, periods, n_terms = random_occurrences()
+    index = TrendIndex(terms, periods, n_terms)
+    assert index.counts(start, end).tolist() == brute_counts(terms, periods, n_terms, start, end).tolist()
+    assert index.total(start, end) == int(brute_counts(terms, periods, n_terms, start, end).sum())
+
+
+@pytest.mark.parametrize('start, end', RANGES)
+def test_top_terms_match_brute_force_ranking(start, end):
+    terms, periods, n_terms = random_occurrences()
+    term_ids, counts = TrendIndex(terms, periods, n_terms).top(start, end)
+    assert term_ids.tolist() == brute_top(terms, periods, n_terms, start, end)
+    assert counts.tolist() == [brute_counts(terms, periods, n_terms, start, end)[term] for term in term_ids]
+
+
+def test_extend_and_drop_before_match_a_rebuilt_index():
+    terms, periods, n_terms = random_occurrences()
+    index = TrendIndex(terms[:250], periods[:250], n_terms).extend(terms[250:], periods[250:])
+    rebuilt = TrendIndex(terms, periods, n_terms)
+    for start, end in RANGES:
+        assert index.counts(start, end).tolist() == rebuilt.counts(start, end).tolist()
+
+    index.drop_before(8)
+    kept = periods >= 8
+    for start, end in RANGES:
+        assert index.counts(start, end).tolist() == brute_counts(terms[kept], periods[kept], n_terms, start, end).tolist()
+    assert index.first_period == 8
+
+
+def test_empty_index():
+    index = TrendIndex([], [], 3)
+    assert index.counts(0, 10).tolist() == [0, 0, 0]
+    assert index.total(0, 10) == 0
+    assert index.first_period is None and index.last_period is None
+
+
+def test_weeks_start_on_monday():
+    dates = ['2023-01-01 23:59', '2023-01-02 00:00', '2023-01-08 12:00', '2023-01-09 08:00']
+    weeks = period_index(dates, 'week')
+    assert weeks[0] != weeks[1] and weeks[1] == weeks[2] and weeks[2] != weeks[3]
+    assert period_start(weeks[1], 'week') == datetime.date(2023, 1, 2)
+    assert period_start(period_index(dates, 'day')[3], 'day') == datetime.date(2023, 1, 9)
+
+
+def synthetic_chat(seed=3):
+    """Messages from Sunday 2023-01-01 to 2023-02-26, a few per day, with a word that takes off at the end"""
+    rng = random.Random(seed)
+    lines = []
+    for day in range(57):
+        date = datetime.date(2023, 1, 1) + datetime.timedelta(days=day)
+        for slot in range(rng.randint(1, 4)):
+            words = rng.choices(WORDS, k=rng.randint(1, 5))
+            if day >= 50:
+                words += ['holiday'] * rng.randint(1, 3)
+            user = rng.choice(['Alice', 'Bob', 'Chen'])
+            lines.append(f"{date.day}/{date.month}/{date.year}, {8 + slot * 3}:{day % 60:02d} - {user}: {' '.join(words)}")
+    lines.append("26/2/2023, 23:00 - Bob: <Media omitted>")
+    return WhatsAppChatParser().parse_chat('\n'.join(lines))
+
+
+def week_start(timestamp):
+    date = timestamp.date()
+    return date - datetime.timedelta(days=date.weekday())
+
+
+def brute_week_counts(df, analyzer, first_week, last_week):
+    """Counter of keyword words in text messages of the weeks starting ``first_week``..``last_week``"""
+    counts = Counter()
+    for timestamp, message, message_type in zip(df['datetime'], df['message'], df['message_type']):
+        if message_type == 'text' and first_week <= week_start(timestamp) <= last_week:
+            counts.update(analyzer._extract_words(message))
+    return counts
+
+
+def test_trending_in_range_matches_brute_force_on_a_chat():
+    df = synthetic_chat()
+    analyzer = KeywordAnalyzer(trend_period='week')
+    tokens = TokenTable(df)
+
+    # Sunday 2023-01-08 ends a week, Monday 2023-01-09 starts the next
+    for start, end in [('2023-01-08', '2023-01-08'), ('2023-01-09', '2023-01-22'), ('2023-01-01', '2023-02-26')]:
+        start, end = datetime.date.fromisoformat(start), datetime.date.fromisoformat(end)
+        first_week = start - datetime.timedelta(days=start.weekday())
+        last_week = end - datetime.timedelta(days=end.weekday())
+        expected = brute_week_counts(df, analyzer, first_week, last_week)
+        result = analyzer.trending_in_range(df, tokens, start, end, top_n=len(expected))
+        assert {entry['word']: entry['count'] for entry in result} == dict(expected)
+        assert [entry['count'] for entry in result] == sorted(expected.values(), reverse=True)
+
+
+def test_rising_words_match_brute_force_window_and_baseline():
+    df = synthetic_chat()
+    analyzer = KeywordAnalyzer(trend_period='week', trend_window=1, trend_baseline=4)
+    tokens = TokenTable(df)
+
+    last_week = week_start(df['datetime'].max())
+    window = brute_week_counts(df, analyzer, last_week, last_week)
+    baseline = brute_week_counts(df, analyzer, last_week - datetime.timedelta(weeks=4), last_week - datetime.timedelta(weeks=1))
+    window_total, baseline_total = sum(window.values()), sum(baseline.values())
+
+    rising = analyzer.rising_words(df, tokens, min_count=3)
+    assert rising[0]['word'] == 'holiday'
+    for entry in rising:
+        word = entry['word']
+        assert entry['count'] == window[word] >= 3
+        assert entry['baseline_count'] == baseline[word]
+        growth = ((window[word] + 1) / (window_total + 1)) / ((baseline[word] + 1) / (baseline_total + 1))
+        assert entry['growth'] == round(growth, 2) and growth > 1
+    assert [entry['growth'] for entry in rising] == sorted((entry['growth'] for entry in rising), reverse=True)
+
+    keywords = analyzer.analyze_keywords(df, tokens)
+    assert keywords['trend_window']['start'] == last_week.isoformat()
+    assert keywords['trend_window']['baseline_start'] == (last_week - datetime.timedelta(weeks=4)).isoformat()
@@ -3,17 +3,71 @@ import numpy as np
 import plotly.graph_objs as go
 import plotly.express as px
 
+from core.activity_cube import ActivityCube, ActivityTotals
+from visualizers.downsample import downsample_series
+from visualizers import figure_spec
+
+# Plotly classes of the trace types built through ChartGenerator._trace
+_PLOTLY_TRACES = {'scatter': go.Scatter, 'bar': go.Bar, 'pie': go.Pie}
+
+# Title words for the bucket a timeline was resampled to
+BUCKET_LABELS = {'day': 'Daily', 'week': 'Weekly', 'month': 'Monthly'}
+
+def _as_cube(activity):
+    """Activity charts accept the analysis' ``ActivityCube``, its stored ``ActivityTotals`` or a chat DataFrame"""
+    return activity if isinstance(activity, (ActivityCube, ActivityTotals)) else ActivityCube(activity)
+
 class ChartGenerator:
-    """Generate interactive charts and visualizations"""
+    """Generate interactive charts and visualizations
+    
+    Activity charts read pre-aggregated counts from an ``ActivityCube``
+    or the ``ActivityTotals`` stored with the results.
+    Timelines longer than ``max_points`` are bucketed by week or month and
+    then thinned with LTTB, so long chats still ship small figures.
+    Charts are built as ``FigureSpec`` dicts by default, or as validated
+    ``go.Figure`` objects with ``backend='plotly'``; serialize either kind
+    with ``figure_spec.to_json``.
+    """
+
+    def __init__(self, max_points=500, backend='spec'):
+        if backend not in ('plotly', 'spec'):
+            raise ValueError(f"Unknown chart backend: {backend}")
+        self.max_points = max_points
+        self.backend = backend
+
+    def _trace(self, kind, **properties):
+        if self.backend == 'spec':
+            return figure_spec.trace(kind, **properties)
+        return _PLOTLY_TRACES[kind](**properties)
+
+    def _figure(self, *traces):
+        if self.backend == 'spec':
+            return figure_spec.FigureSpec(traces, template=figure_spec.default_template())
+        return go.Figure(data=list(traces))
+
+    def _timeline(self, activity):
+        """``(dates, counts, bucket)`` of the active days; bucket is None unless downsampled to ``max_points``"""
+        dates, counts = _as_cube(activity).active_days()
+        if len(dates) <= self.max_points:
+            return dates, counts, None
+        dates, counts, bucket = downsample_series(dates.astype('datetime64[D]'), counts, self.max_points)
+        return dates.astype(object), counts, bucket
 
-    def create_activity_timeline(self, df):
+    def _label_downsampled(self, fig, bucket):
+        """Mark a downsampled timeline so the page can offer the full-resolution series"""
+        if bucket is None:
+            return
+        fig.update_layout(meta={'downsampled': True, 'bucket': bucket})
+        if bucket != 'day':
+            fig.update_layout(yaxis_title=f'Messages per {bucket}')
+
+    def create_activity_timeline(self, activity):
         """Create a line chart of messages over time"""
-        df['date'] = df['datetime'].dt.date
-        daily_counts = df['date'].value_counts().sort_index()
+        dates, counts, bucket = self._timeline(activity)
 
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=daily_counts.index, y=daily_counts.values, mode='lines+markers'))
-        fig.update_layout(title='Daily Message Activity', xaxis_title='Date', yaxis_title='Message Count')
+        fig = self._figure(self._trace('scatter', x=dates, y=counts, mode='lines+markers'))
+        fig.update_layout(title=f"{BUCKET_LABELS[bucket or 'day']} Message Activity", xaxis_title='Date', yaxis_title='Message Count')
+        self._label_downsampled(fig, bucket)
         return fig
 
 
@@ -31,25 +85,22 @@ class ChartGenerator:
         fig.update_layout(showlegend=True)
         return fig
 
-    def create_hourly_heatmap(self, df):
+    def create_hourly_heatmap(self, activity):
         """Create a heatmap of hourly activity"""
         try:
-            # Add date column and hour column
-            df_copy = df.copy()
-            df_copy['hour'] = df_copy['datetime'].dt.hour
-            
-            # Create hourly activity data for all 24 hours
-            hourly_activity = df_copy.groupby('hour').size().reindex(range(24), fill_value=0)
+            # Hourly activity data for all 24 hours
+            hourly_activity = _as_cube(activity).hourly()
             
             # Create bar chart for hourly activity
-            fig = go.Figure(data=[
-                go.Bar(
+            fig = self._figure(
+                self._trace(
+                    'bar',
                     x=list(range(24)),
-                    y=hourly_activity.values,
-                    marker_color='rgba(55, 128, 191, 0.7)',
+                    y=hourly_activity,
+                    marker=dict(color='rgba(55, 128, 191, 0.7)'),
                     name='Messages'
                 )
-            ])
+            )
             
             # Update layout
             fig.update_layout(
@@ -71,32 +122,34 @@ class ChartGenerator:
             import traceback
             traceback.print_exc()
             # Return a simple empty figure with some sample data
-            fig = go.Figure(data=[
-                go.Bar(x=list(range(24)), y=[0]*24, name='No data')
-            ])
+            fig = self._figure(
+                self._trace('bar', x=list(range(24)), y=[0]*24, name='No data')
+            )
             fig.update_layout(title='Hourly Activity Pattern - No Data Available')
             return fig
 
-    def create_message_type_chart(self, df):
+    def create_message_type_chart(self, activity):
         """Create a pie chart of message types"""
         try:
-            type_counts = df['message_type'].value_counts()
+            type_counts = _as_cube(activity).type_counts()
+            type_counts = type_counts[type_counts > 0]
             
             if type_counts.empty:
                 # Create empty chart with default data
-                fig = go.Figure(data=[go.Pie(labels=['No Data'], values=[1])])
+                fig = self._figure(self._trace('pie', labels=['No Data'], values=[1]))
                 fig.update_layout(title='Message Type Distribution - No Data')
                 return fig
             
             # Create pie chart with proper formatting
-            fig = go.Figure(data=[
-                go.Pie(
+            fig = self._figure(
+                self._trace(
+                    'pie',
                     labels=type_counts.index,
                     values=type_counts.values,
                     textinfo='label+percent',
                     hovertemplate='%{label}: %{value} messages<extra></extra>'
                 )
-            ])
+            )
             
             fig.update_layout(
                 title='Message Type Distribution',
@@ -107,7 +160,7 @@ class ChartGenerator:
         except Exception as e:
             print(f"Error creating message type chart: {e}")
             # Return empty chart
-            fig = go.Figure(data=[go.Pie(labels=['Error'], values=[1])])
+            fig = self._figure(self._trace('pie', labels=['Error'], values=[1]))
             fig.update_layout(title='Message Type Distribution - Error')
             return fig
 
@@ -115,6 +168,17 @@ class ChartGenerator:
         """Create a bar chart for emoji usage"""
         emoji_df = pd.DataFrame(emoji_data['top_emojis'])
 
+        if self.backend == 'spec':
+            fig = self._figure(self._trace(
+                'bar',
+                x=emoji_df['emoji'],
+                y=emoji_df['count'],
+                customdata=emoji_df[['name', 'percentage']].to_numpy(dtype=object),
+                hovertemplate='%{x} %{customdata[0]}<br>Usage Count: %{y} (%{customdata[1]}%)<extra></extra>'
+            ))
+            fig.update_layout(title='Top Emoji Usage', xaxis_title='Emoji', yaxis_title='Usage Count')
+            return fig
+
         fig = px.bar(emoji_df, x='emoji', y='count',
                      hover_data=['name', 'percentage'],
                      title='Top Emoji Usage',
@@ -126,24 +190,27 @@ class ChartGenerator:
         labels = list(sentiment_distribution.keys())
         values = list(sentiment_distribution.values())
         
-        fig = go.Figure(data=[go.Pie(labels=labels, values=values)])
+        fig = self._figure(self._trace('pie', labels=labels, values=values))
         fig.update_layout(title="Sentiment Distribution")
         return fig
     
-    def create_user_activity_chart(self, df):
+    def create_user_activity_chart(self, activity):
         """Create a bar chart of user activity"""
-        user_counts = df['user'].value_counts()
+        user_counts = _as_cube(activity).user_counts()
+        user_counts = user_counts[user_counts > 0]
         
-        fig = go.Figure(data=[go.Bar(x=user_counts.index, y=user_counts.values)])
+        fig = self._figure(self._trace('bar', x=user_counts.index, y=user_counts.values))
         fig.update_layout(title='User Activity', xaxis_title='User', yaxis_title='Message Count')
         return fig
     
-    def create_timeline_chart(self, df):
+    def create_timeline_chart(self, activity):
         """Create a timeline chart of message activity"""
-        df['date'] = df['datetime'].dt.date
-        daily_counts = df.groupby('date').size()
+        dates, counts, bucket = self._timeline(activity)
+        
+        title = 'Message Timeline' if bucket in (None, 'day') else f"Message Timeline ({BUCKET_LABELS[bucket].lower()})"
         
-        fig = go.Figure(data=[go.Scatter(x=daily_counts.index, y=daily_counts.values, mode='lines+markers')])
-        fig.update_layout(title='Message Timeline', xaxis_title='Date', yaxis_title='Message Count')
+        fig = self._figure(self._trace('scatter', x=dates, y=counts, mode='lines+markers'))
+        fig.update_layout(title=title, xaxis_title='Date', yaxis_title='Message Count')
+        self._label_downsampled(fig, bucket)
         return fig
 
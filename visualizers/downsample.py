@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+BUCKETS = ('day', 'week', 'month')
+
+
+def choose_bucket(span_days, max_points):
+    """Coarsest bucket needed to fit ``span_days`` days into ``max_points`` points"""
+    if span_days <= max_points:
+        return 'day'
+    if span_days / 7 <= max_points:
+        return 'week'
+    return 'month'
+
+
+def bucket_starts(dates, bucket):
+    """First day of the bucket of every date (weeks start on Monday)"""
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    if bucket == 'day':
+        return dates
+    if bucket == 'week':
+        days = dates.astype(np.int64)
+        return (days - (days + 3) % 7).astype('datetime64[D]')  # 1970-01-01 was a Thursday
+    if bucket == 'month':
+        return dates.astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError(f"Unknown bucket: {bucket}")
+
+
+def resample(dates, values, bucket):
+    """Sum ``values`` (one row per date) into buckets; returns ``(bucket dates, sums)``"""
+    starts, inverse = np.unique(bucket_starts(dates, bucket), return_inverse=True)
+    values = np.asarray(values)
+    sums = np.zeros((len(starts),) + values.shape[1:], dtype=values.dtype)
+    np.add.at(sums, inverse.reshape(-1), values)
+    return starts, sums
+
+
+def lttb(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last point and, from each of ``threshold - 2``
+    equal buckets in between, the point forming the largest triangle with
+    the previously kept point and the next bucket's average, which
+    preserves peaks and dips that plain averaging would flatten.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    bounds = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = [0]
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        next_start, next_end = (bounds[i + 1], bounds[i + 2]) if i + 2 < len(bounds) else (n - 1, n)
+        average_x = x[next_start:next_end].mean()
+        average_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[previous] - average_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected.append(previous)
+    selected.append(n - 1)
+    return np.array(selected, dtype=np.int64)
+
+
+def downsample_series(dates, counts, max_points):
+    """Fit a daily series into ``max_points``: bucket by span, then LTTB if still too long
+
+    Returns ``(dates, counts, bucket)`` with dates as datetime64[D].
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    counts = np.asarray(counts)
+    if not len(dates):
+        return dates, counts, 'day'
+    span_days = int((dates[-1] - dates[0]).astype(np.int64)) + 1
+    bucket = choose_bucket(span_days, max_points)
+    if bucket != 'day':
+        dates, counts = resample(dates, counts, bucket)
+    if len(dates) > max_points:
+        keep = lttb(dates.astype(np.int64), counts, max_points)
+        dates, counts = dates[keep], counts[keep]
+    return dates, counts, bucket
+
+
+def top_columns(table, k, other_label='Others'):
+    """Keep the ``k`` columns with the largest totals and sum the rest into ``other_label``
+
+    If a kept column is already named ``other_label`` (a user called
+    "Others"), the label is suffixed until it no longer clashes.
+    """
+    if k is None or len(table.columns) <= k:
+        return table
+    totals = table.sum(axis=0).to_numpy()
+    order = np.argsort(-totals, kind='stable')
+    kept = np.sort(order[:k])
+    capped = table.iloc[:, kept].copy()
+    label = other_label
+    while label in capped.columns:
+        label += ' (other)'
+    capped[label] = table.iloc[:, order[k:]].sum(axis=1)
+    return capped
+
+
+def downsample_table(table, max_points, top_k):
+    """Date x column count table bucketed by span and capped to the top ``top_k`` columns"""
+    table = top_columns(table, top_k)
+    if table.empty:
+        return table, 'day'
+    dates = pd.to_datetime(pd.Index(table.index)).to_numpy().astype('datetime64[D]')
+    span_days = int((dates.max() - dates.min()).astype(np.int64)) + 1
+    bucket = choose_bucket(span_days, max_points)
+    if bucket == 'day':
+        return table, bucket
+    starts, sums = resample(dates, table.to_numpy(), bucket)
+    return pd.DataFrame(sums, index=pd.Index(starts.astype(object), name=table.index.name), columns=table.columns), bucket
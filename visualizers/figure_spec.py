@@ -0,0 +1,108 @@
+import json
+import base64
+import datetime
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Plotly.js typed-array codes, smallest first; int64 is not supported by plotly.js
+_INTEGER_CODES = [('i1', '<i1'), ('u1', '<u1'), ('i2', '<i2'), ('u2', '<u2'), ('i4', '<i4'), ('u4', '<u4')]
+
+
+def typed_array(values):
+    """Plotly.js typed array ``{'dtype', 'bdata'}``: the raw little-endian buffer of a numeric array in base64"""
+    values = np.asarray(values)
+    if values.dtype.kind in 'iub':
+        low, high = (int(values.min()), int(values.max())) if values.size else (0, 0)
+        for code, dtype in _INTEGER_CODES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return {'dtype': code, 'bdata': base64.b64encode(values.astype(dtype).tobytes()).decode('ascii')}
+    return {'dtype': 'f8', 'bdata': base64.b64encode(values.astype('<f8').tobytes()).decode('ascii')}
+
+
+def array(values):
+    """JSON-ready form of a trace array: typed array for numbers, ISO strings for dates, a list otherwise"""
+    values = np.asarray(values)
+    if values.ndim == 1 and values.dtype.kind in 'iufb':
+        return typed_array(values)
+    if values.dtype.kind == 'M':
+        return np.datetime_as_string(values).tolist()
+    if values.dtype.kind == 'O' and len(values) and isinstance(values.flat[0], datetime.date):
+        return np.datetime_as_string(values.astype('datetime64[D]')).tolist()
+    return values.tolist()
+
+
+def trace(kind, **properties):
+    """Trace dict of plotly type ``kind``; array-like properties are converted with ``array``"""
+    spec = {}
+    for name, value in properties.items():
+        spec[name] = array(value) if isinstance(value, (np.ndarray, list, tuple)) or hasattr(value, 'to_numpy') else value
+    spec['type'] = kind
+    return spec
+
+
+@lru_cache(maxsize=1)
+def default_template():
+    """Plotly's default layout template as a dict, so spec figures look like ``go.Figure`` ones (None without plotly)"""
+    try:
+        import plotly.io as pio
+    except ImportError:
+        return None
+    return pio.templates[pio.templates.default].to_plotly_json()
+
+
+class FigureSpec:
+    """A Plotly figure as plain dicts, built without ``plotly.graph_objs`` validation
+
+    Supports the small part of the ``go.Figure`` interface the charts use
+    (``add_trace``, ``update_layout`` with ``title`` strings and
+    ``xaxis_title``-style nested keys) and serializes with orjson when it
+    is installed.
+    """
+
+    def __init__(self, data=(), layout=None, template=None):
+        self.data = list(data)
+        self.layout = {}
+        if template is not None:
+            self.layout['template'] = template
+        self.update_layout(**(layout or {}))
+
+    def add_trace(self, spec):
+        self.data.append(spec)
+        return self
+
+    def update_layout(self, **properties):
+        for name, value in properties.items():
+            target = self.layout
+            parts = name.split('_') if name.startswith(('xaxis_', 'yaxis_', 'legend_')) else [name]
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            if parts[-1] == 'title' and isinstance(value, str):
+                value = {'text': value}
+            if isinstance(value, dict) and isinstance(target.get(parts[-1]), dict):
+                target[parts[-1]].update(value)
+            else:
+                target[parts[-1]] = value
+        return self
+
+    def to_plotly_json(self):
+        return {'data': self.data, 'layout': self.layout}
+
+    def to_json(self):
+        if orjson is not None:
+            return orjson.dumps(self.to_plotly_json()).decode('utf-8')
+        return json.dumps(self.to_plotly_json(), separators=(',', ':'))
+
+
+def to_json(figure):
+    """JSON of a ``FigureSpec`` or a ``go.Figure``"""
+    if isinstance(figure, FigureSpec):
+        return figure.to_json()
+    from plotly.utils import PlotlyJSONEncoder
+    return json.dumps(figure, cls=PlotlyJSONEncoder)
@@ -1,16 +1,27 @@
 import pandas as pd
 import base64
+import hashlib
 import io
+import json
+from operator import itemgetter
 from wordcloud import WordCloud
-import matplotlib
-matplotlib.use('Agg')  # Use non-GUI backend
-import matplotlib.pyplot as plt
+from wordcloud.tokenization import unigrams_and_bigrams
 import re
 
+from core.tokens import TokenTable
+
 class WordCloudGenerator:
-    """Generate word clouds from chat messages"""
+    """Generate word clouds from chat messages
+    
+    Clouds are drawn from precomputed word and bigram counts and written
+    straight to a PIL image, without matplotlib. ``fingerprint`` identifies
+    a rendering, so callers can cache the PNG by it.
+    """
     
-    def __init__(self):
+    def __init__(self, width=800, height=400, max_words=100):
+        self.width = width
+        self.height = height
+        self.max_words = max_words
         self.stop_words = {
             'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
             'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him',
@@ -22,62 +33,76 @@ class WordCloudGenerator:
             'omitted', 'image', 'video', 'audio', 'document', 'contact', 'card', 'location'
         }
     
-    def generate_wordcloud(self, input_data):
-        """Generate word cloud from chat messages"""
-        # Handle both DataFrame and string inputs
+    def _wordcloud(self):
+        return WordCloud(
+            width=self.width, 
+            height=self.height, 
+            background_color='white',
+            stopwords=self.stop_words,
+            max_words=self.max_words,
+            colormap='viridis',
+            relative_scaling=0.5,
+            min_font_size=10,
+            random_state=42  # Same counts, same picture, so renderings can be cached
+        )
+    
+    def frequencies(self, input_data):
+        """The ``max_words`` most frequent words and bigrams the cloud is drawn from, or None without text
+        
+        ``input_data`` is a text string, a chat DataFrame or the analysis'
+        shared ``TokenTable``.
+        """
+        wordcloud = self._wordcloud()
         if isinstance(input_data, str):
-            all_text = input_data
-        elif hasattr(input_data, 'empty') and input_data.empty:
-            return None
+            all_text = self._clean_text(input_data)
+            if not all_text.strip():
+                return None
+            counts = wordcloud.process_text(all_text)
         else:
-            # Assume it's a DataFrame
-            text_messages = input_data[input_data['message_type'] == 'text']['message'].tolist()
+            if hasattr(input_data, 'empty'):
+                # Assume it's a DataFrame
+                if input_data.empty:
+                    return None
+                input_data = TokenTable(input_data)
             
-            if not text_messages:
+            words = self._text_words(input_data)
+            if not words:
                 return None
-                
-            # Combine all messages into one text
-            all_text = ' '.join([str(msg) for msg in text_messages if str(msg).strip()])
-        
-        # Clean text
-        all_text = self._clean_text(all_text)
-        
-        if not all_text.strip():
-            return None
+            # Same counting as WordCloud.process_text on the cleaned text
+            counts = unigrams_and_bigrams(words, self.stop_words, wordcloud.normalize_plurals, wordcloud.collocation_threshold)
         
+        # WordCloud only draws the top max_words entries (stable sort, as in generate_from_frequencies)
+        top = sorted(counts.items(), key=itemgetter(1), reverse=True)[:self.max_words]
+        return dict(top) if top else None
+    
+    def fingerprint(self, frequencies):
+        """Hex digest of everything that determines the rendered image"""
+        payload = json.dumps([self.width, self.height, self.max_words, list(frequencies.items())])
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def render(self, frequencies):
+        """PNG bytes of the word cloud for ``frequencies``"""
+        image = self._wordcloud().generate_from_frequencies(frequencies).to_image()
+        img_buffer = io.BytesIO()
+        image.save(img_buffer, format='PNG')
+        return img_buffer.getvalue()
+    
+    def generate_wordcloud(self, input_data):
+        """Generate word cloud from chat messages as a base64 PNG, or None"""
         try:
-            # Create word cloud
-            wordcloud = WordCloud(
-                width=800, 
-                height=400, 
-                background_color='white',
-                stopwords=self.stop_words,
-                max_words=100,
-                colormap='viridis',
-                relative_scaling=0.5,
-                min_font_size=10
-            ).generate(all_text)
-            
-            # Convert to image
-            plt.figure(figsize=(10, 5))
-            plt.imshow(wordcloud, interpolation='bilinear')
-            plt.axis('off')
-            plt.tight_layout(pad=0)
-            
-            # Save to base64 string
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png', bbox_inches='tight', dpi=150)
-            img_buffer.seek(0)
-            
-            img_base64 = base64.b64encode(img_buffer.read()).decode('utf-8')
-            plt.close()
-            
-            return img_base64
-            
+            frequencies = self.frequencies(input_data)
+            if not frequencies:
+                return None
+            return base64.b64encode(self.render(frequencies)).decode('utf-8')
         except Exception as e:
             print(f"Error generating word cloud: {e}")
             return None
     
+    def _text_words(self, tokens):
+        """Cleaned words of the text messages, in message order"""
+        view = tokens.words('wordcloud', lambda token: self._clean_text(token).split())
+        return view.vocabulary[view.word[tokens.text_rows()[view.row]]].tolist()
+    
     def _clean_text(self, text):
         """Clean text for word cloud generation"""
         if not text: